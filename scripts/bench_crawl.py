@@ -0,0 +1,492 @@
+"""
+Offline end-to-end crawl benchmark
+
+Starts a local mock marketplace that serves search pages (div.search-items
+cards with a.next pagination) and detail pages matching VinylSpider's
+selectors, with configurable latency, page counts, block-page injection and
+429 rates. Runs VinylSpider and the project's item pipelines against it and
+reports items/sec, p50/p95 latency per stage (download, parse callbacks, each
+pipeline), peak RSS of the crawler and its browsers, and the peak browser
+process count. Results can be saved as JSON and compared with a baseline run.
+
+Usage:
+    python scripts/bench_crawl.py --keywords 3 --pages 5 --output bench.json
+    python scripts/bench_crawl.py --latency-ms 50 --block-rate 0.05 --baseline bench.json
+    python scripts/bench_crawl.py --playwright   # render every page in Chromium
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter, defaultdict
+from datetime import datetime
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, quote, urlparse
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from loguru import logger
+from scrapy import signals
+from scrapy.crawler import CrawlerProcess
+from scrapy.settings import Settings
+from scrapy.utils.misc import load_object
+
+from xianyu_crawler.spiders.vinyl_spider import VinylSpider
+
+CONDITIONS = ["全新", "99新", "95新", "9成新", "8成新"]
+TRADE_TYPES = ["快递", "同城交易", "自提"]
+LOCATIONS = ["上海", "北京", "广州", "深圳", "杭州", "成都"]
+BROWSER_MARKERS = ("chrome", "chromium", "headless_shell", "firefox", "webkit")
+
+BLOCK_PAGE = "<html><body><div class='captcha'>请输入验证码 访问频繁</div></body></html>"
+
+
+class MockMarketplace(ThreadingHTTPServer):
+    """Local HTTP server generating Xianyu-like search and detail pages"""
+
+    daemon_threads = True
+
+    def __init__(self, pages, cards, latency_ms, block_rate, throttle_rate, seed=42):
+        super().__init__(("127.0.0.1", 0), MockMarketplaceHandler)
+        self.pages = pages
+        self.cards = cards
+        self.latency_ms = latency_ms
+        self.block_rate = block_rate
+        self.throttle_rate = throttle_rate
+        self.seed = seed
+        self.attempts = Counter()
+        self.served = Counter()
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def fault(self, path: str) -> str:
+        """Injected fault for this attempt at a path: "throttle", "block" or empty"""
+        with self.lock:
+            self.attempts[path] += 1
+            attempt = self.attempts[path]
+        roll = random.Random(f"{self.seed}:{path}:{attempt}").random()
+        if roll < self.throttle_rate:
+            return "throttle"
+        if roll < self.throttle_rate + self.block_rate:
+            return "block"
+        return ""
+
+    def count(self, kind: str):
+        with self.lock:
+            self.served[kind] += 1
+
+
+class MockMarketplaceHandler(BaseHTTPRequestHandler):
+    """Serves /search?q=&page= and /item.htm?id= pages"""
+
+    server: MockMarketplace
+
+    def do_GET(self):
+        server = self.server
+        if server.latency_ms:
+            time.sleep(server.latency_ms / 1000 * random.uniform(0.5, 1.5))
+
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+
+        fault = server.fault(self.path)
+        if fault == "throttle":
+            server.count("throttled")
+            self._send(429, "<html><body>Too Many Requests</body></html>", {"Retry-After": "1"})
+            return
+        if fault == "block":
+            server.count("blocked")
+            self._send(200, BLOCK_PAGE)
+            return
+
+        if url.path == "/search":
+            keyword = query.get("q", [""])[0]
+            page = int(query.get("page", ["1"])[0])
+            server.count("search")
+            self._send(200, self.search_page(keyword, page))
+        elif url.path == "/item.htm":
+            server.count("detail")
+            self._send(200, self.detail_page(query.get("id", ["0"])[0]))
+        else:
+            server.count("not_found")
+            self._send(404, "<html><body>Not Found</body></html>")
+
+    def search_page(self, keyword: str, page: int) -> str:
+        server = self.server
+        if page > server.pages:
+            return "<html><body><div class='search-items'></div></body></html>"
+
+        base_id = 10**12 + (zlib.crc32(keyword.encode("utf-8")) % 1000) * 10**6 + page * 1000
+        cards = []
+        for i in range(server.cards):
+            product_id = base_id + i
+            title = escape(f"Artist {product_id % 997} - Album {product_id} {keyword} 黑胶唱片 LP")
+            price = 50 + product_id % 1950
+            cards.append(
+                f'<div class="search-item"><a href="/item.htm?id={product_id}" title="{title}">'
+                f'{title}</a><span class="price">¥{price}</span></div>'
+            )
+
+        next_link = ""
+        if page < server.pages:
+            next_link = (
+                f'<a class="next" href="/search?q={quote(keyword)}&page={page + 1}">下一页</a>'
+            )
+        return (
+            f"<html><body><div class='search-items'>{''.join(cards)}</div>"
+            f"<div class='pagination'>{next_link}</div></body></html>"
+        )
+
+    def detail_page(self, product_id: str) -> str:
+        rng = random.Random(product_id)
+        images = "".join(
+            f'<img src="https://img.example.com/{product_id}_{n}.jpg">'
+            for n in range(rng.randint(1, 5))
+        )
+        tags = "".join(
+            f'<span class="tag">{t}</span>' for t in rng.sample(["LP", "原版", "首版"], 2)
+        )
+        return f"""<html><body><div class="product-detail">
+<h1 class="item-title">Artist {int(product_id) % 997} - Album {product_id} 黑胶唱片</h1>
+<div class="price">¥{50 + int(product_id) % 1950}.00</div>
+<div class="seller-name">seller_{rng.randint(1, 500)}</div>
+<div class="seller-credit">{rng.randint(0, 100)}</div>
+<div class="seller-id" data-id="{rng.randint(10**9, 10**10)}"></div>
+<div class="seller-location">{rng.choice(LOCATIONS)}</div>
+<div class="condition">{rng.choice(CONDITIONS)}</div>
+<div class="trade-type">{rng.choice(TRADE_TYPES)}</div>
+<div class="location">{rng.choice(LOCATIONS)}</div>
+<div class="publish-time">{rng.randint(1, 30)}天前</div>
+<div class="view-count">{rng.randint(0, 5000)}</div>
+<div class="want-count">{rng.randint(0, 300)}</div>
+<div class="product-images">{images}</div>
+<div class="description">{"全新未拆封 原版进口 " * rng.randint(1, 4)}</div>
+<div class="tags">{tags}</div>
+</div></body></html>"""
+
+    def _send(self, status: int, body: str, headers=None):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StageTimer:
+    """Collects latency samples per stage"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def add(self, stage: str, seconds: float):
+        self.samples[stage].append(seconds)
+
+    def summary(self) -> dict:
+        result = {}
+        for stage, samples in self.samples.items():
+            ordered = sorted(samples)
+            result[stage] = {
+                "count": len(ordered),
+                "p50_ms": ordered[int(0.50 * (len(ordered) - 1))] * 1000,
+                "p95_ms": ordered[int(0.95 * (len(ordered) - 1))] * 1000,
+                "total_s": sum(ordered),
+            }
+        return result
+
+
+TIMER = StageTimer()
+
+
+def timed_iter(stage: str, iterable):
+    """Yield from an iterable, timing only the work done inside it"""
+    iterator = iter(iterable)
+    elapsed = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                value = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                elapsed += time.perf_counter() - start
+            yield value
+    finally:
+        TIMER.add(stage, elapsed)
+
+
+class BenchVinylSpider(VinylSpider):
+    """VinylSpider with timed parse callbacks"""
+
+    name = "bench_vinyl_spider"
+
+    def parse_search_results(self, response):
+        yield from timed_iter("parse_search", super().parse_search_results(response))
+
+    def parse_product_detail(self, response):
+        yield from timed_iter("parse_detail", super().parse_product_detail(response))
+
+
+def timed_pipeline(path):
+    """Subclass of a pipeline whose process_item is timed as its own stage"""
+    cls = load_object(path)
+    stage = cls.__name__
+
+    def process_item(self, item, spider):
+        start = time.perf_counter()
+        try:
+            return cls.process_item(self, item, spider)
+        finally:
+            TIMER.add(stage, time.perf_counter() - start)
+
+    return type(f"Timed{stage}", (cls,), {"process_item": process_item})
+
+
+class ResourceSampler(threading.Thread):
+    """Samples RSS of this process and its descendants (Linux /proc), and browser count"""
+
+    def __init__(self, interval: float = 0.1):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak_rss = 0
+        self.peak_browsers = 0
+        self._stop_event = threading.Event()
+        self._page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.sample()
+
+    def sample(self):
+        proc = Path("/proc")
+        if not proc.exists():
+            return
+
+        children = defaultdict(list)
+        for stat in proc.glob("[0-9]*/stat"):
+            try:
+                fields = stat.read_text().rsplit(")", 1)[1].split()
+                children[int(fields[1])].append(int(stat.parent.name))
+            except (OSError, IndexError, ValueError):
+                continue
+
+        pids, stack = [], [os.getpid()]
+        while stack:
+            pid = stack.pop()
+            pids.append(pid)
+            stack.extend(children.get(pid, ()))
+
+        rss = browsers = 0
+        for pid in pids:
+            try:
+                rss += int((proc / str(pid) / "statm").read_text().split()[1]) * self._page_size
+                cmdline = (proc / str(pid) / "cmdline").read_bytes().lower()
+            except (OSError, IndexError, ValueError):
+                continue
+            if pid != os.getpid() and any(m.encode() in cmdline for m in BROWSER_MARKERS):
+                browsers += 1
+        self.peak_rss = max(self.peak_rss, rss)
+        self.peak_browsers = max(self.peak_browsers, browsers)
+
+
+def crawl_settings(args, work_dir: Path) -> Settings:
+    """Project settings pointed at a scratch directory and tuned for a local server"""
+    settings = Settings()
+    settings.setmodule("xianyu_crawler.settings")
+    settings.set(
+        "ITEM_PIPELINES",
+        {timed_pipeline(path): order for path, order in settings.getdict("ITEM_PIPELINES").items()},
+    )
+    settings.update(
+        {
+            "CACHE_DIR": str(work_dir / "cache"),
+            "JSON_OUTPUT_DIR": str(work_dir / "json"),
+            "HISTORY_DIR": str(work_dir / "history"),
+            "PARQUET_OUTPUT_DIR": str(work_dir / "parquet"),
+            "STAGE_METRICS_DIR": str(work_dir / "metrics"),
+            "HTTPCACHE_ENABLED": False,
+            "DOWNLOAD_DELAY": 0,
+            "AUTOTHROTTLE_ENABLED": False,
+            "CONCURRENT_REQUESTS": args.concurrency,
+            "CONCURRENT_REQUESTS_PER_DOMAIN": args.concurrency,
+            "CONCURRENT_REQUESTS_PER_IP": 0,
+            "LOG_LEVEL": args.log_level,
+        }
+    )
+    return settings
+
+
+def run_crawl(args) -> dict:
+    """Run the spider against a fresh mock server and collect the results"""
+    server = MockMarketplace(
+        pages=args.pages,
+        cards=args.cards,
+        latency_ms=args.latency_ms,
+        block_rate=args.block_rate,
+        throttle_rate=args.throttle_rate,
+        seed=args.seed,
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    keywords = [f"kw{i}" for i in range(args.keywords)]
+    sampler = ResourceSampler()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        process = CrawlerProcess(crawl_settings(args, Path(tmp)))
+        crawler = process.create_crawler(BenchVinylSpider)
+
+        def response_received(response, request, spider):
+            latency = request.meta.get("download_latency")
+            if latency is not None:
+                TIMER.add("download", latency)
+
+        crawler.signals.connect(response_received, signal=signals.response_received)
+
+        process.crawl(
+            crawler,
+            crawl_type="full",
+            keywords=",".join(keywords),
+            base_url=server.base_url,
+            playwright=str(args.playwright),
+        )
+
+        sampler.start()
+        start = time.perf_counter()
+        process.start()
+        elapsed = time.perf_counter() - start
+        sampler.stop()
+
+    server.shutdown()
+    server.server_close()
+
+    stats = crawler.stats.get_stats()
+    items = stats.get("item_scraped_count", 0)
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "config": {
+            "keywords": args.keywords,
+            "pages": args.pages,
+            "cards": args.cards,
+            "latency_ms": args.latency_ms,
+            "block_rate": args.block_rate,
+            "throttle_rate": args.throttle_rate,
+            "concurrency": args.concurrency,
+            "playwright": args.playwright,
+        },
+        "elapsed_s": elapsed,
+        "items": items,
+        "items_per_s": items / elapsed if elapsed else 0.0,
+        "expected_items": args.keywords * args.pages * args.cards,
+        "requests": stats.get("downloader/request_count", 0),
+        "status_counts": {
+            key.rsplit("/", 1)[1]: value
+            for key, value in stats.items()
+            if key.startswith("downloader/response_status_count/")
+        },
+        "dropped": stats.get("item_dropped_count", 0),
+        "served": dict(server.served),
+        "stages": TIMER.summary(),
+        "peak_rss_mb": sampler.peak_rss / 2**20,
+        "peak_browsers": sampler.peak_browsers,
+    }
+
+
+def print_report(result: dict, baseline: dict = None):
+    """Print a run summary, with deltas against a baseline run if given"""
+
+    def delta(value, key, stage=None):
+        if not baseline:
+            return ""
+        old = baseline["stages"].get(stage, {}).get(key) if stage else baseline.get(key)
+        if not old:
+            return ""
+        return f" ({(value - old) / old * 100:+.1f}%)"
+
+    config = result["config"]
+    print(
+        f"\nCrawl benchmark: {config['keywords']} keywords x {config['pages']} pages x "
+        f"{config['cards']} cards, latency {config['latency_ms']} ms, "
+        f"block {config['block_rate']:.0%}, 429 {config['throttle_rate']:.0%}, "
+        f"concurrency {config['concurrency']}, playwright={config['playwright']}"
+    )
+    print(f"  Items:         {result['items']:,} of {result['expected_items']:,} expected")
+    print(f"  Elapsed:       {result['elapsed_s']:.2f} s{delta(result['elapsed_s'], 'elapsed_s')}")
+    print(
+        f"  Throughput:    {result['items_per_s']:,.1f} items/s"
+        f"{delta(result['items_per_s'], 'items_per_s')}"
+    )
+    print(f"  Requests:      {result['requests']:,} {result['status_counts']}")
+    print(f"  Served:        {result['served']}")
+    print(
+        f"  Peak RSS:      {result['peak_rss_mb']:,.1f} MB"
+        f"{delta(result['peak_rss_mb'], 'peak_rss_mb')}"
+    )
+    print(f"  Peak browsers: {result['peak_browsers']}")
+
+    print(f"\n  {'stage':<28} {'count':>7} {'p50 ms':>10} {'p95 ms':>10} {'total s':>9}")
+    for stage, s in result["stages"].items():
+        print(
+            f"  {stage:<28} {s['count']:>7,} {s['p50_ms']:>10.3f} {s['p95_ms']:>10.3f} "
+            f"{s['total_s']:>9.3f}{delta(s['p95_ms'], 'p95_ms', stage)}"
+        )
+    print()
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Offline end-to-end crawl benchmark")
+    parser.add_argument("--keywords", type=int, default=3, help="Search keywords to crawl")
+    parser.add_argument("--pages", type=int, default=5, help="Search pages per keyword")
+    parser.add_argument("--cards", type=int, default=20, help="Product cards per search page")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Mean server latency")
+    parser.add_argument("--block-rate", type=float, default=0.0, help="Share of block pages")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of 429 responses")
+    parser.add_argument("--concurrency", type=int, default=8, help="CONCURRENT_REQUESTS")
+    parser.add_argument("--playwright", action="store_true", help="Render pages in Chromium")
+    parser.add_argument("--seed", type=int, default=42, help="Fault injection seed")
+    parser.add_argument("--log-level", default="WARNING", help="Scrapy and loguru log level")
+    parser.add_argument("--output", help="Write the result as JSON")
+    parser.add_argument("--baseline", help="Previous result JSON to compare with")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+
+    result = run_crawl(args)
+
+    baseline = None
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+    print_report(result, baseline)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(result, indent=2), encoding="utf-8")
+        print(f"Result saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Micro-benchmark for detail page extraction
+
+Compares the legacy per-field response.css() queries with the compiled
+single-pass extractor used by VinylSpider.parse_product_detail.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scrapy.http import HtmlResponse
+
+from xianyu_crawler.spiders.vinyl_spider import DETAIL_PAGE_EXTRACTOR, VinylSpider
+
+DEFAULT_FIXTURE = Path(__file__).parent.parent / "output" / "debug_page.html"
+
+
+def legacy_extract(response, spider: VinylSpider) -> dict:
+    """Field extraction as previously done in parse_product_detail"""
+    item = {}
+    title = response.css(".item-title, .Title--text, h1::text").get()
+    item["title"] = title.strip() if title else ""
+    item["price"] = spider._parse_price(
+        response.css(".price, .Price--price, .PriceAmount::text").getall()
+    )
+    seller_name = response.css(".seller-name, .SellerInfo--nick, .user-nick::text").get()
+    item["seller_name"] = seller_name.strip() if seller_name else None
+    item["seller_credit"] = spider._parse_int(
+        response.css(".seller-credit, .credit-score::text").get()
+    )
+    item["seller_id"] = response.css(".seller-id::attr(data-id)").get()
+    for field_name, query in (
+        ("seller_location", ".seller-location, .Location--text::text"),
+        ("condition", ".condition, .Condition--text::text"),
+        ("trade_type", ".trade-type, .TradeMethod--text::text"),
+        ("location", ".location, .Location--address::text"),
+        ("publish_time", ".publish-time, .Time--text::text"),
+    ):
+        value = response.css(query).get()
+        item[field_name] = value.strip() if value else None
+    item["view_count"] = spider._parse_int(
+        response.css(".view-count, .ViewCount--text::text").get()
+    )
+    item["want_count"] = spider._parse_int(
+        response.css(".want-count, .WantCount--text::text").get()
+    )
+    images = response.css(".product-images img::attr(src), .Image--image::attr(src)").getall()
+    item["images"] = [img for img in images if img]
+    description = response.css(".description, .Description--text::text").getall()
+    item["description"] = (
+        " ".join(d.strip() for d in description if d.strip()) if description else None
+    )
+    tags = response.css(".tags .tag::text, .Tag--text::text").getall()
+    item["tags"] = [tag.strip() for tag in tags if tag.strip()]
+    return item
+
+
+def compiled_extract(response, spider: VinylSpider) -> dict:
+    """Field extraction through the compiled spec"""
+    fields = DETAIL_PAGE_EXTRACTOR.extract_response(response)
+    fields["price"] = spider._parse_price(fields["price"])
+    return fields
+
+
+def run(label: str, func, body: bytes, spider: VinylSpider, iterations: int, reparse: bool):
+    """Time one extraction strategy and print parses per second"""
+    response = HtmlResponse(url="https://www.goofish.com/item?id=1", body=body, encoding="utf-8")
+    response.selector  # Build the tree once when measuring queries only
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        if reparse:
+            response = HtmlResponse(
+                url="https://www.goofish.com/item?id=1", body=body, encoding="utf-8"
+            )
+        func(response, spider)
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"  {label:<28} {iterations / elapsed:>10.1f} parses/s  "
+        f"({elapsed * 1000 / iterations:.3f} ms)"
+    )
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Detail page extraction benchmark")
+    parser.add_argument("--fixture", type=Path, default=DEFAULT_FIXTURE, help="HTML fixture")
+    parser.add_argument("--iterations", type=int, default=200, help="Parses per strategy")
+    args = parser.parse_args()
+
+    body = args.fixture.read_bytes()
+    spider = VinylSpider()
+
+    print(f"\nFixture: {args.fixture} ({len(body):,} bytes)")
+    print("\nSelector evaluation only (pre-parsed tree):")
+    run("before: response.css()", legacy_extract, body, spider, args.iterations, False)
+    run("after: compiled spec", compiled_extract, body, spider, args.iterations, False)
+
+    print("\nEnd to end (HTML parse + extraction):")
+    run("before: response.css()", legacy_extract, body, spider, args.iterations, True)
+    run("after: compiled spec", compiled_extract, body, spider, args.iterations, True)
+    print()
+
+
+if __name__ == "__main__":
+    main()
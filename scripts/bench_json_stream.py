@@ -0,0 +1,76 @@
+"""
+Benchmark for whole-file vs streaming reads of export files
+
+Writes a synthetic export file of N items, then reads the titles back with
+read_json (the whole document in memory) and with the streaming reader,
+with and without field projection. Reports wall time and peak Python heap
+(tracemalloc) of each. tracemalloc slows the streaming reader's Python code
+more than orjson's single call, so compare times with it off as well.
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from xianyu_crawler.storage.json_stream import iter_records
+from xianyu_crawler.storage.serialization import json_filename, read_json, write_json_stream
+
+
+def make_items(count: int):
+    for i in range(count):
+        yield {
+            "product_id": f"{1000000000000 + i}",
+            "title": f"Artist {i % 500} - Album {i} 黑胶唱片 LP",
+            "price": 100.0 + i % 900,
+            "link": f"https://www.goofish.com/item?id={1000000000000 + i}",
+            "seller_name": f"seller_{i % 300}",
+            "want_count": i % 300,
+            "description": "全新未拆 原版首版 " * 8,
+            "tags": ["原版", "首版"],
+            "crawled_at": "2026-02-08T12:00:00",
+        }
+
+
+def measure(label: str, read):
+    tracemalloc.start()
+    start = time.perf_counter()
+    titles = read()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<28} {elapsed:>7.2f} s  peak {peak / 1e6:>8.1f} MB  ({len(titles)} titles)")
+    return titles
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Whole-file vs streaming export reads")
+    parser.add_argument("--items", type=int, default=100_000, help="Items in the export file")
+    parser.add_argument(
+        "--compression", choices=["gzip", "zstd"], default=None, help="Compress the file"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / json_filename("bench_export", args.compression)
+        write_json_stream(path, {"export_time": "2026-02-08T12:00:00"}, make_items(args.items))
+        print(f"\n{path.name}: {args.items:,} items, {path.stat().st_size / 1e6:.1f} MB on disk")
+
+        expected = measure("read_json", lambda: [item["title"] for item in read_json(path)["data"]])
+        for label, fields in (("iter_records", None), ("iter_records (title only)", ("title",))):
+            titles = measure(
+                label, lambda: [item["title"] for item in iter_records(path, fields=fields)]
+            )
+            if titles != expected:
+                raise SystemExit(f"{label} returned different titles")
+    print()
+
+
+if __name__ == "__main__":
+    main()
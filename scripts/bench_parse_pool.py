@@ -0,0 +1,115 @@
+"""
+Benchmark for in-thread vs process-pool detail page parsing
+
+Parses the same fixture page N times on the event loop thread (as
+VinylSpider.parse_product_detail does) and through ParsePool workers (as
+parse_product_detail_pooled does), keeping a bounded number of pages in
+flight. Reports pages/s and the CPU time spent on the event loop thread,
+which is what parsing takes away from download handling.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from loguru import logger
+from scrapy.http import HtmlResponse
+
+from xianyu_crawler.spiders.vinyl_spider import DETAIL_PAGE_EXTRACTOR
+from xianyu_crawler.utils.parse_pool import ParsePool
+
+DEFAULT_FIXTURE = Path(__file__).parent.parent / "output" / "debug_page.html"
+URL = "https://www.goofish.com/item?id=1"
+
+
+def report(label: str, pages: int, elapsed: float, loop_cpu: float):
+    print(
+        f"  {label:<22} {pages / elapsed:>9.1f} pages/s  "
+        f"wall {elapsed:>6.2f} s  loop thread CPU {loop_cpu:>6.2f} s "
+        f"({loop_cpu * 1000 / pages:.2f} ms/page)"
+    )
+
+
+async def run_in_thread(body: bytes, pages: int):
+    """Parse every page on the event loop thread"""
+    start, cpu = time.perf_counter(), time.thread_time()
+    for _ in range(pages):
+        response = HtmlResponse(url=URL, body=body, encoding="utf-8")
+        DETAIL_PAGE_EXTRACTOR.extract_response(response)
+        await asyncio.sleep(0)
+    report("in-thread", pages, time.perf_counter() - start, time.thread_time() - cpu)
+
+
+async def run_pooled(body: bytes, pages: int, workers: int, in_flight: int):
+    """Parse every page in a ParsePool, with at most in_flight pages queued"""
+    pool = ParsePool(workers)
+    pool.start()
+    # Wait until every worker has imported the parser
+    await asyncio.gather(*(pool.extract_detail(body, "utf-8") for _ in range(workers)))
+
+    semaphore = asyncio.Semaphore(in_flight)
+
+    async def parse_one():
+        async with semaphore:
+            await pool.extract_detail(body, "utf-8")
+
+    start, cpu = time.perf_counter(), time.thread_time()
+    await asyncio.gather(*(parse_one() for _ in range(pages)))
+    report(
+        f"pool ({workers} workers)", pages, time.perf_counter() - start, time.thread_time() - cpu
+    )
+    pool.close()
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="In-thread vs process-pool parsing benchmark")
+    parser.add_argument("--fixture", type=Path, default=DEFAULT_FIXTURE, help="HTML fixture")
+    parser.add_argument("--pages", type=int, default=200, help="Pages per run")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=sorted({1, 2, os.cpu_count() or 1}),
+        help="Pool sizes to compare",
+    )
+    parser.add_argument("--in-flight", type=int, default=16, help="Pages queued at once")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    body = args.fixture.read_bytes()
+    # Same result from both paths
+    expected = DETAIL_PAGE_EXTRACTOR.extract_response(
+        HtmlResponse(url=URL, body=body, encoding="utf-8")
+    )
+
+    async def check():
+        pool = ParsePool(1)
+        try:
+            return await pool.extract_detail(body, "utf-8")
+        finally:
+            pool.close()
+
+    if asyncio.run(check()) != expected:
+        raise SystemExit("Pooled extraction differs from in-thread extraction")
+
+    print(
+        f"\nFixture: {args.fixture} ({len(body):,} bytes), {args.pages} pages, "
+        f"{os.cpu_count()} CPUs"
+    )
+    asyncio.run(run_in_thread(body, args.pages))
+    for workers in args.workers:
+        asyncio.run(run_pooled(body, args.pages, workers, args.in_flight))
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark for the validation + JSON export pipeline chain
+
+Measures per-item CPU time for DataValidationPipeline followed by
+JsonExportPipeline on synthetic items, compared with the previous chain that
+re-validated every item at export time. File writes are excluded.
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from loguru import logger
+
+from xianyu_crawler.items import VinylProductItem, VinylProductModel
+from xianyu_crawler.pipelines import DataValidationPipeline, JsonExportPipeline
+from xianyu_crawler.storage.json_export import JsonExporter
+from xianyu_crawler.utils.validators import validate_product_item
+
+CONDITIONS = ["全新", "99新", "95新", "9成新", "8成新"]
+TRADE_TYPES = ["快递", "同城交易", "自提"]
+LOCATIONS = ["上海", "北京", "广州", "深圳", "杭州", "成都"]
+
+
+class NullExporter(JsonExporter):
+    """Exporter that drops batches, so only pipeline CPU is measured"""
+
+    def export_items(self, items):
+        return ""
+
+
+def synthetic_items(count: int, seed: int = 42) -> list:
+    """Generate raw VinylProductItem objects as the spider yields them"""
+    rng = random.Random(seed)
+    items = []
+    for i in range(count):
+        item = VinylProductItem()
+        item["product_id"] = str(1000000000000 + i)
+        item["title"] = f"Artist {rng.randint(1, 5000)} - Album {i} 黑胶唱片 LP"
+        item["price"] = round(rng.uniform(50, 2000), 2)
+        item["link"] = f"https://www.goofish.com/item?id={1000000000000 + i}"
+        item["seller_name"] = f"seller_{rng.randint(1, 500)}"
+        item["seller_credit"] = rng.randint(0, 100)
+        item["seller_id"] = str(rng.randint(10**9, 10**10))
+        item["seller_location"] = rng.choice(LOCATIONS)
+        item["description"] = "全新未拆封 原版进口 " * rng.randint(1, 4)
+        item["condition"] = rng.choice(CONDITIONS)
+        item["trade_type"] = rng.choice(TRADE_TYPES)
+        item["location"] = rng.choice(LOCATIONS)
+        item["publish_time"] = "3天前"
+        item["view_count"] = rng.randint(0, 5000)
+        item["want_count"] = rng.randint(0, 300)
+        item["images"] = [f"https://img.alicdn.com/{i}_{n}.jpg" for n in range(rng.randint(1, 5))]
+        item["crawled_at"] = datetime.now()
+        item["is_available"] = True
+        item["tags"] = ["黑胶", "LP"]
+        items.append(item)
+    return items
+
+
+def run_legacy(items: list) -> float:
+    """Previous chain: validate, convert back, then re-validate at export"""
+    buffer = []
+    start = time.process_time()
+    for item in items:
+        validated = validate_product_item(item).to_scrapy_item()
+        buffer.append(validated)
+        if len(buffer) >= 100:
+            [VinylProductModel(**dict(entry)).to_dict() for entry in buffer]
+            buffer = []
+    return time.process_time() - start
+
+
+def run_current(items: list, output_dir: str) -> float:
+    """Current chain through the real pipeline classes"""
+    validation = DataValidationPipeline()
+    export = JsonExportPipeline(output_dir)
+    export.open_spider(None)
+    export.exporter = NullExporter(output_dir)
+
+    start = time.process_time()
+    for item in items:
+        export.process_item(validation.process_item(item, None), None)
+    export._export_batch()
+    return time.process_time() - start
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Pipeline CPU benchmark")
+    parser.add_argument("--items", type=int, default=100_000, help="Number of synthetic items")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    items = synthetic_items(args.items)
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        legacy = run_legacy(items)
+        current = run_current(items, output_dir)
+
+    print(f"\nPipeline CPU time for {args.items:,} items:")
+    for label, seconds in (("before: re-validate", legacy), ("after: carry model", current)):
+        print(f"  {label:<22} {seconds:>8.2f} s  ({seconds * 1e6 / args.items:.1f} us/item)")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Memory benchmark for buffered products
+
+Compares the memory held by a snapshot of exported product dicts with the
+same snapshot stored as compact ProductRecord objects.
+"""
+
+import argparse
+import json
+import sys
+import tracemalloc
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bench_pipeline import synthetic_items
+
+from xianyu_crawler.items import ProductRecord
+from xianyu_crawler.utils.validators import validate_product_items
+
+
+def measure(build) -> int:
+    """Bytes still allocated by the object returned from build()"""
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Buffered item memory benchmark")
+    parser.add_argument("--items", type=int, default=200_000, help="Number of synthetic items")
+    args = parser.parse_args()
+
+    # Serialize once so both sides start from freshly decoded JSON, as when
+    # reading export files back
+    models = validate_product_items(dict(item) for item in synthetic_items(args.items))
+    payload = json.dumps([ProductRecord.from_model(m).to_dict() for m in models])
+    del models
+
+    dict_bytes = measure(lambda: json.loads(payload))
+    record_bytes = measure(lambda: [ProductRecord.from_dict(d) for d in json.loads(payload)])
+
+    print(f"\nMemory held by {args.items:,} buffered products:")
+    print(
+        f"  dicts:          {dict_bytes / 2**20:>8.1f} MiB  "
+        f"({dict_bytes / args.items:.0f} B/item)"
+    )
+    print(
+        f"  ProductRecord:  {record_bytes / 2**20:>8.1f} MiB  "
+        f"({record_bytes / args.items:.0f} B/item)"
+    )
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark for JSON serialization backends and export compression
+
+Reports serialize/deserialize throughput for the stdlib and orjson backends
+(pretty and compact) and on-disk size for plain, gzip and zstd exports.
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bench_pipeline import synthetic_items
+
+from xianyu_crawler.items import ProductRecord
+from xianyu_crawler.storage import serialization
+from xianyu_crawler.storage.serialization import json_filename, read_json, write_json
+from xianyu_crawler.utils.validators import validate_product_items
+
+
+def export_envelope(count: int) -> dict:
+    """Export data structure as written by JsonExporter"""
+    models = validate_product_items(dict(item) for item in synthetic_items(count))
+    items = [ProductRecord.from_model(m).to_dict() for m in models]
+    return {"export_time": "2026-01-01T00:00:00", "total": len(items), "data": items}
+
+
+def throughput(label: str, dump, load, data: dict, repeat: int):
+    """Time serialize and deserialize for one backend configuration"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        encoded = dump(data)
+    dump_seconds = (time.perf_counter() - start) / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        load(encoded)
+    load_seconds = (time.perf_counter() - start) / repeat
+
+    mib = len(encoded) / 2**20
+    print(
+        f"  {label:<22} {mib / dump_seconds:>8.1f} MiB/s dump  "
+        f"{mib / load_seconds:>8.1f} MiB/s load  {len(encoded):>12,} bytes"
+    )
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="JSON serialization benchmark")
+    parser.add_argument("--items", type=int, default=20_000, help="Number of synthetic items")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions per measurement")
+    args = parser.parse_args()
+
+    data = export_envelope(args.items)
+
+    print(f"\nSerialization of {args.items:,} items:")
+    throughput(
+        "stdlib indent=2",
+        lambda d: json.dumps(d, indent=2, ensure_ascii=False).encode("utf-8"),
+        json.loads,
+        data,
+        args.repeat,
+    )
+    throughput(
+        "stdlib compact",
+        lambda d: json.dumps(d, separators=(",", ":"), ensure_ascii=False).encode("utf-8"),
+        json.loads,
+        data,
+        args.repeat,
+    )
+    if serialization.orjson is not None:
+        orjson = serialization.orjson
+        throughput(
+            "orjson indent=2",
+            lambda d: orjson.dumps(d, option=orjson.OPT_INDENT_2),
+            orjson.loads,
+            data,
+            args.repeat,
+        )
+        throughput("orjson compact", orjson.dumps, orjson.loads, data, args.repeat)
+    else:
+        print("  orjson not installed, skipped")
+
+    print("\nOn-disk size (compact unless noted):")
+    compressions = [None, "gzip"]
+    if serialization.zstandard is not None:
+        compressions.append("zstd")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pretty_path = Path(tmp) / "pretty.json"
+        write_json(pretty_path, data, pretty=True)
+        print(f"  {'pretty .json':<22} {pretty_path.stat().st_size:>12,} bytes")
+
+        for compression in compressions:
+            path = Path(tmp) / json_filename("export", compression)
+            start = time.perf_counter()
+            write_json(path, data)
+            write_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            read_json(path)
+            read_seconds = time.perf_counter() - start
+            print(
+                f"  {path.name:<22} {path.stat().st_size:>12,} bytes  "
+                f"write {write_seconds * 1000:.0f} ms  read {read_seconds * 1000:.0f} ms"
+            )
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark for album title normalization
+
+Loads the titles from the stored seller snapshot files in output/ and
+reports normalizations per second for the legacy per-character/per-keyword
+str.replace loop and for TitleNormalizer (cold and warm cache), and checks
+that both produce the same result for every title.
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from xianyu_crawler.utils.titles import DEFAULT_KEYWORDS, PUNCTUATION, TitleNormalizer
+
+OUTPUT_DIR = Path(__file__).parent.parent / "output"
+
+
+def legacy_normalize(title: str) -> str:
+    """Previous skills/xianyu_compare.normalize_title implementation"""
+    title = title.lower()
+    for c in PUNCTUATION:
+        title = title.replace(c, " ")
+    title = re.sub(r"\s+", " ", title)
+    for kw in DEFAULT_KEYWORDS:
+        title = title.replace(kw, "")
+    return title.strip()
+
+
+def snapshot_titles(path: Path) -> list:
+    """Titles from a seller snapshot (products/data/albums layouts)"""
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return []
+    if not isinstance(data, dict):
+        return []
+
+    titles = []
+    for key in ("products", "data", "albums"):
+        for entry in data.get(key) or []:
+            title = entry.get("title") if isinstance(entry, dict) else entry
+            if isinstance(title, str):
+                titles.append(title)
+    return titles
+
+
+def rate(normalize, titles: list, repeat: int) -> float:
+    """Normalizations per second"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for title in titles:
+            normalize(title)
+    return len(titles) * repeat / (time.perf_counter() - start)
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Title normalization benchmark")
+    parser.add_argument("--snapshots", default=str(OUTPUT_DIR), help="Snapshot directory")
+    parser.add_argument("--repeat", type=int, default=200, help="Passes over all titles")
+    args = parser.parse_args()
+
+    files = sorted(Path(args.snapshots).glob("*.json"))
+    titles = [title for path in files for title in snapshot_titles(path)]
+    if not titles:
+        print(f"No titles found in {args.snapshots}")
+        return
+
+    normalizer = TitleNormalizer()
+    mismatches = [t for t in titles if legacy_normalize(t) != normalizer.normalize(t)]
+
+    print(f"\nTitle normalization ({len(titles):,} titles from {len(files)} files):")
+    print(f"  legacy str.replace loop: {rate(legacy_normalize, titles, args.repeat):>12,.0f} /s")
+
+    cold = TitleNormalizer(cache_size=0)
+    print(f"  regex (no cache):        {rate(cold.normalize, titles, args.repeat):>12,.0f} /s")
+
+    warm = TitleNormalizer()
+    warm.normalize_many(titles)
+    print(f"  memoized (warm cache):   {rate(warm.normalize, titles, args.repeat):>12,.0f} /s")
+
+    print(f"  mismatches vs legacy:    {len(mismatches)}")
+    for title in mismatches[:5]:
+        print(f"    {title!r}: {legacy_normalize(title)!r} != {normalizer.normalize(title)!r}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
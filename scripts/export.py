@@ -5,7 +5,6 @@ Provides CLI for exporting scraped data to various formats
 """
 
 import argparse
-import json
 import sys
 from datetime import datetime
 from pathlib import Path
@@ -13,41 +12,48 @@ from pathlib import Path
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from loguru import logger
-
-from xianyu_crawler.settings import JSON_OUTPUT_DIR
+from xianyu_crawler.settings import (
+    CACHE_DIR,
+    JSON_COMPRESSION,
+    JSON_OUTPUT_DIR,
+    PARQUET_OUTPUT_DIR,
+)
+from xianyu_crawler.storage.aggregates import ExportAggregateCache
+from xianyu_crawler.storage.columnar_export import ColumnarExporter
 from xianyu_crawler.storage.json_export import JsonExporter
-from xianyu_crawler.storage.dedup import filter_duplicates, merge_and_deduplicate
+from xianyu_crawler.storage.query import ProductIndex, build_query
+from xianyu_crawler.storage.dedup import merge_and_deduplicate
+from xianyu_crawler.storage.segments import compact_segments
+from xianyu_crawler.storage.json_stream import read_records
 
 
 def export_latest():
-    """Export latest data to JSON"""
+    """Show the latest export (all segments of the latest run), answered from the export index"""
     exporter = JsonExporter(str(JSON_OUTPUT_DIR))
-    stats = exporter.get_stats()
+    entries = exporter.manifest.latest_run()
 
     print("\n" + "=" * 60)
     print("  Xianyu Crawler - Latest Export")
     print("=" * 60)
 
-    if stats["latest_file"]:
-        latest_path = stats["latest_file"]["path"]
-        modified = stats["latest_file"]["modified"]
-        size = stats["latest_file"]["size_bytes"]
-
-        print(f"\nLatest export file: {latest_path}")
-        print(f"Modified: {modified}")
-        print(f"Size: {size:,} bytes")
-
-        # Show preview
-        with open(latest_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        print(f"\nTotal items: {data.get('total', 0)}")
-        print(f"Export time: {data.get('export_time', 'N/A')}")
-
-        if data.get("data"):
+    if entries:
+        if len(entries) == 1:
+            print(f"\nLatest export file: {entries[0]['path']}")
+        else:
+            run = entries[0]["run"] or "unknown"
+            print(f"\nLatest export: run {run} ({len(entries)} segments)")
+            print(f"  {Path(entries[0]['path']).name} ... {Path(entries[-1]['path']).name}")
+        print(f"Modified: {entries[-1]['modified']}")
+        print(f"Size: {sum(entry['size'] for entry in entries):,} bytes")
+
+        print(f"\nTotal items: {sum(entry['items'] for entry in entries)}")
+        print(f"Export time: {entries[0]['export_time']}")
+
+        # Show preview, read at the offsets recorded in the index
+        preview = exporter.manifest.preview(entries[0], 3)
+        if preview:
             print("\nPreview of first 3 items:")
-            for i, item in enumerate(data["data"][:3], 1):
+            for i, item in enumerate(preview, 1):
                 print(f"\n  {i}. {item.get('title', 'N/A')}")
                 print(f"     Price: ¥{item.get('price', 0)}")
                 print(f"     Seller: {item.get('seller_name', 'N/A')}")
@@ -57,37 +63,43 @@ def export_latest():
     print("=" * 60 + "\n")
 
 
-def export_filtered(min_price: float = None, max_price: float = None, min_want_count: int = None):
+def export_filtered(
+    min_price: float = None,
+    max_price: float = None,
+    min_want_count: int = None,
+    output_format: str = "json",
+    seller: str = None,
+    condition: str = None,
+    since: datetime = None,
+):
     """Export filtered data"""
     exporter = JsonExporter(str(JSON_OUTPUT_DIR))
 
-    # Get latest data
-    stats = exporter.get_stats()
-    if not stats["latest_file"]:
+    # Get latest data: every segment of the latest run, or the latest file
+    entries = exporter.manifest.latest_run()
+    if not entries:
         print("No data to export")
         return
 
-    with open(stats["latest_file"]["path"], "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    items = data.get("data", [])
+    items = [item for entry in entries for item in read_records(entry["path"])]
 
-    # Apply filters
-    filtered_items = items
-    if min_price is not None:
-        filtered_items = [i for i in filtered_items if i.get("price", 0) >= min_price]
-    if max_price is not None:
-        filtered_items = [i for i in filtered_items if i.get("price", float("inf")) <= max_price]
-    if min_want_count is not None:
-        filtered_items = [i for i in filtered_items if i.get("want_count", 0) >= min_want_count]
+    # Answer all filters from indexes in one pass
+    filters = {
+        "min_price": min_price,
+        "max_price": max_price,
+        "min_want_count": min_want_count,
+        "seller": seller,
+        "condition": condition,
+        "since": since,
+    }
+    filtered_items = build_query(ProductIndex(items), **filters).results()
 
     # Export
-    output_path = exporter.export_filtered(
-        items,
-        min_price=min_price,
-        max_price=max_price,
-        min_want_count=min_want_count,
-    )
+    if output_format == "parquet":
+        ColumnarExporter(str(PARQUET_OUTPUT_DIR)).export_items(filtered_items)
+        output_path = PARQUET_OUTPUT_DIR
+    else:
+        output_path = exporter.export_results(filtered_items, filters)
 
     print(f"\nExported {len(filtered_items)} filtered items to: {output_path}")
     print(f"  (from {len(items)} total items)")
@@ -110,46 +122,52 @@ def export_stats():
         for file_path in stats["daily_files"][-7:]:  # Last 7 days
             print(f"  - {Path(file_path).name}")
 
-    # Calculate aggregate stats from all files
-    total_items = 0
-    all_items = []
-
-    for json_file in Path(stats["output_dir"]).glob("*.json"):
-        try:
-            with open(json_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                file_items = data.get("data", [])
-                total_items += len(file_items)
-                all_items.extend(file_items)
-        except Exception as e:
-            logger.warning(f"Error reading {json_file}: {e}")
-
-    print(f"\nTotal items across all files: {total_items}")
+    # Aggregate stats are cached per file; only files that are new or changed
+    # according to the export index are read
+    aggregates = ExportAggregateCache(str(CACHE_DIR), top_k=5)
+    totals = aggregates.refresh_from_index(stats["output_dir"], exporter.manifest.files())
 
-    # Remove duplicates
-    unique_items = filter_duplicates(all_items)
-    print(f"Unique items (after deduplication): {len(unique_items)}")
+    print(f"\nTotal items across all files: {totals['items']}")
+    print(f"Unique items (after deduplication): {totals['unique_items']}")
+    if totals["scanned_files"]:
+        print(f"  ({totals['scanned_files']} new or changed file(s) scanned)")
 
-    if unique_items:
-        # Calculate statistics
-        prices = [item.get("price", 0) for item in unique_items if item.get("price")]
-
-        if prices:
+    if totals["unique_items"]:
+        if totals["price_count"]:
             print(f"\nPrice statistics:")
-            print(f"  Min: ¥{min(prices):.2f}")
-            print(f"  Max: ¥{max(prices):.2f}")
-            print(f"  Avg: ¥{sum(prices) / len(prices):.2f}")
+            print(f"  Min: ¥{totals['price_min']:.2f}")
+            print(f"  Max: ¥{totals['price_max']:.2f}")
+            print(f"  Avg: ¥{totals['price_sum'] / totals['price_count']:.2f}")
 
         # Top items by want count
-        top_wanted = sorted(unique_items, key=lambda x: x.get("want_count", 0), reverse=True)[:5]
         print(f"\nTop 5 most wanted items:")
-        for i, item in enumerate(top_wanted, 1):
-            print(f"  {i}. {item.get('title', 'N/A')}")
-            print(f"     Wanted: {item.get('want_count', 0)} | Price: ¥{item.get('price', 0)}")
+        for i, item in enumerate(totals["top_wanted"], 1):
+            print(f"  {i}. {item.get('title') or 'N/A'}")
+            print(f"     Wanted: {item.get('want_count') or 0} | Price: ¥{item.get('price') or 0}")
 
     print("=" * 60 + "\n")
 
 
+def export_compact(include_today: bool = False):
+    """Merge export segments into daily partitions"""
+    written = compact_segments(
+        str(JSON_OUTPUT_DIR), include_today=include_today, compression=JSON_COMPRESSION
+    )
+
+    if written:
+        print(f"\nCompacted {len(written)} daily partition(s):")
+        for path in written:
+            print(f"  - {path.name}")
+    else:
+        print("\nNothing to compact.")
+
+
+def export_reindex():
+    """Rebuild the export index from the files in the output directory"""
+    files = JsonExporter(str(JSON_OUTPUT_DIR)).manifest.rebuild()
+    print(f"\nIndexed {len(files)} export files.")
+
+
 def main():
     """Main entry point"""
     parser = argparse.ArgumentParser(
@@ -166,8 +184,20 @@ Examples:
   # Export items with at least 10 wants
   python scripts/export.py --filter --min-want-count 10
 
+  # Export brand-new items from one seller crawled since a date
+  python scripts/export.py --filter --seller 唱片小店 --condition 全新 --since 2026-02-01
+
+  # Write filtered items to the partitioned Parquet dataset
+  python scripts/export.py --filter --min-price 100 --format parquet
+
   # Show statistics
   python scripts/export.py --stats
+
+  # Merge past days' segments into daily_export_YYYYMMDD files
+  python scripts/export.py --compact
+
+  # Rebuild the export index after adding or removing files by hand
+  python scripts/export.py --reindex
         """,
     )
 
@@ -176,16 +206,52 @@ Examples:
     parser.add_argument("--min-price", type=float, help="Minimum price filter")
     parser.add_argument("--max-price", type=float, help="Maximum price filter")
     parser.add_argument("--min-want-count", type=int, help="Minimum want count filter")
+    parser.add_argument("--seller", help="Seller ID or seller name filter")
+    parser.add_argument("--condition", help="Item condition filter (e.g. 全新)")
+    parser.add_argument(
+        "--since",
+        type=datetime.fromisoformat,
+        help="Only items crawled at or after this date/time (YYYY-MM-DD[THH:MM])",
+    )
     parser.add_argument("--stats", action="store_true", help="Show export statistics")
+    parser.add_argument(
+        "--compact", action="store_true", help="Merge export segments into daily partitions"
+    )
+    parser.add_argument(
+        "--include-today",
+        action="store_true",
+        help="With --compact, also merge today's segments",
+    )
+    parser.add_argument(
+        "--reindex", action="store_true", help="Rebuild the export index from the directory"
+    )
+    parser.add_argument(
+        "--format",
+        choices=["json", "parquet"],
+        default="json",
+        help="Output format for --filter (parquet writes to PARQUET_OUTPUT_DIR)",
+    )
 
     args = parser.parse_args()
 
     if args.latest:
         export_latest()
     elif args.filter:
-        export_filtered(args.min_price, args.max_price, args.min_want_count)
+        export_filtered(
+            args.min_price,
+            args.max_price,
+            args.min_want_count,
+            args.format,
+            seller=args.seller,
+            condition=args.condition,
+            since=args.since,
+        )
     elif args.stats:
         export_stats()
+    elif args.compact:
+        export_compact(include_today=args.include_today)
+    elif args.reindex:
+        export_reindex()
     else:
         # Default: show latest
         export_latest()
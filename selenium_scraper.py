@@ -1,10 +1,21 @@
 """
 Xianyu Vinyl Records Scraper using Selenium
+
+Usage:
+    python selenium_scraper.py                          # interactive, visible browser
+    python selenium_scraper.py --batch URL_OR_SELLER... # headless batch mode
+    python selenium_scraper.py --batch-file urls.txt --workers 4
 """
+import argparse
 import json
+import queue
+import re
+import threading
 import time
 import pathlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from urllib.parse import quote
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
@@ -19,232 +30,464 @@ OUTPUT_DIR = pathlib.Path(__file__).parent / "output"
 OUTPUT_DIR.mkdir(exist_ok=True)
 
 # Xianyu search URL for vinyl records
-SEARCH_URL = "https://www.goofish.com/search?q=黑胶唱片"
+BASE_URL = "https://www.goofish.com"
+SEARCH_URL = f"{BASE_URL}/search?q=黑胶唱片"
+
+# Counts product cards (links to item pages) currently in the DOM
+COUNT_PRODUCTS_JS = """
+let count = 0;
+for (const a of document.getElementsByTagName("a")) {
+  const href = a.href;
+  if (href && (href.includes("/item/") || href.includes("itemId="))) count++;
+}
+return count;
+"""
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+
+
+def chromedriver_path():
+    """
+    ChromeDriver binary path, resolved once per process
+
+    ChromeDriverManager().install() checks for the latest driver release on
+    every call; batch workers share the first result instead.
+    """
+    global _driver_path
+    with _driver_path_lock:
+        if _driver_path is None:
+            _driver_path = ChromeDriverManager().install()
+        return _driver_path
 
 
 def setup_driver(headless=False):
     """Setup Chrome driver with options"""
     options = Options()
     if headless:
-        options.add_argument("--headless")
+        options.add_argument("--headless=new")
     options.add_argument("--no-sandbox")
     options.add_argument("--disable-dev-shm-usage")
     options.add_argument("--disable-blink-features=AutomationControlled")
     options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36")
 
-    # Use webdriver_manager to auto-download ChromeDriver
-    service = Service(ChromeDriverManager().install())
+    # Use webdriver_manager to auto-download ChromeDriver (cached per process)
+    service = Service(chromedriver_path())
     driver = webdriver.Chrome(service=service, options=options)
     driver.set_window_size(1920, 1080)
     return driver
 
 
-def extract_products(driver):
-    """Extract product data from the page"""
+# Product records are collected in the browser with one execute_script call
+# instead of one WebDriver round trip per element and attribute. Strategy
+# "links" reads product links and their parent's text, "blocks" reads divs
+# whose text contains a price; "auto" falls back to blocks when no link has
+# any text. Titles and prices are parsed on the Python side.
+EXTRACT_PRODUCTS_JS = """
+const [strategy, maxLinks, maxBlocks] = arguments;
+const text = (el) => (el && el.innerText) || "";
+const hasLine = (s) => s.split("\\n").some((line) => line.trim());
+
+const links = [];
+let linkCount = 0;
+if (strategy !== "blocks") {
+  for (const a of document.getElementsByTagName("a")) {
+    const href = a.href;
+    if (!href || !(href.includes("/item/") || href.includes("itemId="))) continue;
+    if (linkCount++ < maxLinks) {
+      links.push({href: href, text: text(a).trim(), parent_text: text(a.parentElement)});
+    }
+  }
+}
+
+const blocks = [];
+const usable = links.some((r) => r.text || hasLine(r.parent_text));
+if (strategy === "blocks" || (strategy === "auto" && !usable)) {
+  const divs = document.getElementsByTagName("div");
+  for (let i = 0; i < divs.length && i < maxBlocks; i++) {
+    const a = divs[i].querySelector("a");
+    blocks.push({text: text(divs[i]).trim(), href: a ? a.href : null});
+  }
+}
+
+return {body_text: text(document.body), link_count: linkCount, links: links, blocks: blocks};
+"""
+
+PRICE_PATTERN = re.compile(r"[¥￥]\s*(\d+\.?\d*)")
+
+
+def _text_lines(text):
+    return [line.strip() for line in text.split("\n") if line.strip()]
+
+
+def product_from_link(record):
+    """Build a product from a link record (href, text, parent_text)"""
+    product = {"link": record["href"]}
+    if record["text"]:
+        product["title"] = record["text"]
+
+    parent_text = record["parent_text"]
+    price_match = PRICE_PATTERN.search(parent_text)
+    if price_match:
+        product["price"] = price_match.group(0)
+
+    if not product.get("title"):
+        lines = _text_lines(parent_text)
+        if lines:
+            product["title"] = lines[0]
+
+    return product
+
+
+def product_from_block(record):
+    """Build a product from a price block record (text, href); None if it has no price"""
+    block_text = record["text"]
+    if len(block_text) < 10 or len(block_text) > 500:
+        return None
+
+    price_match = PRICE_PATTERN.search(block_text)
+    if not price_match:
+        return None
+
+    product = {"price": price_match.group(0)}
+    for line in _text_lines(block_text):
+        if not line.startswith("¥") and not line.startswith("￥") and len(line) > 3:
+            product["title"] = line
+            break
+    if record["href"]:
+        product["link"] = record["href"]
+    return product
+
+
+def extract_products(
+    driver, strategy="auto", max_links=30, max_blocks=100, max_block_products=20, verbose=True
+):
+    """
+    Extract product data from the page
+
+    Args:
+        driver: WebDriver with the page loaded
+        strategy: "links", "blocks" or "auto" (blocks only when links yield nothing)
+        max_links: Maximum number of product links to use
+        max_blocks: Maximum number of divs to inspect for prices
+        max_block_products: Maximum number of products taken from price blocks
+        verbose: Print the links and products found
+
+    Returns:
+        List of product dictionaries (link, title, price)
+    """
+    started = time.perf_counter()
+    payload = driver.execute_script(EXTRACT_PRODUCTS_JS, strategy, max_links, max_blocks)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    log = print if verbose else (lambda *args, **kwargs: None)
+
+    body_text = payload["body_text"]
+    log(f"Page body text length: {len(body_text)}")
+    log(
+        f"Collected {payload['link_count']} links and {len(payload['blocks'])} blocks "
+        f"in {elapsed_ms:.1f} ms"
+    )
+
     products = []
 
-    # Get page text for analysis
-    body_text = driver.find_element(By.TAG_NAME, "body").text
-    print(f"Page body text length: {len(body_text)}")
-
-    # Save page source for debugging
-    with open(OUTPUT_DIR / "debug_page.html", "w", encoding="utf-8") as f:
-        f.write(driver.page_source)
-    print("Page source saved to debug_page.html")
-
-    # Also save the rendered text
-    with open(OUTPUT_DIR / "page_text.txt", "w", encoding="utf-8") as f:
-        f.write(body_text)
-    print("Page text saved to page_text.txt")
-
-    # Try multiple strategies to find products
-    print("\n=== Strategy 1: Looking for links with item/product in href ===")
-    all_links = driver.find_elements(By.TAG_NAME, "a")
-    product_links = []
-    for link in all_links:
-        href = link.get_attribute("href")
-        if href and ("/item/" in href or "itemId=" in href):
-            product_links.append(link)
-
-    print(f"Found {len(product_links)} product links")
-    for i, link in enumerate(product_links[:10]):
-        print(f"  Link {i}: {link.get_attribute('href')}")
-
-    if product_links:
-        print("\n=== Extracting from product links ===")
-        for i, link in enumerate(product_links[:30]):
-            try:
-                product = {}
-                product["link"] = link.get_attribute("href")
-
-                # Get text from link or nearby elements
-                link_text = link.text.strip()
-                if link_text:
-                    product["title"] = link_text
-
-                # Look for price in parent/ancestor elements
-                try:
-                    parent = link.find_element(By.XPATH, "..")
-                    parent_text = parent.text
-
-                    # Extract price
-                    import re
-                    price_match = re.search(r'[¥￥]\s*(\d+\.?\d*)', parent_text)
-                    if price_match:
-                        product["price"] = price_match.group(0)
-
-                    # If no title from link, get from parent
-                    if not product.get("title"):
-                        lines = [l.strip() for l in parent_text.split("\n") if l.strip()]
-                        if lines:
-                            product["title"] = lines[0]
-                except:
-                    pass
-
-                if product.get("title"):
-                    products.append(product)
-                    print(f"Product {i}: {product.get('title', 'N/A')} - {product.get('price', 'N/A')}")
+    if strategy in ("auto", "links"):
+        log("\n=== Strategy 1: Looking for links with item/product in href ===")
+        product_links = payload["links"]
+        log(f"Found {payload['link_count']} product links")
+        for i, record in enumerate(product_links[:10]):
+            log(f"  Link {i}: {record['href']}")
 
-            except Exception as e:
-                continue
+        for i, record in enumerate(product_links):
+            product = product_from_link(record)
+            if product.get("title"):
+                products.append(product)
+                log(f"Product {i}: {product.get('title', 'N/A')} - {product.get('price', 'N/A')}")
 
     # If still no products, try looking at all divs with text containing prices
+    if strategy == "blocks" or (strategy == "auto" and not products):
+        log("\n=== Strategy 2: Looking for price elements ===")
+        for record in payload["blocks"]:
+            product = product_from_block(record)
+            if product and product.get("title"):
+                products.append(product)
+                log(f"Product: {product.get('title')} - {product.get('price')}")
+
+                if len(products) >= max_block_products:
+                    break
+
+    return products
+
+
+
+
+def count_products(driver):
+    """Number of product links currently in the DOM"""
+    return driver.execute_script(COUNT_PRODUCTS_JS)
+
+
+def wait_for_products(driver, timeout=20):
+    """
+    Wait until product links or prices are rendered
+
+    Returns:
+        True if product data appeared within the timeout
+    """
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.25).until(
+            lambda d: count_products(d) > 0 or "¥" in d.find_element(By.TAG_NAME, "body").text
+        )
+        return True
+    except TimeoutException:
+        return False
+
+
+def scroll_until_stable(driver, settle_timeout=4, max_rounds=30):
+    """
+    Scroll to the bottom until no new product cards load
+
+    Each round scrolls once and waits up to settle_timeout seconds for the
+    product count to grow; the first round without growth ends the loop.
+
+    Returns:
+        Final number of product links
+    """
+    count = count_products(driver)
+    for _ in range(max_rounds):
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        try:
+            WebDriverWait(driver, settle_timeout, poll_frequency=0.25).until(
+                lambda d: count_products(d) > count
+            )
+        except TimeoutException:
+            break
+        count = count_products(driver)
+    return count
+
+
+def write_debug_artifacts(driver, name):
+    """Save the page source and rendered text of a failed page"""
+    html_file = OUTPUT_DIR / f"debug_{name}.html"
+    text_file = OUTPUT_DIR / f"page_text_{name}.txt"
+    try:
+        html_file.write_text(driver.page_source, encoding="utf-8")
+        text_file.write_text(driver.find_element(By.TAG_NAME, "body").text, encoding="utf-8")
+        print(f"Debug artifacts saved to {html_file.name} and {text_file.name}")
+    except Exception as e:
+        print(f"Could not save debug artifacts: {e}")
+
+
+def resolve_target(target):
+    """Turn a seller userId or search keyword into a URL; URLs pass through"""
+    if target.startswith(("http://", "https://")):
+        return target
+    if target.isdigit():
+        return f"{BASE_URL}/personal?userId={target}"
+    return f"{BASE_URL}/search?q={quote(target)}"
+
+
+def scrape_page(driver, url, name="page", verbose=True):
+    """
+    Load a page, scroll until no new cards appear and extract its products
+
+    Debug artifacts are written only when the page fails to load or yields
+    no products.
+
+    Args:
+        driver: WebDriver to use
+        url: Search or seller page URL
+        name: Suffix for debug artifact file names
+        verbose: Print the links and products found
+
+    Returns:
+        List of product dictionaries
+    """
+    try:
+        driver.get(url)
+        if not wait_for_products(driver):
+            raise TimeoutException(f"No product data on {url}")
+        scroll_until_stable(driver)
+        products = extract_products(driver, verbose=verbose)
+    except Exception:
+        write_debug_artifacts(driver, name)
+        raise
+
     if not products:
-        print("\n=== Strategy 2: Looking for price elements ===")
-        import re
-        all_divs = driver.find_elements(By.TAG_NAME, "div")
+        write_debug_artifacts(driver, name)
+    return products
+
 
-        for div in all_divs[:100]:  # Check first 100 divs
+def _batch_worker(worker_id, urls, results, headless):
+    """Scrape URLs from the queue with one driver until the queue is empty"""
+    driver = setup_driver(headless=headless)
+    try:
+        while True:
             try:
-                div_text = div.text.strip()
-                if len(div_text) < 10 or len(div_text) > 500:
-                    continue
-
-                # Look for price pattern
-                price_match = re.search(r'[¥￥]\s*(\d+\.?\d*)', div_text)
-                if price_match:
-                    product = {}
-                    product["price"] = price_match.group(0)
-
-                    # Extract title (first line that's not the price)
-                    lines = [l.strip() for l in div_text.split("\n") if l.strip()]
-                    for line in lines:
-                        if not line.startswith("¥") and not line.startswith("￥") and len(line) > 3:
-                            product["title"] = line
-                            break
-
-                    # Try to find link
-                    try:
-                        link = div.find_element(By.TAG_NAME, "a")
-                        product["link"] = link.get_attribute("href")
-                    except:
-                        pass
-
-                    if product.get("title"):
-                        products.append(product)
-                        print(f"Product: {product.get('title')} - {product.get('price')}")
-
-                        if len(products) >= 20:
-                            break
-            except:
-                continue
+                index, url = urls.get_nowait()
+            except queue.Empty:
+                return
 
-    return products
+            started = time.perf_counter()
+            result = {"source_url": url, "total": 0, "data": [], "error": None}
+            try:
+                result["data"] = scrape_page(driver, url, name=f"batch_{index}", verbose=False)
+                result["total"] = len(result["data"])
+            except Exception as e:
+                result["error"] = str(e)
+            result["seconds"] = round(time.perf_counter() - started, 2)
+            results[index] = result
+
+            status = f"{result['total']} products"
+            if result["error"]:
+                status = f"error: {result['error']}"
+            print(f"[worker {worker_id}] {url}: {status} ({result['seconds']}s)")
+    finally:
+        driver.quit()
 
 
-def main():
-    """Main scraping function"""
+def scrape_batch(urls, workers=2, headless=True):
+    """
+    Scrape a list of URLs with a pool of reused drivers
+
+    Args:
+        urls: Search or seller page URLs
+        workers: Number of parallel drivers
+        headless: Run Chrome without a window
+
+    Returns:
+        Results in input order (source_url, total, data, error, seconds)
+    """
+    pending = queue.Queue()
+    for index, url in enumerate(urls):
+        pending.put((index, url))
+
+    # Resolve the driver binary before the workers start
+    chromedriver_path()
+
+    results = [None] * len(urls)
+    workers = max(1, min(workers, len(urls)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_batch_worker, worker_id, pending, results, headless)
+            for worker_id in range(workers)
+        ]
+        for future in futures:
+            future.result()
+    return results
+
+
+def wait_for_login(driver, max_wait=120):
+    """Wait for a QR code login in the visible browser if a login page is shown"""
+    page_text = driver.find_element(By.TAG_NAME, "body").text
+    login_keywords = ["login", "scan"]
+    if not any(keyword in page_text.lower() for keyword in login_keywords):
+        return
+
+    print("\n" + "=" * 60)
+    print("Login page detected! Please scan QR code in browser window")
+    print("=" * 60)
+    print("\n1. Open Taobao or Alipay APP")
+    print("2. Click 'Scan' function")
+    print("3. Scan the QR code shown in browser")
+    print("4. Confirm login on your phone")
+    print(f"\nWaiting for login... (max {max_wait} seconds)")
+    print("=" * 60)
+
+    def logged_in(d):
+        # Product listings or search interface shown, and no longer on the login page
+        current_lower = d.find_element(By.TAG_NAME, "body").text.lower()
+        login_success_keywords = ["search", "商品", "price", "¥", "item", "card"]
+        return any(keyword in current_lower for keyword in login_success_keywords) and (
+            "scan" not in current_lower and "qr" not in current_lower
+        )
+
+    started = time.perf_counter()
+    try:
+        WebDriverWait(driver, max_wait, poll_frequency=2).until(logged_in)
+        print(f"\n[OK] Login successful! (Time: {time.perf_counter() - started:.0f} seconds)")
+        wait_for_products(driver)
+    except TimeoutException:
+        print("\n[WARNING] Login timeout, will continue scraping...")
+
+
+def save_results(result, prefix="xianyu_vinyl"):
+    """Write a result document to the output directory"""
+    output_file = OUTPUT_DIR / f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    return output_file
+
+
+def run_batch(targets, workers, headless):
+    """Batch mode: scrape every target and save one combined result file"""
+    urls = [resolve_target(target) for target in targets]
+    print(f"Batch scraping {len(urls)} pages with {min(workers, len(urls))} workers...")
+
+    started = time.perf_counter()
+    results = scrape_batch(urls, workers=workers, headless=headless)
+    elapsed = time.perf_counter() - started
+
+    products = []
+    for result in results:
+        for product in result["data"]:
+            products.append({**product, "source_url": result["source_url"]})
+
+    output_file = save_results(
+        {
+            "export_time": datetime.now().isoformat(),
+            "total": len(products),
+            "sources": [{k: v for k, v in r.items() if k != "data"} for r in results],
+            "data": products,
+        },
+        prefix="xianyu_batch",
+    )
+
+    failed = sum(1 for r in results if r["error"])
+    print("\n" + "=" * 50)
+    print(f"Batch complete in {elapsed:.1f}s: {len(products)} products, {failed} failed pages")
+    print(f"Results saved to: {output_file}")
+    print("=" * 50)
+
+
+def run_interactive(url, headless):
+    """Interactive mode: one page in a (visible) browser, with QR code login"""
     print("Starting Xianyu Vinyl Records Scraper...")
     print("=" * 50)
 
-    # Setup driver (non-headless for debugging)
-    driver = setup_driver(headless=False)
+    driver = setup_driver(headless=headless)
 
     try:
-        print(f"Navigating to: {SEARCH_URL}")
-        driver.get(SEARCH_URL)
-
-        # Wait for page to load
-        print("Waiting for page to load...")
-        time.sleep(8)  # Give more time for React to render and load data
+        print(f"Navigating to: {url}")
+        driver.get(url)
 
         # Wait for specific elements that indicate data has loaded
         print("Waiting for product data to load...")
-        try:
-            # Wait for any text content with price or items
-            WebDriverWait(driver, 20).until(
-                lambda d: "¥" in d.find_element(By.TAG_NAME, "body").text or
-                         "商品" in d.find_element(By.TAG_NAME, "body").text
-            )
+        if wait_for_products(driver):
             print("Product data detected!")
-        except:
+        else:
             print("No product data detected within timeout, continuing anyway...")
 
-        # Check if login is required and wait for QR code scan
-        page_text = driver.find_element(By.TAG_NAME, "body").text
-        login_keywords = ["login", "scan"]
-        if any(keyword in page_text.lower() for keyword in login_keywords):
-            print("\n" + "=" * 60)
-            print("Login page detected! Please scan QR code in browser window")
-            print("=" * 60)
-            print("\n1. Open Taobao or Alipay APP")
-            print("2. Click 'Scan' function")
-            print("3. Scan the QR code shown in browser")
-            print("4. Confirm login on your phone")
-            print("\nWaiting for login... (max 120 seconds)")
-            print("=" * 60)
-
-            # Wait for login to complete - check for login success indicators
-            max_wait = 120  # 2 minutes
-            wait_interval = 2
-            elapsed = 0
-
-            while elapsed < max_wait:
-                time.sleep(wait_interval)
-                elapsed += wait_interval
-
-                # Check if login was successful
-                current_text = driver.find_element(By.TAG_NAME, "body").text
-                # Check for product listings or search interface
-                login_success_keywords = ["search", "商品", "price", "¥", "item", "card"]
-                if any(keyword in current_text.lower() for keyword in login_success_keywords):
-                    # Also verify no longer on login page
-                    current_lower = current_text.lower()
-                    if "scan" not in current_lower and "qr" not in current_lower:
-                        print(f"\n[OK] Login successful! (Time: {elapsed} seconds)")
-                        break
-
-                # Progress indicator
-                if elapsed % 10 == 0:
-                    print(f"Waiting... ({elapsed}/{max_wait}s)")
-
-            if elapsed >= max_wait:
-                print("\n[WARNING] Login timeout, will continue scraping...")
-
-            # Extra wait after login
-            time.sleep(3)
-
-        # Scroll down to load more content
+        if not headless:
+            wait_for_login(driver)
+
+        # Scroll down until no more content loads
         print("Scrolling to load more content...")
-        for i in range(3):
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)
+        print(f"{scroll_until_stable(driver)} product links loaded")
 
         # Extract products
         print("\nExtracting product data...")
         products = extract_products(driver)
+        if not products:
+            write_debug_artifacts(driver, "page")
 
         # Save results
-        result = {
-            "export_time": datetime.now().isoformat(),
-            "total": len(products),
-            "source_url": SEARCH_URL,
-            "data": products
-        }
-
-        output_file = OUTPUT_DIR / f"xianyu_vinyl_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
+        output_file = save_results(
+            {
+                "export_time": datetime.now().isoformat(),
+                "total": len(products),
+                "source_url": url,
+                "data": products,
+            }
+        )
 
         print("\n" + "=" * 50)
         print(f"Scraping complete!")
@@ -261,13 +504,42 @@ def main():
     except Exception as e:
         print(f"Error during scraping: {e}")
         import traceback
+
         traceback.print_exc()
+        write_debug_artifacts(driver, "page")
 
     finally:
-        print("\n浏览器将在60秒后关闭，你可以查看结果...")
-        time.sleep(60)
+        if not headless:
+            print("\n浏览器将在60秒后关闭，你可以查看结果...")
+            time.sleep(60)
         driver.quit()
 
 
+def main():
+    """Main scraping function"""
+    parser = argparse.ArgumentParser(description="Xianyu vinyl records scraper (Selenium)")
+    parser.add_argument(
+        "--batch", nargs="+", metavar="TARGET", help="URLs, seller userIds or search keywords"
+    )
+    parser.add_argument("--batch-file", help="File with one batch target per line")
+    parser.add_argument("--workers", type=int, default=2, help="Parallel drivers in batch mode")
+    parser.add_argument("--url", default=SEARCH_URL, help="Page for interactive mode")
+    parser.add_argument("--headless", action="store_true", help="Interactive mode without a window")
+    parser.add_argument(
+        "--no-headless", action="store_true", help="Show browser windows in batch mode"
+    )
+    args = parser.parse_args()
+
+    targets = list(args.batch or [])
+    if args.batch_file:
+        with open(args.batch_file, encoding="utf-8") as f:
+            targets.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+
+    if targets:
+        run_batch(targets, args.workers, headless=not args.no_headless)
+    else:
+        run_interactive(args.url, headless=args.headless)
+
+
 if __name__ == "__main__":
     main()
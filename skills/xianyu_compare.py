@@ -5,14 +5,20 @@ Xianyu Vinyl Sellers Comparison Skill
 
 用法:
     python xianyu_compare.py                    # 使用默认卖家
-    python xianyu_compare.py --seller1 xxx --seller2 yyy
+    python xianyu_compare.py seller1.json seller2.json
+    python xianyu_compare.py a.json b.json c.json  # 多卖家 N×N 重叠矩阵
 """
 
-import json
-import re
+import argparse
 import sys
-from datetime import datetime
 from pathlib import Path
+from typing import Optional
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from xianyu_crawler.storage.json_stream import JsonRecordReader  # noqa: E402
+from xianyu_crawler.utils.titles import TitleIndex, normalize_title  # noqa: E402
 
 # 如果安装了 playwright，可以使用：
 # from playwright.sync_api import sync_playwright
@@ -23,32 +29,6 @@ SELLER2_ID = "1059107164"     # 梦的采摘员
 OUTPUT_DIR = Path("./output")
 
 
-def normalize_title(title: str) -> str:
-    """标准化专辑标题，去除干扰信息"""
-    title = title.lower()
-
-    # 移除特殊字符
-    for c in '·•:：,，、""''「」『』【】《（）()':
-        title = title.replace(c, ' ')
-
-    # 移除多余空格
-    title = re.sub(r'\s+', ' ', title)
-
-    # 移除常见后缀
-    keywords = [
-        '黑胶', '唱片', '专辑', '新专辑', '限量', '带独立编号', '带编',
-        '日版', '台版', 'cd', 'lp', '1lp', '2lp', '双', '三',
-        '彩胶', '紫胶', '红胶', '黄胶', '绿胶', '金胶', '灰胶', '蓝胶',
-        '白胶', '透明胶', '动画胶', '电影原声', '买家评价', '预定',
-        '现货', '粉丝更优惠', '2人小刀价', '人气第', '热销第',
-        '24小时内发布', '48小时内发布', '72小时内发布', '一周内发布'
-    ]
-    for kw in keywords:
-        title = title.replace(kw, '')
-
-    return title.strip()
-
-
 def is_same_album(title1: str, title2: str) -> bool:
     """判断两个专辑名是否相同"""
     n1 = normalize_title(title1)
@@ -63,8 +43,25 @@ def is_same_album(title1: str, title2: str) -> bool:
     return False
 
 
-def compare_sellers(seller1_data: list, seller2_data: list) -> dict:
-    """对比两个卖家的专辑"""
+def compare_sellers(
+    seller1_data: list,
+    seller2_data: list,
+    seller2_index: Optional[TitleIndex] = None,
+) -> dict:
+    """
+    对比两个卖家的专辑
+
+    每个seller1专辑与seller2中第一个尚未匹配的相同专辑配对（与逐对调用
+    is_same_album 的结果一致），但通过 TitleIndex 查找，而不是两两比较。
+
+    Args:
+        seller1_data: 卖家1的专辑标题
+        seller2_data: 卖家2的专辑标题
+        seller2_index: 卖家2的预建索引（可选，多卖家对比时复用）
+    """
+    if seller2_index is None:
+        seller2_index = TitleIndex(seller2_data)
+
     processed_s1 = set()
     processed_s2 = set()
 
@@ -72,23 +69,20 @@ def compare_sellers(seller1_data: list, seller2_data: list) -> dict:
     s1_only = []
     s2_only = []
 
+    def already_matched(pos: int) -> bool:
+        return seller2_data[pos] in processed_s2
+
     # 找出重叠和seller1独有
     for album1 in seller1_data:
         if album1 in processed_s1:
             continue
         processed_s1.add(album1)
 
-        found = False
-        for album2 in seller2_data:
-            if album2 in processed_s2:
-                continue
-            if is_same_album(album1, album2):
-                overlapping.append(album1)
-                processed_s2.add(album2)
-                found = True
-                break
-
-        if not found:
+        pos = seller2_index.first_match(album1, skip=already_matched)
+        if pos is not None:
+            overlapping.append(album1)
+            processed_s2.add(seller2_data[pos])
+        else:
             s1_only.append(album1)
 
     # 找出seller2独有
@@ -103,6 +97,55 @@ def compare_sellers(seller1_data: list, seller2_data: list) -> dict:
     }
 
 
+def compare_many(sellers: dict) -> dict:
+    """
+    多卖家 N×N 对比
+
+    每个卖家只建一次索引，每对卖家的对比与 compare_sellers 相同。
+
+    Args:
+        sellers: {卖家名: 专辑标题列表}
+
+    Returns:
+        {"sellers": 卖家名列表, "overlap": {卖家A: {卖家B: 重叠数}}}
+        对角线为卖家自身的专辑数
+    """
+    names = list(sellers)
+    indexes = {name: TitleIndex(sellers[name]) for name in names}
+    overlap = {name: {} for name in names}
+
+    for i, name1 in enumerate(names):
+        overlap[name1][name1] = len(sellers[name1])
+        for name2 in names[i + 1:]:
+            result = compare_sellers(sellers[name1], sellers[name2], indexes[name2])
+            overlap[name1][name2] = overlap[name2][name1] = len(result["overlapping"])
+
+    return {"sellers": names, "overlap": overlap}
+
+
+def load_seller_titles(path: Path) -> tuple:
+    """
+    读取卖家快照文件
+
+    支持 products/data 列表（含 title 字段）和 albums 标题列表。
+    逐条流式读取，只保留标题；损坏或被截断的快照会尽量恢复其中的记录。
+
+    Returns:
+        (卖家名, 专辑标题列表)
+    """
+    reader = JsonRecordReader(
+        path, keys=('products', 'data', 'albums'), fields=('title',), tolerant=True
+    )
+
+    titles = []
+    for entry in reader:
+        title = entry.get('title') if isinstance(entry, dict) else entry
+        if title:
+            titles.append(title)
+
+    return reader.header.get('seller') or Path(path).stem, titles
+
+
 def print_report(result: dict, seller1_name: str, seller2_name: str):
     """打印对比报告"""
     print('\n' + '=' * 40)
@@ -131,22 +174,55 @@ def print_report(result: dict, seller1_name: str, seller2_name: str):
     print('\n' + '=' * 40 + '\n')
 
 
+def print_matrix(result: dict):
+    """打印多卖家重叠矩阵"""
+    names = result["sellers"]
+
+    print('\n' + '=' * 40)
+    print('   闲鱼卖家黑胶唱片重叠矩阵')
+    print('=' * 40 + '\n')
+
+    for i, name in enumerate(names, 1):
+        print(f'  [{i}] {name}')
+    print()
+
+    # 用编号作行列标题，避免中文宽度导致错位
+    print(' ' * 6 + ''.join(f'[{i}]'.rjust(7) for i in range(1, len(names) + 1)))
+    for i, name in enumerate(names, 1):
+        row = ''.join(str(result["overlap"][name][other]).rjust(7) for other in names)
+        print(f'[{i}]'.ljust(6) + row)
+
+    print('\n' + '=' * 40 + '\n')
+
+
 def main():
     """主函数"""
-    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    parser = argparse.ArgumentParser(description='闲鱼黑胶卖家对比')
+    parser.add_argument('files', nargs='*', help='卖家快照JSON文件（2个：详细对比；多个：N×N矩阵）')
+    args = parser.parse_args()
+
+    if len(args.files) == 2:
+        name1, titles1 = load_seller_titles(args.files[0])
+        name2, titles2 = load_seller_titles(args.files[1])
+        print_report(compare_sellers(titles1, titles2), name1, name2)
+        return
+
+    if len(args.files) > 2:
+        sellers = {}
+        for path in args.files:
+            name, titles = load_seller_titles(path)
+            sellers[name if name not in sellers else f'{name} ({Path(path).name})'] = titles
+        print_matrix(compare_many(sellers))
+        return
 
-    # 读取数据文件（假设已由浏览器爬取生成）
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-
-    # 这里应该读取爬取的数据
-    # 示例：seller1_file = OUTPUT_DIR / f"seller1_{timestamp}.json"
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
     print("请先使用浏览器爬取两个卖家的数据，然后运行对比分析")
     print("\n使用方法:")
     print("1. 打开闲鱼网页并登录")
     print("2. 访问卖家页面并爬取数据")
     print("3. 保存为JSON文件")
-    print("4. 运行此脚本进行对比")
+    print("4. 运行此脚本进行对比: python xianyu_compare.py seller1.json seller2.json")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,75 @@
+"""
+Near-duplicate clusters assigned by DeduplicationPipeline
+"""
+
+import json
+
+import pytest
+from scrapy.exceptions import DropItem
+
+from xianyu_crawler.pipelines import DeduplicationPipeline
+from xianyu_crawler.storage.dedup import DeduplicationManager
+
+WALL = {
+    "product_id": "1",
+    "title": "Pink Floyd The Wall 黑胶 LP 首版",
+    "description": "全新未拆 原版进口 英国首版 1979年 带歌词内页",
+    "price": 300,
+}
+WALL_RELIST = {**WALL, "product_id": "2", "title": "【转让】Pink Floyd The Wall 黑胶 LP 首版"}
+WALL_OTHER_SELLER = {**WALL, "product_id": "3", "description": "自用 九成新 无划痕 送内袋"}
+KIND_OF_BLUE = {
+    "product_id": "4",
+    "title": "Miles Davis Kind of Blue 黑胶",
+    "description": "九成新",
+    "price": 200,
+}
+
+
+def make_pipeline(tmp_path) -> DeduplicationPipeline:
+    pipeline = DeduplicationPipeline(str(tmp_path))
+    pipeline.open_spider(None)
+    return pipeline
+
+
+def test_items_carry_their_clusters(tmp_path):
+    pipeline = make_pipeline(tmp_path)
+    items = [
+        pipeline.process_item(dict(item), None)
+        for item in (WALL, WALL_RELIST, WALL_OTHER_SELLER, KIND_OF_BLUE)
+    ]
+
+    assert [item["listing_cluster"] for item in items] == ["1", "1", "3", "4"]
+    assert [item["album_cluster"] for item in items] == ["1", "1", "1", "4"]
+    assert pipeline.stats["near_duplicate"] == 1
+
+    # An updated item keeps the clusters it was given when it was new
+    updated = pipeline.process_item({**WALL_RELIST, "price": 280}, None)
+    assert (updated["listing_cluster"], updated["album_cluster"]) == ("1", "1")
+    with pytest.raises(DropItem):
+        pipeline.process_item({**WALL_RELIST, "price": 280}, None)
+
+
+def test_close_spider_compacts_the_index(tmp_path):
+    index_file = tmp_path / "near_duplicates.jsonl"
+    # An entry written with the former signature format
+    index_file.write_text(json.dumps(["listing", "0", [1, 2, 3], "0"]) + "\n")
+
+    pipeline = make_pipeline(tmp_path)
+    pipeline.dedup_manager.max_near_duplicate_entries = 2
+    for item in (WALL, WALL_RELIST, KIND_OF_BLUE):
+        pipeline.process_item(dict(item), None)
+    pipeline.close_spider(None)
+
+    lines = [json.loads(line) for line in index_file.read_text().splitlines()]
+    assert [(profile, key) for profile, key, _, _ in lines] == [
+        ("listing", "2"),
+        ("listing", "4"),
+        ("album", "2"),
+        ("album", "4"),
+    ]
+
+    # The compacted index still clusters new relists
+    manager = DeduplicationManager(str(tmp_path))
+    relist = {**WALL_RELIST, "product_id": "5"}
+    assert manager.assign_clusters(relist) == {"listing": "1", "album": "1"}
@@ -0,0 +1,19 @@
+"""
+Product ID extraction from listing URLs
+"""
+
+from xianyu_crawler.spiders.vinyl_spider import VinylSpider
+from xianyu_crawler.utils.validators import extract_product_id
+
+
+def test_extract_product_id():
+    assert extract_product_id("https://www.goofish.com/item.htm?id=123") == "123"
+    assert extract_product_id("https://www.goofish.com/item/456") == "456"
+    # Legacy static pages are only recognized by the spider
+    assert extract_product_id("https://www.goofish.com/789.htm") is None
+
+
+def test_spider_accepts_legacy_static_pages():
+    spider = VinylSpider.__new__(VinylSpider)
+    assert spider._extract_product_id("https://www.goofish.com/item.htm?id=123") == "123"
+    assert spider._extract_product_id("https://www.goofish.com/789.htm") == "789"
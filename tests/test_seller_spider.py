@@ -0,0 +1,109 @@
+"""
+SellerSpider paging against a fixture storefront
+
+The fixture storefront (tests/fixtures/storefront) has three pages of ten
+listings; pages 1 and 2 link to the next page, page 3 has no next link. Like
+a real server, the fixture answers any other ?page=N with ten more listings,
+so a spider that guesses page numbers keeps going.
+"""
+
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+from scrapy import Request
+from scrapy.http import HtmlResponse
+from scrapy.utils.test import get_crawler
+
+from xianyu_crawler.spiders.seller_spider import SellerSpider
+
+FIXTURES = Path(__file__).parent / "fixtures" / "storefront"
+BASE_URL = "http://fixture.test"
+SELLER_ID = "42"
+
+
+def storefront_page(page: int) -> str:
+    """HTML of one storefront page"""
+    path = FIXTURES / f"page_{page}.html"
+    if path.exists():
+        return path.read_text(encoding="utf-8")
+    cards = "".join(
+        f'<a href="/item?id={9000 + page * 10 + i}"><div class="title">x</div></a>'
+        for i in range(10)
+    )
+    return (
+        f'<html><body>{cards}<a class="next" href="/personal?userId={SELLER_ID}&page={page + 1}">'
+    )
+
+
+def crawl(spider: SellerSpider, known_ids=()):
+    """
+    Run the spider's storefront callbacks over the fixture pages
+
+    Returns:
+        (items, fetched page numbers)
+    """
+    queue = list(spider.start_requests())
+    spider.known_ids = set(known_ids)
+    items, pages = [], []
+    while queue:
+        request = queue.pop(0)
+        page = int(parse_qs(urlparse(request.url).query).get("page", ["1"])[0])
+        pages.append(page)
+        response = HtmlResponse(
+            url=request.url, body=storefront_page(page), encoding="utf-8", request=request
+        )
+        for result in request.callback(response):
+            if isinstance(result, Request):
+                queue.append(result)
+            else:
+                items.append(result)
+    return items, pages
+
+
+def make_spider(tmp_path, crawl_type="full", **settings) -> SellerSpider:
+    crawler = get_crawler(
+        SellerSpider,
+        {"CACHE_DIR": str(tmp_path), "SELLER_MAX_PAGES": 5, "SELLER_KNOWN_STREAK": 5, **settings},
+    )
+    return SellerSpider.from_crawler(
+        crawler,
+        sellers=SELLER_ID,
+        crawl_type=crawl_type,
+        base_url=BASE_URL,
+        playwright="false",
+        details="false",
+    )
+
+
+def test_stops_on_page_without_next_link(tmp_path):
+    items, pages = crawl(make_spider(tmp_path))
+
+    assert pages == [1, 2, 3]
+    assert [item["product_id"] for item in items] == [str(1001 + i) for i in range(30)]
+    assert [item["product_id"] for item in items if not item["is_available"]] == ["1014"]
+
+
+def test_guessing_next_page_is_opt_in(tmp_path):
+    items, pages = crawl(make_spider(tmp_path, SELLER_GUESS_NEXT_PAGE=True))
+
+    assert pages == [1, 2, 3, 4, 5]
+    assert len(items) == 50
+
+
+def test_incremental_stops_after_known_streak(tmp_path):
+    # The streak carries over to the next page: 3 known at the end of page 1,
+    # 2 more at the start of page 2
+    known = {str(i) for i in range(1008, 1031)}
+    items, pages = crawl(make_spider(tmp_path, crawl_type="incremental"), known)
+
+    assert pages == [1, 2]
+    assert [item["product_id"] for item in items] == [str(i) for i in range(1001, 1008)]
+
+
+def test_new_listing_resets_known_streak(tmp_path):
+    # Every fifth listing is new, so there is no run of 5 known listings
+    known = {str(i) for i in range(1001, 1031) if i % 5}
+    items, pages = crawl(make_spider(tmp_path, crawl_type="incremental"), known)
+
+    assert pages == [1, 2, 3]
+    assert [item["product_id"] for item in items] == [str(i) for i in range(1005, 1031, 5)]
@@ -0,0 +1,56 @@
+"""
+Baselines of PriceHistoryStore.changes_between
+"""
+
+from xianyu_crawler.storage.timeseries import PriceHistoryStore
+
+
+class PendingWriter:
+    """I/O pool whose writes never run, keeping flushed batches in flight"""
+
+    def submit(self, key, fn, *args):
+        return None
+
+
+def changes(store, start, end):
+    return [
+        (change.product_id, change.before.price, change.after.price)
+        for change in store.changes_between(start, end)
+    ]
+
+
+def test_baseline_prefers_newer_buffered_rows(tmp_path):
+    store = PriceHistoryStore(str(tmp_path))
+    store.append("X", 10, 100)
+    store.flush()
+    store.append("X", 50, 80)
+    store.append("X", 70, 80)
+
+    assert changes(store, 60, 100) == []
+
+
+def test_baseline_prefers_newer_in_flight_rows(tmp_path):
+    store = PriceHistoryStore(str(tmp_path))
+    store.append("X", 10, 100)
+    store.flush()
+    store.writer = PendingWriter()
+    store.append("X", 50, 80)
+    store.flush()
+    store.append("X", 70, 80)
+
+    assert changes(store, 60, 100) == []
+
+
+def test_baseline_across_overlapping_segments(tmp_path):
+    store = PriceHistoryStore(str(tmp_path))
+    store.append("X", 90, 100)
+    store.append("Y", 200, 10)
+    store.flush()
+    # Backfilled segment: older X row, but the highest max_ts
+    store.append("X", 20, 50)
+    store.append("Z", 300, 10)
+    store.flush()
+    store.append("X", 120, 100)
+    store.append("X", 130, 90)
+
+    assert changes(store, 100, 150) == [("X", 100.0, 90.0)]
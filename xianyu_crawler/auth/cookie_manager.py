@@ -4,7 +4,6 @@ Cookie management for Xianyu crawler
 Handles cookie persistence, validation, and automatic refresh
 """
 
-import json
 import os
 from datetime import datetime, timedelta
 from pathlib import Path
@@ -12,6 +11,8 @@ from typing import Optional, Dict, Any
 
 from loguru import logger
 
+from xianyu_crawler.storage.serialization import read_json, write_json
+
 
 class CookieManager:
     """
@@ -41,8 +42,7 @@ class CookieManager:
                 "expires_at": (datetime.now() + timedelta(days=7)).isoformat(),  # Cookies typically valid for 7 days
             }
 
-            with open(self.cookies_file, "w", encoding="utf-8") as f:
-                json.dump(cookie_data, f, indent=2, ensure_ascii=False)
+            write_json(self.cookies_file, cookie_data)
 
             logger.info(f"Cookies saved to {self.cookies_file}")
             return True
@@ -63,8 +63,7 @@ class CookieManager:
                 logger.warning(f"Cookies file not found: {self.cookies_file}")
                 return None
 
-            with open(self.cookies_file, "r", encoding="utf-8") as f:
-                cookie_data = json.load(f)
+            cookie_data = read_json(self.cookies_file)
 
             # Check if cookies are expired
             expires_at = datetime.fromisoformat(cookie_data.get("expires_at", ""))
@@ -109,9 +108,7 @@ class CookieManager:
             return False
 
         # Check if cookies are recent enough
-        saved_at = datetime.fromisoformat(
-            json.loads(self.cookies_file.read_text(encoding="utf-8")).get("saved_at", "")
-        )
+        saved_at = datetime.fromisoformat(read_json(self.cookies_file).get("saved_at", ""))
         return datetime.now() - saved_at < timedelta(days=7)
 
     def get_cookie_expiry(self) -> Optional[datetime]:
@@ -125,8 +122,7 @@ class CookieManager:
             if not self.cookies_file.exists():
                 return None
 
-            with open(self.cookies_file, "r", encoding="utf-8") as f:
-                cookie_data = json.load(f)
+            cookie_data = read_json(self.cookies_file)
 
             return datetime.fromisoformat(cookie_data.get("expires_at", ""))
 
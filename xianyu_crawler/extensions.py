@@ -0,0 +1,309 @@
+"""
+Scrapy extensions for Xianyu crawler
+
+StageMetrics records per-stage latency histograms (download, Playwright
+render wait, spider callbacks, each item pipeline) broken down by page type,
+and writes them as a JSON run report and Prometheus text exposition when the
+spider closes, optionally also every STAGE_METRICS_FLUSH_INTERVAL seconds.
+
+CrawlLogging configures loguru for the crawl (see utils/log_config.py) and
+logs an aggregate progress line every LOG_PROGRESS_INTERVAL seconds.
+"""
+
+import os
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+from typing import Dict
+
+from loguru import logger
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from twisted.internet import defer, task
+
+from xianyu_crawler.storage.response_cache import page_type
+from xianyu_crawler.storage.serialization import dumps
+from xianyu_crawler.utils.histogram import LogHistogram
+from xianyu_crawler.utils.log_config import configure_from_settings, sampler
+
+# Prometheus metric name of the stage histograms (exported as summaries)
+PROMETHEUS_METRIC = "xianyu_stage_duration_seconds"
+
+
+def get_stage_metrics(spider):
+    """StageMetrics extension attached to a spider, or None when disabled"""
+    return getattr(spider, "stage_metrics", None)
+
+
+def timed_pipeline_stage(process_item):
+    """
+    Decorator recording the duration of a pipeline's process_item
+
+    The stage is named after the pipeline class ("pipeline.JsonExportPipeline"),
+    so subclasses are reported separately. Deferred results are timed until
+    they fire.
+    """
+
+    @wraps(process_item)
+    def wrapper(self, item, spider):
+        metrics = get_stage_metrics(spider)
+        if metrics is None:
+            return process_item(self, item, spider)
+
+        stage = f"pipeline.{type(self).__name__}"
+        start = time.perf_counter()
+        try:
+            result = process_item(self, item, spider)
+        except BaseException:
+            metrics.record(stage, "item", time.perf_counter() - start)
+            raise
+
+        if isinstance(result, defer.Deferred):
+
+            def finished(value):
+                metrics.record(stage, "item", time.perf_counter() - start)
+                return value
+
+            return result.addBoth(finished)
+
+        metrics.record(stage, "item", time.perf_counter() - start)
+        return result
+
+    return wrapper
+
+
+class StageMetrics:
+    """
+    Extension collecting stage latency histograms for one crawl
+
+    Stages:
+        download      request sent -> response received (incl. Playwright rendering)
+        render_wait   fixed wait_for_timeout page methods of Playwright requests
+        parse         spider callback work (StageTimingMiddleware)
+        pipeline.*    process_item of each decorated pipeline
+    """
+
+    def __init__(self, output_dir, flush_interval: float = 0.0):
+        """
+        Args:
+            output_dir: Directory for run reports
+            flush_interval: Seconds between intermediate report writes (0 = only at close)
+        """
+        self.output_dir = Path(output_dir)
+        self.flush_interval = flush_interval
+        self.histograms: Dict[str, Dict[str, LogHistogram]] = defaultdict(dict)
+        self.started_at = None
+        self.report_name = None
+        self._task = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("STAGE_METRICS_ENABLED", False):
+            raise NotConfigured
+        ext = cls(
+            settings.get("STAGE_METRICS_DIR"),
+            flush_interval=settings.getfloat("STAGE_METRICS_FLUSH_INTERVAL", 0.0),
+        )
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(ext.response_received, signal=signals.response_received)
+        return ext
+
+    def spider_opened(self, spider):
+        self.started_at = datetime.now()
+        self.report_name = f"{spider.name}_{self.started_at.strftime('%Y%m%d_%H%M%S')}"
+        spider.stage_metrics = self
+
+        if self.flush_interval > 0:
+            self._task = task.LoopingCall(self.write_report, spider, final=False)
+            self._task.start(self.flush_interval, now=False)
+
+    def spider_closed(self, spider, reason):
+        if self._task is not None and self._task.running:
+            self._task.stop()
+        self.log_summary()
+        self.write_report(spider, final=True, reason=reason)
+
+    def response_received(self, response, request, spider):
+        """Record download latency and the fixed Playwright waits"""
+        latency = request.meta.get("download_latency")
+        if latency is None:
+            return
+        kind = page_type(request)
+        self.record("download", kind, latency)
+
+        if request.meta.get("playwright"):
+            wait = sum(
+                method.args[0] if method.args else method.kwargs.get("timeout", 0)
+                for method in request.meta.get("playwright_page_methods", ())
+                if getattr(method, "method", None) == "wait_for_timeout"
+            )
+            if wait:
+                self.record("render_wait", kind, wait / 1000)
+
+    def record(self, stage: str, kind: str, seconds: float):
+        """
+        Add one duration sample
+
+        Args:
+            stage: Stage name, e.g. "download" or "pipeline.JsonExportPipeline"
+            kind: Page type (search, detail, seller, item, ...)
+            seconds: Duration in seconds
+        """
+        histogram = self.histograms[stage].get(kind)
+        if histogram is None:
+            histogram = self.histograms[stage][kind] = LogHistogram()
+        histogram.record(int(seconds * 1e6))
+
+    def report(self, spider, final: bool = True, reason: str = None) -> dict:
+        """Run report with millisecond summaries per stage and page type"""
+        now = datetime.now()
+        return {
+            "spider": spider.name,
+            "started_at": self.started_at.isoformat(),
+            "generated_at": now.isoformat(),
+            "elapsed_s": (now - self.started_at).total_seconds(),
+            "final": final,
+            "reason": reason,
+            "unit": "ms",
+            "stages": {
+                stage: {kind: h.to_dict(scale=1e-3) for kind, h in sorted(kinds.items())}
+                for stage, kinds in sorted(self.histograms.items())
+            },
+        }
+
+    def prometheus_text(self, spider) -> str:
+        """Prometheus text exposition of the stage histograms as summaries"""
+        lines = [
+            f"# HELP {PROMETHEUS_METRIC} Crawl stage duration by stage and page type",
+            f"# TYPE {PROMETHEUS_METRIC} summary",
+        ]
+        for stage, kinds in sorted(self.histograms.items()):
+            for kind, h in sorted(kinds.items()):
+                labels = f'spider="{spider.name}",stage="{stage}",page_type="{kind}"'
+                for q in (0.5, 0.9, 0.95, 0.99):
+                    value = h.percentile(q) / 1e6
+                    lines.append(f'{PROMETHEUS_METRIC}{{{labels},quantile="{q}"}} {value:.6f}')
+                lines.append(f"{PROMETHEUS_METRIC}_sum{{{labels}}} {h.total / 1e6:.6f}")
+                lines.append(f"{PROMETHEUS_METRIC}_count{{{labels}}} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, spider, final: bool = True, reason: str = None):
+        """
+        Write <spider>_<start>.json and <spider>.prom atomically
+
+        The JSON report is rewritten on every flush; the .prom file keeps a
+        stable name for node_exporter's textfile collector.
+        """
+        try:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            report = dumps(self.report(spider, final=final, reason=reason), pretty=True)
+            self._write_atomic(self.output_dir / f"{self.report_name}.json", report)
+            self._write_atomic(
+                self.output_dir / f"{spider.name}.prom",
+                self.prometheus_text(spider).encode("utf-8"),
+            )
+        except Exception as e:
+            logger.error(f"Error writing stage metrics report: {e}")
+            return
+
+        if final:
+            logger.info(f"Stage metrics report saved to {self.output_dir / self.report_name}.json")
+
+    def log_summary(self):
+        """Log p50/p95 and total time of every stage"""
+        for stage, kinds in sorted(self.histograms.items()):
+            for kind, h in sorted(kinds.items()):
+                logger.info(
+                    f"Stage {stage} [{kind}]: {h.count} samples, "
+                    f"p50 {h.percentile(0.5) / 1e3:.1f} ms, p95 {h.percentile(0.95) / 1e3:.1f} ms, "
+                    f"total {h.total / 1e6:.2f} s"
+                )
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes):
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+
+class CrawlLogging:
+    """
+    Extension configuring loguru and logging aggregate crawl progress
+
+    Replaces per-item INFO lines with one periodic line: items scraped and
+    items/min, drops by reason (the DropItem message up to the first colon),
+    pipeline errors and the number of sampled-out per-item log lines.
+    """
+
+    def __init__(self, interval: float = 60.0):
+        """
+        Args:
+            interval: Seconds between progress lines (0 = only at close)
+        """
+        self.interval = interval
+        self.items = 0
+        self.errors = 0
+        self.drops = Counter()
+        self._last_items = 0
+        self._last_time = None
+        self._started = None
+        self._task = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("LOGURU_CONFIGURE", True):
+            raise NotConfigured
+        configure_from_settings(settings)
+        ext = cls(settings.getfloat("LOG_PROGRESS_INTERVAL", 60.0))
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(ext.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(ext.item_dropped, signal=signals.item_dropped)
+        crawler.signals.connect(ext.item_error, signal=signals.item_error)
+        return ext
+
+    def spider_opened(self, spider):
+        self._started = self._last_time = time.monotonic()
+        if self.interval > 0:
+            self._task = task.LoopingCall(self.log_progress)
+            self._task.start(self.interval, now=False)
+
+    def spider_closed(self, spider, reason):
+        if self._task is not None and self._task.running:
+            self._task.stop()
+        self.log_progress(final=True)
+        # Wait for enqueued sinks to write everything logged so far
+        logger.complete()
+
+    def item_scraped(self, item, response, spider):
+        self.items += 1
+
+    def item_dropped(self, item, response, exception, spider):
+        self.drops[str(exception).split(":", 1)[0] or type(exception).__name__] += 1
+
+    def item_error(self, item, response, spider, failure):
+        self.errors += 1
+
+    def log_progress(self, final: bool = False):
+        """Log items, rate, drops by reason, errors and sampled-out lines"""
+        now = time.monotonic()
+        if final:
+            elapsed, new_items = now - self._started, self.items
+        else:
+            elapsed, new_items = now - self._last_time, self.items - self._last_items
+        rate = new_items / elapsed * 60 if elapsed > 0 else 0.0
+        self._last_time, self._last_items = now, self.items
+
+        drops = ", ".join(f"{reason}: {count}" for reason, count in self.drops.most_common())
+        logger.info(
+            f"{'Crawl finished' if final else 'Progress'}: {self.items} items "
+            f"({rate:.0f}/min), {sum(self.drops.values())} dropped"
+            f"{f' ({drops})' if drops else ''}, {self.errors} errors, "
+            f"{sampler.total_suppressed()} per-item log lines sampled out"
+        )
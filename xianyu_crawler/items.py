@@ -2,10 +2,12 @@
 Data model definitions for Xianyu vinyl record crawler
 """
 
+import sys
 import scrapy
+from dataclasses import dataclass, fields as dataclass_fields
 from datetime import datetime
-from typing import Optional, List
-from pydantic import BaseModel, Field, field_validator
+from typing import Any, Dict, Optional, List, Tuple
+from pydantic import BaseModel, Field, TypeAdapter, field_validator
 
 
 class VinylProductItem(scrapy.Item):
@@ -39,12 +41,24 @@ class VinylProductItem(scrapy.Item):
     images = scrapy.Field()  # List[str]: List of image URLs
 
     # Metadata
+    keyword = scrapy.Field()  # str: Search keyword that found this item
     crawled_at = scrapy.Field()  # datetime: When this item was crawled
     is_available = scrapy.Field()  # bool: Whether the item is still available
 
     # Additional attributes
     tags = scrapy.Field()  # List[str]: Tags associated with the product
 
+    # Change tracking (set by DeduplicationPipeline)
+    change_type = scrapy.Field()  # str: "new" or "updated"
+    changes = scrapy.Field()  # Dict[str, Dict]: Field-level delta {"price": {"old": .., "new": ..}}
+    listing_cluster = scrapy.Field()  # str: First product_id with this text (relists)
+    album_cluster = scrapy.Field()  # str: First product_id with this title (any seller)
+
+    # Validated VinylProductModel attached by DataValidationPipeline, so later
+    # pipelines can reuse it instead of validating again. Pipelines after
+    # validation must treat the item as read-only.
+    _model = None
+
 
 class VinylProductModel(BaseModel):
     """
@@ -71,11 +85,17 @@ class VinylProductModel(BaseModel):
 
     images: List[str] = Field(default_factory=list, description="Image URLs")
 
+    keyword: Optional[str] = Field(None, description="Search keyword")
     crawled_at: datetime = Field(default_factory=datetime.now, description="Crawl timestamp")
     is_available: bool = Field(True, description="Availability status")
 
     tags: List[str] = Field(default_factory=list, description="Product tags")
 
+    change_type: Optional[str] = Field(None, description="Change type: new or updated")
+    changes: Optional[Dict[str, Dict[str, Any]]] = Field(None, description="Field-level delta")
+    listing_cluster: Optional[str] = Field(None, description="Near-duplicate listing cluster ID")
+    album_cluster: Optional[str] = Field(None, description="Near-duplicate album cluster ID")
+
     @field_validator("price")
     @classmethod
     def validate_price(cls, v: float) -> float:
@@ -109,6 +129,7 @@ class VinylProductModel(BaseModel):
             value = getattr(self, field_name)
             if value is not None:
                 item[field_name] = value
+        item._model = self
         return item
 
     def to_dict(self) -> dict:
@@ -118,6 +139,118 @@ class VinylProductModel(BaseModel):
         return data
 
 
+# Batch validation and serialization of product lists in a single call
+VinylProductListAdapter = TypeAdapter(List[VinylProductModel])
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    """Intern a low-cardinality string so equal values share one object"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+@dataclass(slots=True)
+class ProductRecord:
+    """
+    Compact in-memory representation of a product
+
+    Uses __slots__ instead of a per-item dict, stores lists as tuples and
+    interns low-cardinality fields (seller, condition, trade type, locations,
+    publish time, keyword, tags), so buffers and snapshots of many listings stay small.
+    Fields mirror VinylProductModel and values are assumed to be validated.
+    """
+    product_id: str
+    title: str
+    price: float
+    link: str
+
+    seller_name: Optional[str] = None
+    seller_credit: Optional[int] = None
+    seller_id: Optional[str] = None
+    seller_location: Optional[str] = None
+
+    description: Optional[str] = None
+    condition: Optional[str] = None
+    trade_type: Optional[str] = None
+    location: Optional[str] = None
+
+    publish_time: Optional[str] = None
+    view_count: Optional[int] = None
+    want_count: Optional[int] = None
+
+    images: Tuple[str, ...] = ()
+
+    keyword: Optional[str] = None
+    crawled_at: Optional[datetime] = None
+    is_available: bool = True
+
+    tags: Tuple[str, ...] = ()
+
+    change_type: Optional[str] = None
+    changes: Optional[Dict[str, Dict[str, Any]]] = None
+    listing_cluster: Optional[str] = None
+    album_cluster: Optional[str] = None
+
+    def __post_init__(self):
+        self.seller_name = _intern(self.seller_name)
+        self.seller_id = _intern(self.seller_id)
+        self.seller_location = _intern(self.seller_location)
+        self.condition = _intern(self.condition)
+        self.trade_type = _intern(self.trade_type)
+        self.location = _intern(self.location)
+        self.publish_time = _intern(self.publish_time)
+        self.keyword = _intern(self.keyword)
+        self.change_type = _intern(self.change_type)
+        self.images = tuple(self.images or ())
+        self.tags = tuple(_intern(tag) for tag in self.tags or ())
+        if isinstance(self.crawled_at, str):
+            self.crawled_at = datetime.fromisoformat(self.crawled_at)
+
+    @classmethod
+    def from_model(cls, model: VinylProductModel) -> "ProductRecord":
+        """Build a record from a validated pydantic model"""
+        return cls(**{name: getattr(model, name) for name in RECORD_FIELDS})
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ProductRecord":
+        """Build a record from an item or exported JSON dict, ignoring unknown keys"""
+        return cls(**{name: data[name] for name in RECORD_FIELDS if name in data})
+
+    def to_model(self) -> VinylProductModel:
+        """Convert to a pydantic model (runs validation)"""
+        data = {name: getattr(self, name) for name in RECORD_FIELDS}
+        data["images"] = list(self.images)
+        data["tags"] = list(self.tags)
+        if data["crawled_at"] is None:
+            del data["crawled_at"]
+        return VinylProductModel(**data)
+
+    def to_item(self) -> VinylProductItem:
+        """Convert to Scrapy Item, skipping unset fields"""
+        item = VinylProductItem()
+        for name in RECORD_FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                item[name] = list(value) if isinstance(value, tuple) else value
+        return item
+
+    def to_dict(self) -> dict:
+        """Convert to dictionary for JSON export, same shape as VinylProductModel.to_dict()"""
+        data = {name: getattr(self, name) for name in RECORD_FIELDS}
+        data["images"] = list(self.images)
+        data["tags"] = list(self.tags)
+        if self.crawled_at is not None:
+            data["crawled_at"] = self.crawled_at.isoformat()
+        return data
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Dict-style read access; unset (None) fields return the default"""
+        value = getattr(self, key, None)
+        return default if value is None else value
+
+
+RECORD_FIELDS = tuple(f.name for f in dataclass_fields(ProductRecord))
+
+
 class ExportDataModel(BaseModel):
     """
     Model for exported JSON data structure
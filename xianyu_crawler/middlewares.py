@@ -22,6 +22,9 @@ from twisted.internet.error import (
     TCPTimedOutError,
 )
 
+from xianyu_crawler.extensions import get_stage_metrics
+from xianyu_crawler.storage.response_cache import page_type
+
 
 class RandomUserAgentMiddleware:
     """
@@ -38,7 +41,7 @@ class RandomUserAgentMiddleware:
 
     def process_request(self, request: Request, spider: Spider):
         """Add a random User-Agent to each request"""
-        request.headers["User-Agent"] = self.ua.get(self.ua_type)
+        request.headers["User-Agent"] = getattr(self.ua, self.ua_type)
 
 
 class XianyuSpiderMiddleware:
@@ -61,6 +64,11 @@ class XianyuSpiderMiddleware:
         for i in result:
             yield i
 
+    async def process_spider_output_async(self, response, result, spider):
+        """Asynchronous variant used by Scrapy >= 2.7 for async callbacks and start()"""
+        async for i in result:
+            yield i
+
     def process_spider_exception(self, response, exception, spider):
         """Called when a spider or process_spider_input() method raises an exception"""
         pass
@@ -70,10 +78,68 @@ class XianyuSpiderMiddleware:
         for r in start_requests:
             yield r
 
+    async def process_start(self, start):
+        """Called with the start requests of the spider (Scrapy >= 2.13)"""
+        async for r in start:
+            yield r
+
     def spider_opened(self, spider):
         spider.logger.info("Spider opened: %s" % spider.name)
 
 
+class StageTimingMiddleware:
+    """
+    Spider middleware timing spider callbacks for the StageMetrics extension
+
+    Placed closest to the spider, it measures only the time spent inside the
+    callback (callbacks are generators, so the time is summed over every
+    next() call) and records it as the "parse" stage of the page type.
+    """
+
+    def process_spider_output(self, response, result, spider):
+        metrics = get_stage_metrics(spider)
+        if metrics is None:
+            yield from result
+            return
+
+        elapsed = 0.0
+        iterator = iter(result)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    elapsed += time.perf_counter() - start
+                yield item
+        finally:
+            metrics.record("parse", page_type(response.request), elapsed)
+
+    async def process_spider_output_async(self, response, result, spider):
+        metrics = get_stage_metrics(spider)
+        if metrics is None:
+            async for item in result:
+                yield item
+            return
+
+        elapsed = 0.0
+        iterator = result.__aiter__()
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = await iterator.__anext__()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    elapsed += time.perf_counter() - start
+                yield item
+        finally:
+            metrics.record("parse", page_type(response.request), elapsed)
+
+
 class RetryMiddleware(ScrapyRetryMiddleware):
     """
     Custom retry middleware with enhanced error handling
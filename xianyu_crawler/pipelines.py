@@ -6,65 +6,163 @@ Includes deduplication, data validation, and JSON export
 
 import json
 import os
-from datetime import datetime
 from pathlib import Path
 from typing import Set
 
 from loguru import logger
 from pydantic import ValidationError
+from scrapy.exceptions import DropItem as ScrapyDropItem
+from scrapy.exceptions import NotConfigured
+from twisted.internet import task
+
+from xianyu_crawler.extensions import timed_pipeline_stage
+from xianyu_crawler.items import (
+    VinylProductItem,
+    ProductRecord,
+    ExportDataModel,
+)
+from xianyu_crawler.storage.columnar_export import PYARROW_AVAILABLE, ColumnarExporter
+from xianyu_crawler.storage.dedup import MAX_NEAR_DUPLICATE_ENTRIES, DeduplicationManager
+from xianyu_crawler.storage.io_pool import IOWriterPool
+from xianyu_crawler.storage.segments import SegmentWriter
+from xianyu_crawler.storage.timeseries import PriceHistoryStore
+from xianyu_crawler.utils.log_config import sampled
+from xianyu_crawler.utils.validators import validate_product_item, validate_product_items
+
+
+class PriceHistoryPipeline:
+    """
+    Pipeline to record price/want-count observations of every crawled item
+
+    Runs before deduplication so unchanged items are still observed.
+    """
+
+    def __init__(self, history_dir, io_pool=None):
+        self.history_dir = Path(history_dir)
+        self.io_pool = io_pool
+        self.store = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        history_dir = crawler.settings.get("HISTORY_DIR")
+        return cls(history_dir, io_pool=IOWriterPool.from_crawler(crawler))
+
+    def open_spider(self, spider):
+        logger.info(f"Price history pipeline started, store at {self.history_dir}")
+        self.store = PriceHistoryStore(str(self.history_dir), writer=self.io_pool)
 
-from xianyu_crawler.items import VinylProductItem, VinylProductModel, ExportDataModel
-from xianyu_crawler.storage.dedup import DeduplicationManager
-from xianyu_crawler.storage.json_export import JsonExporter
-from xianyu_crawler.utils.validators import validate_product_item
+    @timed_pipeline_stage
+    def process_item(self, item: VinylProductItem, spider):
+        """Append an observation for the item (full buffers are flushed in the background)"""
+        if item.get("product_id"):
+            self.store.append_item(item)
+        return self.io_pool.backpressure(item) if self.io_pool else item
+
+    def close_spider(self, spider):
+        """Flush buffered observations to a segment"""
+        self.store.flush()
+        return self.io_pool.drain() if self.io_pool else None
 
 
 class DeduplicationPipeline:
     """
-    Pipeline to filter out duplicate items based on product_id
+    Pipeline to filter out unchanged items based on product_id
+
+    New products and products whose tracked fields (price, want_count,
+    view_count, is_available) changed since the last crawl pass through,
+    tagged with change_type ("new" / "updated") and a field-level delta.
+    They are also tagged with near-duplicate clusters: listing_cluster groups
+    relisted items, album_cluster the same album from other sellers.
     """
 
-    def __init__(self, cache_dir):
+    def __init__(
+        self,
+        cache_dir,
+        near_duplicates: bool = True,
+        io_pool=None,
+        max_near_duplicate_entries: int = MAX_NEAR_DUPLICATE_ENTRIES,
+    ):
         self.cache_dir = Path(cache_dir)
+        self.io_pool = io_pool
+        self.max_near_duplicate_entries = max_near_duplicate_entries
         self.seen_ids: Set[str] = set()
         self.cache_file = self.cache_dir / "seen_products.txt"
         self.dedup_manager = None
+        self.near_duplicates = near_duplicates
+        self.stats = {"new": 0, "updated": 0, "unchanged": 0, "near_duplicate": 0}
 
     @classmethod
     def from_crawler(cls, crawler):
         cache_dir = crawler.settings.get("CACHE_DIR")
-        return cls(cache_dir)
+        near_duplicates = crawler.settings.getbool("NEAR_DUPLICATE_DETECTION", True)
+        return cls(
+            cache_dir,
+            near_duplicates,
+            io_pool=IOWriterPool.from_crawler(crawler),
+            max_near_duplicate_entries=crawler.settings.getint(
+                "NEAR_DUPLICATE_MAX_ENTRIES", MAX_NEAR_DUPLICATE_ENTRIES
+            ),
+        )
 
     def open_spider(self, spider):
-        """Load existing product IDs from cache"""
+        """Load existing product IDs and states from cache"""
         logger.info(f"Loading seen product IDs from {self.cache_file}")
 
-        self.dedup_manager = DeduplicationManager(str(self.cache_dir))
+        self.dedup_manager = DeduplicationManager(
+            str(self.cache_dir),
+            writer=self.io_pool,
+            max_near_duplicate_entries=self.max_near_duplicate_entries,
+        )
         self.seen_ids = self.dedup_manager.load_seen_ids()
 
         logger.info(f"Loaded {len(self.seen_ids)} seen product IDs")
 
+    @timed_pipeline_stage
     def process_item(self, item: VinylProductItem, spider):
-        """Check if item is duplicate"""
+        """Pass through new or changed items, drop unchanged ones"""
         product_id = item.get("product_id")
 
         if not product_id:
             logger.warning("Item missing product_id, skipping")
             return item
 
-        if product_id in self.seen_ids:
-            logger.debug(f"Duplicate item found: {product_id}")
-            raise DropItem(f"Duplicate product_id: {product_id}")
+        status, changes = self.dedup_manager.upsert_item(item)
+        self.stats[status] += 1
 
-        # Add to seen set
-        self.seen_ids.add(product_id)
-        self.dedup_manager.save_seen_id(product_id)
+        if status == "unchanged":
+            if sampled("unchanged_item", "DEBUG"):
+                logger.debug(f"Unchanged item: {product_id}")
+            raise DropItem(f"Unchanged product_id: {product_id}")
 
-        return item
+        self.seen_ids.add(product_id)
+        item["change_type"] = status
+
+        if self.near_duplicates:
+            clusters = self.dedup_manager.assign_clusters(item)
+            item["listing_cluster"] = cluster = clusters["listing"]
+            item["album_cluster"] = clusters["album"]
+            if status == "new" and cluster != product_id:
+                self.stats["near_duplicate"] += 1
+                if sampled("near_duplicate", "DEBUG"):
+                    logger.debug(f"New item {product_id} is a near duplicate of listing {cluster}")
+        if changes:
+            item["changes"] = changes
+            if sampled("updated_item", "DEBUG"):
+                logger.debug(f"Updated item {product_id}: {changes}")
+
+        return self.io_pool.backpressure(item) if self.io_pool else item
 
     def close_spider(self, spider):
-        """Save seen product IDs to cache"""
-        logger.info(f"Saving {len(self.seen_ids)} seen product IDs to {self.cache_file}")
+        """Compact the product state log and the near-duplicate index"""
+        logger.info(
+            f"Dedup complete: {self.stats['new']} new, {self.stats['updated']} updated, "
+            f"{self.stats['unchanged']} unchanged, "
+            f"{self.stats['near_duplicate']} near duplicates of known listings"
+        )
+        self.dedup_manager.compact_states()
+        self.dedup_manager.compact_near_duplicates()
+        logger.info(f"Saved {len(self.seen_ids)} seen product IDs to {self.cache_file}")
+        return self.io_pool.drain() if self.io_pool else None
 
 
 class DataValidationPipeline:
@@ -79,6 +177,7 @@ class DataValidationPipeline:
     def open_spider(self, spider):
         logger.info("Data validation pipeline started")
 
+    @timed_pipeline_stage
     def process_item(self, item: VinylProductItem, spider):
         """Validate item using Pydantic model"""
         try:
@@ -88,6 +187,7 @@ class DataValidationPipeline:
             # Update validation counters
             self.valid_items += 1
 
+            # The returned item carries the validated model for later pipelines
             return validated_item.to_scrapy_item()
 
         except ValidationError as e:
@@ -101,73 +201,174 @@ class DataValidationPipeline:
 
 class JsonExportPipeline:
     """
-    Pipeline to export items to JSON format
+    Pipeline to export items to sequenced JSON segment files
+
+    Items are buffered and written in batches to a SegmentWriter, which
+    commits a segment file when it is full or JSON_SEGMENT_MAX_AGE seconds
+    old. Closing the spider commits the last segment and writes the run
+    manifest.
     """
 
-    def __init__(self, output_dir):
+    # Number of buffered items per write
+    batch_size = 100
+
+    def __init__(
+        self,
+        output_dir,
+        pretty=False,
+        compression=None,
+        io_pool=None,
+        segment_max_items=5000,
+        segment_max_bytes=32 * 1024 * 1024,
+        segment_max_age=0.0,
+    ):
         self.output_dir = Path(output_dir)
+        self.pretty = pretty
+        self.compression = compression
+        self.io_pool = io_pool
+        self.segment_max_items = segment_max_items
+        self.segment_max_bytes = segment_max_bytes
+        self.segment_max_age = segment_max_age
         self.items_buffer = []
         self.exporter = None
+        self._rotate_task = None
 
     @classmethod
     def from_crawler(cls, crawler):
-        output_dir = crawler.settings.get("JSON_OUTPUT_DIR")
-        return cls(output_dir)
+        settings = crawler.settings
+        return cls(
+            settings.get("JSON_OUTPUT_DIR"),
+            pretty=settings.getbool("JSON_PRETTY", False),
+            compression=settings.get("JSON_COMPRESSION"),
+            io_pool=IOWriterPool.from_crawler(crawler),
+            segment_max_items=settings.getint("JSON_SEGMENT_MAX_ITEMS", 5000),
+            segment_max_bytes=settings.getint("JSON_SEGMENT_MAX_BYTES", 32 * 1024 * 1024),
+            segment_max_age=settings.getfloat("JSON_SEGMENT_MAX_AGE", 600.0),
+        )
 
     def open_spider(self, spider):
-        """Initialize JSON exporter"""
+        """Initialize the segment writer"""
         logger.info(f"JSON export pipeline started, output to {self.output_dir}")
 
-        self.exporter = JsonExporter(str(self.output_dir))
+        self.exporter = SegmentWriter(
+            str(self.output_dir),
+            max_items=self.segment_max_items,
+            max_bytes=self.segment_max_bytes,
+            max_age=self.segment_max_age,
+            pretty=self.pretty,
+            compression=self.compression,
+        )
         self.items_buffer = []
 
+        if self.segment_max_age > 0:
+            # Commit old segments even when no new items arrive
+            self._rotate_task = task.LoopingCall(self._rotate)
+            self._rotate_task.start(self.segment_max_age, now=False)
+
+    @timed_pipeline_stage
     def process_item(self, item: VinylProductItem, spider):
         """Add item to buffer for batch export"""
-        self.items_buffer.append(item)
+        # Buffer a compact record of the validated model, the raw item otherwise
+        model = getattr(item, "_model", None)
+        self.items_buffer.append(ProductRecord.from_model(model) if model else item)
 
-        # Export in batches of 100 items
-        if len(self.items_buffer) >= 100:
+        # Export in batches
+        if len(self.items_buffer) >= self.batch_size:
             self._export_batch()
 
-        return item
+        return self.io_pool.backpressure(item) if self.io_pool else item
 
     def _export_batch(self):
         """Export buffered items to JSON"""
         if not self.items_buffer:
             return
 
-        logger.info(f"Exporting {len(self.items_buffer)} items to JSON")
+        logger.info(f"Exporting {len(self.items_buffer)} items")
+
+        # Reuse records validated upstream, batch-validate the rest
+        records = []
+        pending = []
+        for entry in self.items_buffer:
+            if isinstance(entry, ProductRecord):
+                records.append(entry)
+            else:
+                pending.append(dict(entry))
 
-        # Convert items to dict format
-        items_data = []
-        for item in self.items_buffer:
-            try:
-                # Convert to Pydantic model for serialization
-                model = VinylProductModel(**dict(item))
-                items_data.append(model.to_dict())
-            except Exception as e:
-                logger.warning(f"Error converting item to JSON: {e}")
+        if pending:
+            records.extend(ProductRecord.from_model(m) for m in validate_product_items(pending))
 
-        # Export using JsonExporter
-        if items_data:
-            self.exporter.export_items(items_data)
+        if records:
+            self._run(self._write_records, records)
 
         # Clear buffer
         self.items_buffer = []
 
+    def _run(self, fn, *args):
+        """Call fn now, or in order with earlier writes on the I/O pool"""
+        if self.io_pool is None:
+            fn(*args)
+        else:
+            # Writes of one pipeline run in order, off the reactor thread
+            self.io_pool.submit(self.output_dir, fn, *args)
+
+    def _write_records(self, records):
+        """Serialize records and append them to the open segment"""
+        self.exporter.write(record.to_dict() for record in records)
+
+    def _rotate(self):
+        """Flush buffered items and commit the segment if it is too old"""
+        self._export_batch()
+        self._run(self.exporter.commit_if_expired)
+
+    def _finish(self):
+        """Commit the last segment and write the run manifest"""
+        manifest = self.exporter.close()
+        if manifest:
+            logger.info(f"Final export manifest saved to {manifest}")
+
     def close_spider(self, spider):
-        """Export remaining items in buffer"""
+        """Export remaining items and commit the last segment"""
         logger.info("Closing JSON export pipeline")
 
+        if self._rotate_task is not None and self._rotate_task.running:
+            self._rotate_task.stop()
+
         # Export any remaining items
         if self.items_buffer:
             self._export_batch()
 
-        # Create final export with metadata
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        export_file = self.output_dir / f"final_export_{timestamp}.json"
+        self._run(self._finish)
+        return self.io_pool.drain() if self.io_pool else None
+
+
+class ColumnarExportPipeline(JsonExportPipeline):
+    """
+    Pipeline to export items to a Parquet dataset partitioned by crawl date
+    and keyword (requires pyarrow)
+    """
+
+    batch_size = 5000
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not PYARROW_AVAILABLE:
+            raise NotConfigured("ColumnarExportPipeline requires the 'pyarrow' package")
+        output_dir = crawler.settings.get("PARQUET_OUTPUT_DIR")
+        return cls(output_dir, io_pool=IOWriterPool.from_crawler(crawler))
+
+    def open_spider(self, spider):
+        """Initialize Parquet exporter"""
+        logger.info(f"Parquet export pipeline started, output to {self.output_dir}")
+
+        self.exporter = ColumnarExporter(str(self.output_dir))
+        self.items_buffer = []
+
+    def _write_records(self, records):
+        """Export records directly; ProductRecord supports dict-style reads"""
+        self.exporter.export_items(records)
 
-        logger.info(f"Final export saved to {export_file}")
+    def _finish(self):
+        """Nothing to commit: every batch is a complete Parquet file"""
 
 
 class FilterPipeline:
@@ -184,6 +385,7 @@ class FilterPipeline:
     def from_crawler(cls, crawler):
         return cls(crawler.settings)
 
+    @timed_pipeline_stage
     def process_item(self, item: VinylProductItem, spider):
         """Filter item based on criteria"""
         price = item.get("price", 0)
@@ -202,6 +404,6 @@ class FilterPipeline:
         return item
 
 
-class DropItem(Exception):
+class DropItem(ScrapyDropItem):
     """Exception raised when an item should be dropped"""
     pass
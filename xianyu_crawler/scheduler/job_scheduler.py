@@ -24,6 +24,7 @@ from xianyu_crawler.settings import (
     SCHEDULER_EXPORT_HOUR,
     JSON_OUTPUT_DIR,
 )
+from xianyu_crawler.storage.export_manifest import ExportManifest
 
 
 class XianyuCrawlerScheduler:
@@ -97,6 +98,18 @@ class XianyuCrawlerScheduler:
         logger.info("=" * 60)
 
         try:
+            # Merge the previous days' export segments into daily partitions
+            compact = subprocess.run(
+                [sys.executable, self.export_script, "--compact"],
+                capture_output=True,
+                text=True,
+            )
+            if compact.returncode == 0:
+                logger.info(compact.stdout)
+            else:
+                logger.error(f"Export compaction failed with return code {compact.returncode}")
+                logger.error(compact.stderr)
+
             # Run export script
             result = subprocess.run(
                 [sys.executable, self.export_script],
@@ -122,9 +135,16 @@ class XianyuCrawlerScheduler:
         if not os.path.exists(JSON_OUTPUT_DIR):
             logger.warning(f"Output directory does not exist: {JSON_OUTPUT_DIR}")
         else:
-            # Count exported files
-            files = [f for f in os.listdir(JSON_OUTPUT_DIR) if f.endswith(".json")]
-            logger.info(f"Found {len(files)} export files")
+            # Count exported files from the export index
+            summary = ExportManifest(str(JSON_OUTPUT_DIR)).summary()
+            logger.info(f"Found {summary['files']} export files ({summary['items']} items)")
+            latest = summary["latest"]
+            if latest:
+                logger.info(
+                    f"Latest export: {latest[-1]['file']} "
+                    f"({len(latest)} file(s), {sum(entry['items'] for entry in latest)} items) "
+                    f"started at {latest[0]['export_time']}"
+                )
 
     def setup_jobs(self):
         """Configure scheduled jobs"""
@@ -45,6 +45,8 @@ DEFAULT_REQUEST_HEADERS = {
 # See https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 SPIDER_MIDDLEWARES = {
     "xianyu_crawler.middlewares.XianyuSpiderMiddleware": 543,
+    # Closest to the spider, so only callback time is measured
+    "xianyu_crawler.middlewares.StageTimingMiddleware": 950,
 }
 
 # Enable or disable downloader middlewares
@@ -58,14 +60,19 @@ DOWNLOADER_MIDDLEWARES = {
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
 EXTENSIONS = {
     "scrapy.extensions.telnet.TelnetConsole": None,
+    "xianyu_crawler.extensions.StageMetrics": 500,
+    "xianyu_crawler.extensions.CrawlLogging": 510,
 }
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 ITEM_PIPELINES = {
+    "xianyu_crawler.pipelines.PriceHistoryPipeline": 50,
     "xianyu_crawler.pipelines.DeduplicationPipeline": 100,
     "xianyu_crawler.pipelines.DataValidationPipeline": 200,
     "xianyu_crawler.pipelines.JsonExportPipeline": 300,
+    # Requires pyarrow
+    # "xianyu_crawler.pipelines.ColumnarExportPipeline": 310,
 }
 
 # Enable and configure the AutoThrottle extension (disabled by default)
@@ -83,8 +90,14 @@ AUTOTHROTTLE_DEBUG = False
 
 # Enable and configure HTTP caching (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html#httpcache-middleware-settings
+# Rendered pages are cached as compressed content-addressed blobs (see
+# storage/response_cache.py); enable with -s HTTPCACHE_ENABLED=1
 HTTPCACHE_ENABLED = False
-# HTTPCACHE_STORAGE = "scrapy.extensions.httpcache.FilesystemCacheStorage"
+HTTPCACHE_STORAGE = "xianyu_crawler.storage.response_cache.ResponseCacheStorage"
+HTTPCACHE_POLICY = "xianyu_crawler.storage.response_cache.ResponseCachePolicy"
+HTTPCACHE_IGNORE_HTTP_CODES = [403, 408, 429, 500, 502, 503, 504]
+# Default TTL for page types missing from RESPONSE_CACHE_TTL (0 = never expires)
+HTTPCACHE_EXPIRATION_SECS = 3600
 
 # Set settings whose default value is deprecated to a future-proof value
 REQUEST_FINGERPRINTER_IMPLEMENTATION = "2.7"
@@ -114,15 +127,72 @@ COOKIES_DIR = DATA_DIR / "cookies"
 CACHE_DIR = DATA_DIR / "cache"
 OUTPUT_DIR = BASE_DIR / "output"
 JSON_OUTPUT_DIR = OUTPUT_DIR / "json"
+PARQUET_OUTPUT_DIR = OUTPUT_DIR / "parquet"
+HISTORY_DIR = DATA_DIR / "history"
+SNAPSHOT_DIR = DATA_DIR / "snapshots"
+HTTPCACHE_DIR = str(DATA_DIR / "httpcache")
+METRICS_DIR = DATA_DIR / "metrics"
+
+# Response cache TTL in seconds per page type (0 = never expires)
+RESPONSE_CACHE_TTL = {
+    "search": 3600,
+    "seller": 3600,
+    "detail": 86400,
+}
+# Serve cached pages regardless of age (combine with HTTPCACHE_IGNORE_MISSING=1 for offline runs)
+RESPONSE_CACHE_REPLAY = False
+
+# Stage timing histograms (download, render wait, parse, pipelines) per page type,
+# written to STAGE_METRICS_DIR as a JSON run report and Prometheus text at spider close
+STAGE_METRICS_ENABLED = True
+STAGE_METRICS_DIR = str(METRICS_DIR)
+# Also rewrite the reports every N seconds during the crawl (0 = only at close)
+STAGE_METRICS_FLUSH_INTERVAL = 0
+
+# Parse detail pages in this many worker processes (-1 = one per CPU, 0 = on the reactor thread)
+PARSE_POOL_WORKERS = 0
+
+# Storage pipelines write files from a bounded thread pool; items are held back
+# while more than IO_POOL_MAX_PENDING writes are queued
+IO_POOL_ENABLED = True
+IO_POOL_THREADS = 4
+IO_POOL_MAX_PENDING = 1000
+
+# Tag items with near-duplicate clusters (relists, same album across sellers)
+NEAR_DUPLICATE_DETECTION = True
+# Newest near-duplicate index entries kept per profile when the index is compacted
+NEAR_DUPLICATE_MAX_ENTRIES = 100_000
+
+# JSON export format: compact by default, optionally gzip/zstd compressed
+JSON_PRETTY = False
+JSON_COMPRESSION = None  # None, "gzip" or "zstd"
+# Exported items go to sequenced segment files, committed (renamed into place)
+# when a segment reaches this many items, uncompressed bytes or seconds open.
+# `scripts/export.py --compact` merges past days into daily_export_* files.
+JSON_SEGMENT_MAX_ITEMS = 5000
+JSON_SEGMENT_MAX_BYTES = 32 * 1024 * 1024
+JSON_SEGMENT_MAX_AGE = 600
 
 # Create directories if they don't exist
-for dir_path in [COOKIES_DIR, CACHE_DIR, JSON_OUTPUT_DIR]:
+for dir_path in [COOKIES_DIR, CACHE_DIR, JSON_OUTPUT_DIR, HISTORY_DIR, SNAPSHOT_DIR]:
     dir_path.mkdir(parents=True, exist_ok=True)
 
 # Logging
 LOG_LEVEL = "INFO"
 LOG_FORMAT = "%(asctime)s [%(name)s] %(levelname)s: %(message)s"
 LOG_DATEFORMAT = "%Y-%m-%d %H:%M:%S"
+# Dropped items are logged at DEBUG without the item; drops are summarized by reason
+LOG_FORMATTER = "xianyu_crawler.utils.log_config.QuietLogFormatter"
+
+# Loguru sinks during crawls (see utils/log_config.py): written by a background
+# thread, per-item messages rate-limited per kind, one progress line per interval
+LOGURU_CONFIGURE = True
+LOGURU_ENQUEUE = True
+# Structured JSON-lines log file, e.g. str(DATA_DIR / "logs" / "crawl.jsonl")
+LOGURU_JSON_PATH = None
+# Per-item log lines per second per message kind (0 = log every item)
+LOG_SAMPLE_RATE = 5
+LOG_PROGRESS_INTERVAL = 60
 
 # Scheduler settings
 SCHEDULER_ENABLED = True
@@ -143,6 +213,17 @@ SEARCH_KEYWORDS = [
 MAX_PAGES_INCREMENTAL = 20
 MAX_PAGES_FULL = 100
 
+# Seller storefronts (personal?userId=...) crawled by seller_spider
+SELLER_IDS = [
+    "2219735146783",  # 音乐大同
+    "1059107164",  # 梦的采摘员
+]
+SELLER_MAX_PAGES = 50
+# Incremental crawls stop paging a storefront after this many consecutive known items
+SELLER_KNOWN_STREAK = 10
+# Request ?page=N+1 when a storefront page has no next link (by default paging stops there)
+SELLER_GUESS_NEXT_PAGE = False
+
 # Retry settings
 RETRY_TIMES = 3
 RETRY_HTTP_CODES = [500, 502, 503, 504, 408, 429]
@@ -0,0 +1,269 @@
+"""
+Seller storefront spider for Xianyu vinyl record crawler
+
+Crawls personal?userId= storefronts for a list of sellers and emits the same
+VinylProductItem schema as VinylSpider, so items go through the existing
+pipelines (price history, dedup, validation, export).
+"""
+
+from datetime import datetime
+from typing import Generator, Optional, Set
+from urllib.parse import urlencode
+
+from loguru import logger
+from scrapy import Request
+from scrapy.http import Response
+from scrapy_playwright.page import PageMethod
+
+from xianyu_crawler.items import VinylProductItem
+from xianyu_crawler.settings import (
+    CACHE_DIR,
+    SELLER_GUESS_NEXT_PAGE,
+    SELLER_IDS,
+    SELLER_KNOWN_STREAK,
+    SELLER_MAX_PAGES,
+    XIANYU_BASE_URL,
+)
+from xianyu_crawler.spiders.vinyl_spider import VinylSpider, _as_bool
+from xianyu_crawler.storage.dedup import DeduplicationManager
+
+# Product links on a storefront page; each link is one listing card
+STOREFRONT_CARD_SELECTOR = 'a[href*="/item?id="], a[href*="itemId="]'
+STOREFRONT_TITLE_SELECTOR = '[class*="title"] ::text, [class*="Title"] ::text'
+STOREFRONT_PRICE_SELECTOR = '[class*="price"], [class*="Price"]'
+STOREFRONT_NEXT_SELECTOR = "a.next::attr(href), .pagination .next::attr(href)"
+
+# Card text marking a listing that is no longer for sale
+SOLD_MARKERS = ("已售", "已下架", "售罄")
+
+
+class SellerSpider(VinylSpider):
+    """
+    Spider for crawling seller storefronts from Xianyu
+
+    Every seller gets its own download slot, so storefronts are crawled in
+    parallel (bounded by CONCURRENT_REQUESTS) while requests to one storefront
+    keep the configured per-slot delay. Pages of one storefront are fetched
+    one after another, following the page's next link: paging stops on a page
+    without one (unless SELLER_GUESS_NEXT_PAGE requests ?page=N+1 instead),
+    and incremental crawls also stop once SELLER_KNOWN_STREAK consecutive
+    listings are already known to the dedup cache.
+
+    Usage:
+        scrapy crawl seller_spider
+        scrapy crawl seller_spider -a sellers=2219735146783,1059107164 -a crawl_type=full
+        # Against a local fixture server serving plain HTML
+        scrapy crawl seller_spider -a base_url=http://127.0.0.1:8000 -a playwright=false
+    """
+
+    name = "seller_spider"
+
+    def __init__(
+        self,
+        sellers: Optional[str] = None,
+        crawl_type: str = "incremental",
+        base_url: str = XIANYU_BASE_URL,
+        playwright="true",
+        details="true",
+        *args,
+        **kwargs,
+    ):
+        """
+        Initialize spider
+
+        Args:
+            sellers: Comma-separated seller userIds (default: SELLER_IDS setting)
+            crawl_type: "incremental" (default) stops at known listings, "full" pages to the end
+            base_url: Site root, e.g. a local fixture server
+            playwright: Render pages with Playwright ("false" for plain HTTP)
+            details: Follow listing detail pages ("false" emits storefront card data only)
+        """
+        super().__init__(crawl_type, base_url=base_url, playwright=playwright, *args, **kwargs)
+        self.seller_ids = [s.strip() for s in sellers.split(",") if s.strip()] if sellers else None
+        self.follow_details = _as_bool(details)
+        self.known_ids: Set[str] = set()
+        # Listings already scheduled in this run, per seller
+        self.scheduled_ids = {}
+
+    def storefront_url(self, seller_id: str, page: int = 1) -> str:
+        """URL of one storefront page"""
+        params = {"userId": seller_id}
+        if page > 1:
+            params["page"] = page
+        return f"{self.base_url}/personal?{urlencode(params)}"
+
+    def start_requests(self) -> Generator[Request, None, None]:
+        """
+        Generate the first storefront request for every seller
+        """
+        settings = self.settings
+        if self.seller_ids is None:
+            self.seller_ids = settings.getlist("SELLER_IDS", SELLER_IDS)
+        self.max_pages = settings.getint("SELLER_MAX_PAGES", SELLER_MAX_PAGES)
+        self.known_streak = settings.getint("SELLER_KNOWN_STREAK", SELLER_KNOWN_STREAK)
+        self.guess_next_page = settings.getbool("SELLER_GUESS_NEXT_PAGE", SELLER_GUESS_NEXT_PAGE)
+
+        if self.crawl_type != "full":
+            cache_dir = settings.get("CACHE_DIR", CACHE_DIR)
+            self.known_ids = DeduplicationManager(str(cache_dir)).load_seen_ids()
+
+        logger.info(
+            f"SellerSpider: {len(self.seller_ids)} sellers, {self.crawl_type} crawl, "
+            f"max_pages={self.max_pages}, {len(self.known_ids)} known listings"
+        )
+
+        for seller_id in self.seller_ids:
+            self.scheduled_ids[seller_id] = set()
+            yield self._storefront_request(seller_id, 1)
+
+    def _request_meta(self, seller_id: str, wait_for: str, **meta) -> dict:
+        """Request meta with the seller's download slot and optional Playwright rendering"""
+        meta["seller_id"] = seller_id
+        meta["download_slot"] = f"seller-{seller_id}"
+        if self.use_playwright:
+            meta["playwright"] = True
+            meta["playwright_page_methods"] = [
+                PageMethod("wait_for_selector", wait_for, timeout=30000),
+                PageMethod("wait_for_timeout", 2000),
+            ]
+        return meta
+
+    def _storefront_request(
+        self, seller_id: str, page: int, url: Optional[str] = None, known_streak: int = 0
+    ) -> Request:
+        return Request(
+            url=url or self.storefront_url(seller_id, page),
+            callback=self.parse_storefront,
+            meta=self._request_meta(
+                seller_id, STOREFRONT_CARD_SELECTOR, page=page, known_streak=known_streak
+            ),
+        )
+
+    def parse_storefront(self, response: Response) -> Generator:
+        """
+        Parse one storefront page
+
+        Args:
+            response: Scrapy response object
+
+        Yields:
+            Detail page requests (or card items), then the next storefront page
+        """
+        seller_id = response.meta["seller_id"]
+        page = response.meta.get("page", 1)
+        streak = response.meta.get("known_streak", 0)
+        scheduled = self.scheduled_ids.setdefault(seller_id, set())
+
+        cards = response.css(STOREFRONT_CARD_SELECTOR)
+        logger.info(f"Seller {seller_id} page {page}: {len(cards)} listings")
+
+        fresh = 0
+        reached_known = False
+        for card in cards:
+            link = response.urljoin(card.attrib.get("href", ""))
+            product_id = self._extract_product_id(link)
+            if not product_id or product_id in scheduled:
+                continue
+            scheduled.add(product_id)
+            fresh += 1
+
+            if product_id in self.known_ids:
+                streak += 1
+                if streak >= self.known_streak:
+                    reached_known = True
+                    break
+                continue
+            streak = 0
+
+            try:
+                title = self._card_title(card)
+                price_text = self._card_price(card)
+                available = not any(marker in self._card_text(card) for marker in SOLD_MARKERS)
+
+                if self.follow_details and available:
+                    yield Request(
+                        url=link,
+                        callback=self.detail_callback,
+                        meta=self._request_meta(
+                            seller_id,
+                            "div.product-detail, .Item--main",
+                            product_id=product_id,
+                            title=title,
+                            price_text=price_text,
+                        ),
+                    )
+                else:
+                    yield self._card_item(seller_id, product_id, link, title, price_text, available)
+
+            except Exception as e:
+                logger.error(f"Error parsing storefront card {product_id}: {e}")
+                continue
+
+        if reached_known:
+            logger.info(f"Seller {seller_id}: reached known listings on page {page}, stopping")
+            return
+        if not fresh:
+            logger.info(f"Seller {seller_id}: no new listings on page {page}, stopping")
+            return
+        if page >= self.max_pages:
+            logger.info(f"Seller {seller_id}: reached max_pages={self.max_pages}")
+            return
+
+        next_page = response.css(STOREFRONT_NEXT_SELECTOR).get()
+        if not next_page and not self.guess_next_page:
+            logger.info(f"Seller {seller_id}: no next page link on page {page}, stopping")
+            return
+        next_url = response.urljoin(next_page) if next_page else None
+        yield self._storefront_request(seller_id, page + 1, url=next_url, known_streak=streak)
+
+    def _detail_item(self, response: Response, fields: dict) -> VinylProductItem:
+        """Detail page item, with the seller ID from the storefront if the page lacks it"""
+        item = super()._detail_item(response, fields)
+        if not item.get("seller_id"):
+            item["seller_id"] = response.meta.get("seller_id")
+        return item
+
+    def _card_item(
+        self,
+        seller_id: str,
+        product_id: str,
+        link: str,
+        title: Optional[str],
+        price_text: Optional[str],
+        available: bool,
+    ) -> VinylProductItem:
+        """Item built from storefront card data only"""
+        item = VinylProductItem()
+        item["product_id"] = product_id
+        item["link"] = link
+        item["title"] = title or ""
+        item["price"] = self._parse_price([price_text]) if price_text else 0.0
+        item["seller_id"] = seller_id
+        item["crawled_at"] = datetime.now()
+        item["is_available"] = available
+        return item
+
+    @staticmethod
+    def _card_text(card) -> str:
+        return "".join(card.css("::text").getall())
+
+    @staticmethod
+    def _card_title(card) -> Optional[str]:
+        title = " ".join(
+            t.strip() for t in card.css(STOREFRONT_TITLE_SELECTOR).getall() if t.strip()
+        )
+        return title or card.attrib.get("title")
+
+    @staticmethod
+    def _card_price(card) -> Optional[str]:
+        price = card.css(STOREFRONT_PRICE_SELECTOR)
+        if not price:
+            return None
+        return "".join(price[0].css("::text").getall()).strip() or None
+
+
+if __name__ == "__main__":
+    # Run spider using Scrapy CLI
+    import scrapy.cmdline
+
+    scrapy.cmdline.execute(["scrapy", "crawl", "seller_spider", "-a", "crawl_type=incremental"])
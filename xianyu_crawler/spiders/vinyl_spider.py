@@ -5,11 +5,12 @@ Crawls product listings and details from Xianyu (Idle Fish) platform
 """
 
 import asyncio
+import re
 from datetime import datetime
 from typing import Generator, Optional
 
 from loguru import logger
-from scrapy import Request, Spider
+from scrapy import Request, Spider, signals
 from scrapy.http import Response
 from scrapy_playwright.page import PageMethod
 
@@ -21,6 +22,61 @@ from xianyu_crawler.settings import (
     MAX_PAGES_INCREMENTAL,
     MAX_PAGES_FULL,
 )
+from xianyu_crawler.utils.extraction import (
+    FieldSpec,
+    compile_fields,
+    join_text,
+    non_empty,
+    strip_all,
+    strip_or_none,
+)
+from xianyu_crawler.utils.log_config import sampled
+from xianyu_crawler.utils.parse_pool import ParsePool
+from xianyu_crawler.utils.validators import (
+    INT_PATTERN,
+    PRICE_PATTERN,
+    PRODUCT_ID_PATTERNS,
+    parse_int,
+)
+
+# Listing links also come as legacy static pages (/<id>.htm); extract_product_id
+# in validators does not accept those
+SPIDER_PRODUCT_ID_PATTERNS = PRODUCT_ID_PATTERNS + (re.compile(r"/(\d+)\.htm"),)
+
+# Detail page fields, compiled once and extracted in a single document walk
+DETAIL_PAGE_EXTRACTOR = compile_fields([
+    FieldSpec("title", ".item-title, .Title--text, h1::text"),
+    FieldSpec("price", ".price, .Price--price, .PriceAmount::text", many=True),
+    FieldSpec(
+        "seller_name",
+        ".seller-name, .SellerInfo--nick, .user-nick::text",
+        post=strip_or_none,
+    ),
+    FieldSpec("seller_credit", ".seller-credit, .credit-score::text", post=parse_int),
+    FieldSpec("seller_id", ".seller-id::attr(data-id)"),
+    FieldSpec("seller_location", ".seller-location, .Location--text::text", post=strip_or_none),
+    FieldSpec("condition", ".condition, .Condition--text::text", post=strip_or_none),
+    FieldSpec("trade_type", ".trade-type, .TradeMethod--text::text", post=strip_or_none),
+    FieldSpec("location", ".location, .Location--address::text", post=strip_or_none),
+    FieldSpec("publish_time", ".publish-time, .Time--text::text", post=strip_or_none),
+    FieldSpec("view_count", ".view-count, .ViewCount--text::text", post=parse_int),
+    FieldSpec("want_count", ".want-count, .WantCount--text::text", post=parse_int),
+    FieldSpec(
+        "images",
+        ".product-images img::attr(src), .Image--image::attr(src)",
+        many=True,
+        post=non_empty,
+    ),
+    FieldSpec("description", ".description, .Description--text::text", many=True, post=join_text),
+    FieldSpec("tags", ".tags .tag::text, .Tag--text::text", many=True, post=strip_all),
+])
+
+
+def _as_bool(value) -> bool:
+    """Parse a spider argument (-a name=value) as a boolean"""
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() not in ("0", "false", "no", "off", "")
 
 
 class VinylSpider(Spider):
@@ -35,20 +91,53 @@ class VinylSpider(Spider):
         },
     }
 
-    def __init__(self, crawl_type="incremental", *args, **kwargs):
+    def __init__(
+        self,
+        crawl_type="incremental",
+        keywords=None,
+        base_url=XIANYU_BASE_URL,
+        playwright="true",
+        *args,
+        **kwargs,
+    ):
         """
         Initialize spider
 
         Args:
             crawl_type: Type of crawl - "incremental" (default) or "full"
+            keywords: Comma-separated search keywords (default: SEARCH_KEYWORDS)
+            base_url: Site root, e.g. a local mock server
+            playwright: Render pages with Playwright ("false" for plain HTTP)
         """
         super().__init__(*args, **kwargs)
         self.crawl_type = crawl_type
         self.max_pages = MAX_PAGES_FULL if crawl_type == "full" else MAX_PAGES_INCREMENTAL
-        self.keywords = SEARCH_KEYWORDS
+        self.keywords = [k for k in keywords.split(",") if k] if keywords else SEARCH_KEYWORDS
+        self.base_url = base_url.rstrip("/")
+        self.search_url = (
+            XIANYU_SEARCH_URL if base_url == XIANYU_BASE_URL else f"{self.base_url}/search"
+        )
+        self.use_playwright = _as_bool(playwright)
+        # Process pool for detail page parsing (PARSE_POOL_WORKERS), None parses in-thread
+        self.parse_pool: Optional[ParsePool] = None
 
         logger.info(f"VinylSpider initialized: {crawl_type} crawl, max_pages={self.max_pages}")
 
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        workers = crawler.settings.getint("PARSE_POOL_WORKERS", 0)
+        if workers:
+            spider.parse_pool = ParsePool(workers if workers > 0 else None)
+            crawler.signals.connect(spider.parse_pool.start, signal=signals.engine_started)
+            crawler.signals.connect(spider.parse_pool.close, signal=signals.spider_closed)
+        return spider
+
+    @property
+    def detail_callback(self):
+        """Callback for detail pages: pooled when a parse pool is configured"""
+        return self.parse_product_detail_pooled if self.parse_pool else self.parse_product_detail
+
     def start_requests(self) -> Generator[Request, None, None]:
         """
         Generate initial search requests
@@ -58,7 +147,7 @@ class VinylSpider(Spider):
             encoded_keyword = keyword.replace(" ", "+")
 
             # Construct search URL
-            search_url = f"{XIANYU_SEARCH_URL}?q={encoded_keyword}"
+            search_url = f"{self.search_url}?q={encoded_keyword}"
 
             logger.info(f"Starting search for keyword: {keyword}")
 
@@ -68,7 +157,7 @@ class VinylSpider(Spider):
                 meta={
                     "keyword": keyword,
                     "page": 1,
-                    "playwright": True,
+                    "playwright": self.use_playwright,
                     "playwright_page_methods": [
                         PageMethod("wait_for_selector", "div.search-items", timeout=30000),
                         PageMethod("wait_for_timeout", 3000),  # Wait for dynamic content
@@ -76,6 +165,11 @@ class VinylSpider(Spider):
                 },
             )
 
+    async def start(self):
+        """Entry point on Scrapy >= 2.13, which no longer calls start_requests()"""
+        for request in self.start_requests():
+            yield request
+
     def parse_search_results(self, response: Response) -> Generator[Request, None, None]:
         """
         Parse search results page and extract product links
@@ -107,7 +201,7 @@ class VinylSpider(Spider):
 
                 # Make absolute URL
                 if link.startswith("/"):
-                    link = f"{XIANYU_BASE_URL}{link}"
+                    link = f"{self.base_url}{link}"
 
                 # Extract basic info
                 title = card.css("a::attr(title), .title::text").get()
@@ -120,18 +214,19 @@ class VinylSpider(Spider):
                     logger.warning(f"Could not extract product ID from: {link}")
                     continue
 
-                logger.debug(f"Found product: {title} ({product_id})")
+                if sampled("found_product", "DEBUG"):
+                    logger.debug(f"Found product: {title} ({product_id})")
 
                 # Yield request for detail page
                 yield Request(
                     url=link,
-                    callback=self.parse_product_detail,
+                    callback=self.detail_callback,
                     meta={
                         "product_id": product_id,
                         "title": title,
                         "price_text": price_text,
                         "keyword": keyword,
-                        "playwright": True,
+                        "playwright": self.use_playwright,
                         "playwright_page_methods": [
                             PageMethod("wait_for_selector", "div.product-detail, .Item--main", timeout=30000),
                             PageMethod("wait_for_timeout", 2000),
@@ -150,7 +245,7 @@ class VinylSpider(Spider):
 
             if next_page:
                 if next_page.startswith("/"):
-                    next_page = f"{XIANYU_BASE_URL}{next_page}"
+                    next_page = f"{self.base_url}{next_page}"
 
                 logger.info(f"Following to next page: {current_page + 1}")
 
@@ -160,7 +255,7 @@ class VinylSpider(Spider):
                     meta={
                         "keyword": keyword,
                         "page": current_page + 1,
-                        "playwright": True,
+                        "playwright": self.use_playwright,
                         "playwright_page_methods": [
                             PageMethod("wait_for_selector", "div.search-items", timeout=30000),
                             PageMethod("wait_for_timeout", 3000),
@@ -178,85 +273,78 @@ class VinylSpider(Spider):
         Returns:
             VinylProductItem or None
         """
-        product_id = response.meta.get("product_id")
-        title = response.meta.get("title")
-        price_text = response.meta.get("price_text")
-
         try:
-            item = VinylProductItem()
+            # Extract all detail fields in one pass over the document
+            fields = DETAIL_PAGE_EXTRACTOR.extract_response(response)
+            yield self._detail_item(response, fields)
 
-            # Basic info
-            item["product_id"] = product_id
-            item["link"] = response.url
-            item["crawled_at"] = datetime.now()
-            item["is_available"] = True
-
-            # Extract title
-            if not title:
-                title = response.css(".item-title, .Title--text, h1::text").get()
-            item["title"] = title.strip() if title else ""
-
-            # Extract and parse price
-            price = self._parse_price(response.css(".price, .Price--price, .PriceAmount::text").getall())
-            if not price and price_text:
-                price = self._parse_price([price_text])
-            item["price"] = price
+        except Exception as e:
+            logger.error(f"Error parsing product detail for {response.meta.get('product_id')}: {e}")
+            return None
 
-            # Extract seller info
-            seller_name = response.css(".seller-name, .SellerInfo--nick, .user-nick::text").get()
-            seller_credit = response.css(".seller-credit, .credit-score::text").get()
-            seller_id = response.css(".seller-id::attr(data-id)").get()
+    async def parse_product_detail_pooled(self, response: Response):
+        """
+        Parse product detail page, extracting fields in the parse pool
 
-            item["seller_name"] = seller_name.strip() if seller_name else None
-            item["seller_credit"] = self._parse_int(seller_credit)
-            item["seller_id"] = seller_id
+        Args:
+            response: Scrapy response object
 
-            # Extract seller location
-            seller_location = response.css(".seller-location, .Location--text::text").get()
-            item["seller_location"] = seller_location.strip() if seller_location else None
+        Yields:
+            VinylProductItem
+        """
+        try:
+            fields = await self.parse_pool.extract_detail(response.body, response.encoding)
+            item = self._detail_item(response, fields)
+        except Exception as e:
+            logger.error(f"Error parsing product detail for {response.meta.get('product_id')}: {e}")
+            return
 
-            # Extract product condition
-            condition = response.css(".condition, .Condition--text::text").get()
-            item["condition"] = condition.strip() if condition else None
+        yield item
 
-            # Extract trade type
-            trade_type = response.css(".trade-type, .TradeMethod--text::text").get()
-            item["trade_type"] = trade_type.strip() if trade_type else None
+    def _detail_item(self, response: Response, fields: dict) -> VinylProductItem:
+        """
+        Build an item from extracted detail fields and the search card meta
 
-            # Extract location
-            location = response.css(".location, .Location--address::text").get()
-            item["location"] = location.strip() if location else None
+        Args:
+            response: Detail page response
+            fields: Output of DETAIL_PAGE_EXTRACTOR
 
-            # Extract publish time
-            publish_time = response.css(".publish-time, .Time--text::text").get()
-            item["publish_time"] = publish_time.strip() if publish_time else None
+        Returns:
+            VinylProductItem
+        """
+        product_id = response.meta.get("product_id")
+        title = response.meta.get("title")
+        price_text = response.meta.get("price_text")
 
-            # Extract engagement metrics
-            view_count = response.css(".view-count, .ViewCount--text::text").get()
-            want_count = response.css(".want-count, .WantCount--text::text").get()
+        item = VinylProductItem()
 
-            item["view_count"] = self._parse_int(view_count)
-            item["want_count"] = self._parse_int(want_count)
+        # Basic info
+        item["product_id"] = product_id
+        item["link"] = response.url
+        item["keyword"] = response.meta.get("keyword")
+        item["crawled_at"] = datetime.now()
+        item["is_available"] = True
 
-            # Extract images
-            images = response.css(".product-images img::attr(src), .Image--image::attr(src)").getall()
-            item["images"] = [img for img in images if img]
+        # Title from the search card takes precedence
+        if not title:
+            title = fields["title"]
+        item["title"] = title.strip() if title else ""
 
-            # Extract description
-            description = response.css(".description, .Description--text::text").getall()
-            item["description"] = " ".join(d.strip() for d in description if d.strip()) if description else None
+        # Parse price, falling back to the search card price
+        price = self._parse_price(fields["price"])
+        if not price and price_text:
+            price = self._parse_price([price_text])
+        item["price"] = price
 
-            # Extract tags
-            tags = response.css(".tags .tag::text, .Tag--text::text").getall()
-            item["tags"] = [tag.strip() for tag in tags if tag.strip()]
+        # Remaining fields are already post-processed by the spec
+        for field_name, value in fields.items():
+            if field_name not in ("title", "price"):
+                item[field_name] = value
 
+        if sampled("parsed_product"):
             logger.info(f"Successfully parsed product: {product_id} - {item.get('title')}")
 
-            yield item
-
-        except Exception as e:
-            logger.error(f"Error parsing product detail for {product_id}: {e}")
-            return None
+        return item
 
     def _extract_product_id(self, url: str) -> Optional[str]:
         """
@@ -268,17 +356,8 @@ class VinylSpider(Spider):
         Returns:
             Product ID or None
         """
-        import re
-
-        patterns = [
-            r"item\.htm\?id=(\d+)",
-            r"item/(\d+)",
-            r"id=(\d+)",
-            r"/(\d+)\.htm",
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, url)
+        for pattern in SPIDER_PRODUCT_ID_PATTERNS:
+            match = pattern.search(url)
             if match:
                 return match.group(1)
 
@@ -294,13 +373,11 @@ class VinylSpider(Spider):
         Returns:
             Parsed price as float
         """
-        import re
-
         for elem in price_elements:
             if elem:
                 # Remove currency symbols and extract number
                 price_str = elem.replace("¥", "").replace("$", "").replace(",", "").strip()
-                match = re.search(r"(\d+\.?\d*)", price_str)
+                match = PRICE_PATTERN.search(price_str)
                 if match:
                     try:
                         return round(float(match.group(1)), 2)
@@ -322,9 +399,7 @@ class VinylSpider(Spider):
         if not value:
             return None
 
-        import re
-
-        match = re.search(r"(\d+)", str(value))
+        match = INT_PATTERN.search(str(value))
         if match:
             try:
                 return int(match.group(1))
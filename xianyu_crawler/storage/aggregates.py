@@ -0,0 +1,353 @@
+"""
+Incremental export aggregates for Xianyu crawler
+
+Keeps a persisted manifest of per-file summaries (item count, top wanted
+items) keyed by path, mtime and size, and a global product map (product_id ->
+price, number of files containing it) from which the deduplicated price
+statistics are maintained. Refreshing the aggregates only reads export files
+that are new or have changed since the last run; adding or removing a file
+updates the product map with that file's product IDs only.
+"""
+
+import hashlib
+import heapq
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from loguru import logger
+
+from xianyu_crawler.storage.json_stream import iter_records
+from xianyu_crawler.storage.serialization import read_json, write_json
+
+MANIFEST_VERSION = 2
+
+# Fields kept for each top-wanted entry
+TOP_WANTED_FIELDS = ("product_id", "title", "price", "want_count")
+# Fields read from export files (everything summarize_items() looks at)
+SUMMARY_FIELDS = TOP_WANTED_FIELDS
+
+
+def _want_count(item: Dict[str, Any]) -> int:
+    return item.get("want_count") or 0
+
+
+def summarize_items(items: Iterable[Dict[str, Any]], top_k: int = 10) -> Dict[str, Any]:
+    """
+    Summarize the items of one export file
+
+    Items are deduplicated by product_id within the file (first occurrence
+    wins, as in filter_duplicates).
+
+    Args:
+        items: Item dictionaries from an export file
+        top_k: Number of most wanted items to keep
+
+    Returns:
+        Summary dictionary with a "products" map (product_id -> price) for
+        the cross-file product map
+    """
+    total = 0
+    products: Dict[str, Any] = {}
+    unique = []
+    for item in items:
+        total += 1
+        product_id = item.get("product_id")
+        if product_id and product_id not in products:
+            products[product_id] = item.get("price") or None
+            unique.append(item)
+
+    top_wanted = heapq.nlargest(top_k, unique, key=_want_count)
+
+    return {
+        "items": total,
+        "top_wanted": [{f: item.get(f) for f in TOP_WANTED_FIELDS} for item in top_wanted],
+        "products": products,
+    }
+
+
+def merge_summaries(summaries: Iterable[Dict[str, Any]], top_k: int = 10) -> Dict[str, Any]:
+    """
+    Merge per-file summaries into file and item totals
+
+    Args:
+        summaries: Per-file summaries from summarize_items()
+        top_k: Number of most wanted items to keep
+
+    Returns:
+        Totals dictionary
+    """
+    totals = {"files": 0, "items": 0, "top_wanted": []}
+    # Highest want count seen per product across files
+    wanted: Dict[str, Dict[str, Any]] = {}
+
+    for summary in summaries:
+        totals["files"] += 1
+        totals["items"] += summary["items"]
+        for entry in summary["top_wanted"]:
+            current = wanted.get(entry["product_id"])
+            if current is None or _want_count(entry) > _want_count(current):
+                wanted[entry["product_id"]] = entry
+
+    totals["top_wanted"] = heapq.nlargest(top_k, wanted.values(), key=_want_count)
+    return totals
+
+
+class ProductAggregates:
+    """
+    Price statistics over the distinct products of all export files
+
+    products maps product_id to [price, number of files containing it]. A
+    product keeps the price of the file it was first added from, and its
+    price leaves the statistics when the last file containing it is removed.
+    """
+
+    def __init__(self, products: Dict[str, List[Any]], stats: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            products: Persisted product map
+            stats: Persisted statistics of the map (recomputed if missing)
+        """
+        self.products = products
+        if stats is None:
+            self.price_count = 0
+            self.price_sum = 0.0
+            for price, _ in products.values():
+                if price:
+                    self.price_count += 1
+                    self.price_sum += price
+            self._extremes_stale = True
+        else:
+            self.price_count = stats["price_count"]
+            self.price_sum = stats["price_sum"]
+            self.price_min = stats["price_min"]
+            self.price_max = stats["price_max"]
+            self._extremes_stale = False
+
+    def add(self, products: Dict[str, Any]):
+        """Add the products (product_id -> price) of one file"""
+        for product_id, price in products.items():
+            entry = self.products.get(product_id)
+            if entry is not None:
+                entry[1] += 1
+                continue
+            self.products[product_id] = [price, 1]
+            if price:
+                self.price_count += 1
+                self.price_sum += price
+                if not self._extremes_stale:
+                    if self.price_min is None or price < self.price_min:
+                        self.price_min = price
+                    if self.price_max is None or price > self.price_max:
+                        self.price_max = price
+
+    def remove(self, product_ids: Iterable[str]):
+        """Remove the product IDs of one file"""
+        for product_id in product_ids:
+            entry = self.products.get(product_id)
+            if entry is None:
+                continue
+            entry[1] -= 1
+            if entry[1] > 0:
+                continue
+            del self.products[product_id]
+            price = entry[0]
+            if price:
+                self.price_count -= 1
+                self.price_sum -= price
+                if price == self.price_min or price == self.price_max:
+                    self._extremes_stale = True
+
+    def stats(self) -> Dict[str, Any]:
+        """Unique item count and price statistics"""
+        if self._extremes_stale:
+            prices = [price for price, _ in self.products.values() if price]
+            self.price_min = min(prices) if prices else None
+            self.price_max = max(prices) if prices else None
+            self._extremes_stale = False
+        if not self.price_count:
+            # Drop accumulated float error once no price is left
+            self.price_sum = 0.0
+        return {
+            "unique_items": len(self.products),
+            "price_count": self.price_count,
+            "price_min": self.price_min,
+            "price_max": self.price_max,
+            "price_sum": self.price_sum,
+        }
+
+
+class ExportAggregateCache:
+    """
+    Persisted aggregate manifest over a directory of export files
+
+    The manifest (small, read on every refresh) holds per-file summaries and
+    merged totals. The product map and the product IDs of each file are
+    only loaded when some export file was added, changed or removed, and
+    then only the ID lists of those files are read.
+    """
+
+    def __init__(self, cache_dir: str, top_k: int = 10):
+        """
+        Args:
+            cache_dir: Directory for the manifest and product files
+            top_k: Number of most wanted items kept per file and in totals
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest_file = self.cache_dir / "export_aggregates.json"
+        self.products_file = self.cache_dir / "export_aggregate_products.json"
+        self.ids_dir = self.cache_dir / "export_aggregate_ids"
+        self.top_k = top_k
+
+    def _load(self, path: Path) -> Optional[Any]:
+        if not path.exists():
+            return None
+        try:
+            return read_json(path)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable aggregate cache {path}: {e}")
+            return None
+
+    def _save(self, path: Path, data: Any):
+        """Write a cache file atomically"""
+        tmp_path = path.with_name(path.name + ".tmp")
+        write_json(tmp_path, data)
+        os.replace(tmp_path, path)
+
+    def _ids_path(self, key: str) -> Path:
+        """File holding the product IDs of one export file"""
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:24]
+        return self.ids_dir / f"{digest}.json"
+
+    def _empty_manifest(self) -> Dict[str, Any]:
+        return {
+            "version": MANIFEST_VERSION,
+            "top_k": self.top_k,
+            "generation": 0,
+            "files": {},
+            "products": None,
+            "totals": None,
+        }
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        manifest = self._load(self.manifest_file)
+        if (
+            manifest is None
+            or manifest.get("version") != MANIFEST_VERSION
+            or manifest.get("top_k") != self.top_k
+        ):
+            return self._empty_manifest()
+        return manifest
+
+    def refresh(self, json_files: Iterable[Path]) -> Dict[str, Any]:
+        """
+        Bring the aggregates up to date with the given export files
+
+        Args:
+            json_files: Export files to aggregate (plain or compressed JSON)
+
+        Returns:
+            Totals dictionary (see merge_summaries and ProductAggregates.stats)
+            plus "scanned_files"
+        """
+        current = {}
+        for path in json_files:
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            current[str(path)] = (path, stat.st_mtime_ns, stat.st_size)
+        return self._refresh(current)
+
+    def refresh_from_index(
+        self, output_dir: str, files: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Bring the aggregates up to date using export index entries
+
+        Modification times and sizes come from the index, so unchanged files
+        are not stat()ed.
+
+        Args:
+            output_dir: Export directory
+            files: Entries by file name (ExportManifest.files())
+
+        Returns:
+            Totals dictionary (see merge_summaries and ProductAggregates.stats)
+            plus "scanned_files"
+        """
+        current = {}
+        for name, entry in files.items():
+            path = Path(output_dir) / name
+            current[str(path)] = (path, entry["mtime_ns"], entry["size"])
+        return self._refresh(current)
+
+    def _refresh(self, current: Dict[str, tuple]) -> Dict[str, Any]:
+        manifest = self._load_manifest()
+        entries: Dict[str, Dict[str, Any]] = manifest["files"]
+
+        stale = [
+            key
+            for key, (_, mtime_ns, size) in current.items()
+            if key not in entries
+            or entries[key]["mtime_ns"] != mtime_ns
+            or entries[key]["size"] != size
+        ]
+        removed = [key for key in entries if key not in current]
+
+        if not stale and not removed and manifest["totals"] is not None:
+            return {**manifest["totals"], "scanned_files": 0}
+
+        # The product map and the manifest are saved one after the other; a
+        # generation mismatch means a refresh was interrupted in between
+        saved = self._load(self.products_file)
+        generation = manifest.get("generation", 0)
+        if saved is None or manifest["products"] is None or saved["generation"] != generation:
+            if entries:
+                logger.info("Export aggregate product map is out of date, rescanning all files")
+            manifest = self._empty_manifest()
+            entries = manifest["files"]
+            stale, removed, saved = list(current), [], {"products": {}}
+        aggregates = ProductAggregates(saved["products"], manifest["products"])
+
+        # Take the products of removed and changed files out of the map first
+        for key in removed + [key for key in stale if key in entries]:
+            entries.pop(key, None)
+            ids_path = self._ids_path(key)
+            aggregates.remove(self._load(ids_path) or [])
+            ids_path.unlink(missing_ok=True)
+
+        self.ids_dir.mkdir(exist_ok=True)
+        scanned = 0
+        for key in stale:
+            path, mtime_ns, size = current[key]
+            try:
+                summary = summarize_items(iter_records(path, fields=SUMMARY_FIELDS), self.top_k)
+            except Exception as e:
+                logger.warning(f"Error reading {path}: {e}")
+                continue
+            file_products = summary.pop("products")
+            aggregates.add(file_products)
+            self._save(self._ids_path(key), list(file_products))
+            entries[key] = {"mtime_ns": mtime_ns, "size": size, **summary}
+            scanned += 1
+
+        manifest["products"] = aggregates.stats()
+        manifest["totals"] = {
+            **merge_summaries(entries.values(), self.top_k),
+            **manifest["products"],
+        }
+
+        manifest["generation"] = generation + 1
+        self._save(
+            self.products_file,
+            {"generation": manifest["generation"], "products": aggregates.products},
+        )
+        self._save(self.manifest_file, manifest)
+
+        logger.debug(
+            f"Export aggregates refreshed: {scanned} scanned, {len(removed)} removed, "
+            f"{len(entries)} total files"
+        )
+        return {**manifest["totals"], "scanned_files": scanned}
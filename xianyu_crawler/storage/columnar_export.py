@@ -0,0 +1,184 @@
+"""
+Parquet export functionality for Xianyu crawler
+
+Writes products in the VinylProductModel schema to a Parquet dataset
+partitioned by crawl date and search keyword, so analytics can read only
+the columns and partitions they need.
+"""
+
+from collections import defaultdict
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from xianyu_crawler.storage.serialization import dumps
+from xianyu_crawler.utils.validators import sanitize_filename
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+PYARROW_AVAILABLE = pa is not None
+
+# Partition value for items without a keyword
+UNKNOWN_KEYWORD = "unknown"
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("Parquet export requires the 'pyarrow' package")
+
+
+def product_schema() -> "pa.Schema":
+    """
+    Arrow schema matching VinylProductModel (partition columns excluded)
+
+    changes (field-level deltas of mixed value types) is stored as a JSON string.
+    """
+    _require_pyarrow()
+    return pa.schema(
+        [
+            ("product_id", pa.string()),
+            ("title", pa.string()),
+            ("price", pa.float64()),
+            ("link", pa.string()),
+            ("seller_name", pa.string()),
+            ("seller_credit", pa.int32()),
+            ("seller_id", pa.string()),
+            ("seller_location", pa.string()),
+            ("description", pa.string()),
+            ("condition", pa.string()),
+            ("trade_type", pa.string()),
+            ("location", pa.string()),
+            ("publish_time", pa.string()),
+            ("view_count", pa.int64()),
+            ("want_count", pa.int64()),
+            ("images", pa.list_(pa.string())),
+            ("crawled_at", pa.timestamp("us")),
+            ("is_available", pa.bool_()),
+            ("tags", pa.list_(pa.string())),
+            ("change_type", pa.string()),
+            ("changes", pa.string()),
+            ("listing_cluster", pa.string()),
+            ("album_cluster", pa.string()),
+        ]
+    )
+
+
+def _crawl_date(value: Any) -> str:
+    """Partition date (YYYY-MM-DD) from a crawled_at value"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, (datetime, date)):
+        return value.strftime("%Y-%m-%d")
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+class ColumnarExporter:
+    """
+    Handles exporting scraped data to a partitioned Parquet dataset
+
+    Layout: <output_dir>/crawl_date=YYYY-MM-DD/keyword=<keyword>/part-*.parquet
+    """
+
+    def __init__(self, output_dir: str, row_group_size: int = 50_000, compression: str = "zstd"):
+        """
+        Args:
+            output_dir: Root directory of the Parquet dataset
+            row_group_size: Maximum rows per row group
+            compression: Parquet codec (zstd, snappy, gzip, none)
+        """
+        _require_pyarrow()
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.schema = product_schema()
+
+    def _to_table(self, items: List[Dict[str, Any]]) -> "pa.Table":
+        """Build an Arrow table from item dicts"""
+        columns = {}
+        for field in self.schema:
+            values = [item.get(field.name) for item in items]
+            if field.name == "crawled_at":
+                values = [datetime.fromisoformat(v) if isinstance(v, str) else v for v in values]
+            elif field.name in ("images", "tags"):
+                values = [list(v) if v else [] for v in values]
+            elif field.name == "changes":
+                values = [dumps(v).decode("utf-8") if v else None for v in values]
+            columns[field.name] = values
+        return pa.Table.from_pydict(columns, schema=self.schema)
+
+    def export_items(self, items: List[Dict[str, Any]], keyword: Optional[str] = None) -> List[str]:
+        """
+        Export items to the dataset, one file per (crawl date, keyword) partition
+
+        Args:
+            items: List of item dictionaries (VinylProductModel.to_dict() shape)
+            keyword: Keyword for items without their own "keyword" value
+
+        Returns:
+            Paths of the written files
+        """
+        partitions: Dict[tuple, List[Dict[str, Any]]] = defaultdict(list)
+        for item in items:
+            item_keyword = item.get("keyword") or keyword or UNKNOWN_KEYWORD
+            partitions[(_crawl_date(item.get("crawled_at")), item_keyword)].append(item)
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        written = []
+
+        try:
+            for (crawl_date, item_keyword), partition_items in sorted(partitions.items()):
+                partition_dir = (
+                    self.output_dir
+                    / f"crawl_date={crawl_date}"
+                    / f"keyword={sanitize_filename(item_keyword)}"
+                )
+                partition_dir.mkdir(parents=True, exist_ok=True)
+                output_path = partition_dir / f"part-{timestamp}.parquet"
+
+                pq.write_table(
+                    self._to_table(partition_items),
+                    output_path,
+                    row_group_size=self.row_group_size,
+                    compression=self.compression,
+                    write_statistics=True,
+                )
+                written.append(str(output_path))
+
+            logger.info(f"Exported {len(items)} items to {len(written)} Parquet partition(s)")
+            return written
+
+        except Exception as e:
+            logger.error(f"Error exporting items to Parquet: {e}")
+            raise
+
+    def read_table(
+        self,
+        columns: Optional[List[str]] = None,
+        filter_expression=None,
+    ) -> "pa.Table":
+        """
+        Read the dataset with column projection and partition/row-group pruning
+
+        Args:
+            columns: Columns to read (None for all)
+            filter_expression: pyarrow.dataset expression, e.g.
+                (ds.field("crawl_date") == "2026-02-08") & (ds.field("price") < 300)
+
+        Returns:
+            Arrow table
+        """
+        # An explicit schema keeps files written before a column was added readable
+        schema = product_schema().append(pa.field("crawl_date", pa.string()))
+        schema = schema.append(pa.field("keyword", pa.string()))
+        dataset = ds.dataset(
+            str(self.output_dir), schema=schema, format="parquet", partitioning="hive"
+        )
+        return dataset.to_table(columns=columns, filter=filter_expression)
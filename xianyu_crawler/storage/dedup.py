@@ -2,30 +2,346 @@
 Deduplication utilities for Xianyu crawler
 """
 
+import base64
 import hashlib
+import re
+import sys
+from array import array
+from collections import Counter
+from functools import lru_cache
+from itertools import chain
+from operator import itemgetter
 from pathlib import Path
-from typing import Set, List, Optional
+from typing import Any, Dict, Set, List, Optional, Tuple
 
 from loguru import logger
 
+from xianyu_crawler.storage.serialization import dumps, loads
+from xianyu_crawler.utils.titles import normalize_title
+
+# Mutable fields tracked for change detection, in fingerprint order
+TRACKED_FIELDS = ("price", "want_count", "view_count", "is_available")
+
+
+def tracked_values(item: dict) -> tuple:
+    """
+    Extract the normalized mutable field values of an item
+
+    Args:
+        item: Item dictionary
+
+    Returns:
+        Tuple of values in TRACKED_FIELDS order
+    """
+    price = item.get("price")
+    want_count = item.get("want_count")
+    view_count = item.get("view_count")
+    return (
+        round(float(price), 2) if price is not None else None,
+        int(want_count) if want_count is not None else None,
+        int(view_count) if view_count is not None else None,
+        bool(item.get("is_available", True)),
+    )
+
+
+def mutable_fingerprint(values: tuple) -> int:
+    """
+    Compute a compact 64-bit fingerprint of tracked field values
+
+    Args:
+        values: Tuple from tracked_values()
+
+    Returns:
+        Fingerprint as an integer (stable across processes)
+    """
+    digest = hashlib.blake2b(repr(values).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+# Near-duplicate profiles: (text fields, default Jaccard similarity threshold)
+NEAR_DUPLICATE_PROFILES = {
+    # Relisted items: same listing text with small edits (price is ignored)
+    "listing": (("title", "description"), 0.8),
+    # Same album across sellers: title only, looser threshold
+    "album": (("title",), 0.6),
+}
+
+MINHASH_PERMUTATIONS = 64
+SHINGLE_SIZE = 3
+MAX_DESCRIPTION_CHARS = 500
+# Near-duplicate entries kept per profile when the index file is compacted
+MAX_NEAR_DUPLICATE_ENTRIES = 100_000
+# Keys kept per LSH bucket, and candidates verified when assigning a cluster
+MAX_BUCKET_KEYS = 64
+CLUSTER_CANDIDATES = 8
+
+_EMPTY_BIN = 0xFFFFFFFF
+# Bins an empty bin borrows from, in order: a fixed pseudo-random permutation
+# per bin (signatures are persisted and must be stable across runs)
+_DENSIFY_PROBES = [
+    sorted(
+        range(MINHASH_PERMUTATIONS),
+        key=lambda j, i=i: hashlib.blake2b(f"{i}:{j}".encode(), digest_size=8).digest(),
+    )
+    for i in range(MINHASH_PERMUTATIONS)
+]
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=262144)
+def _feature_hash(feature: str) -> int:
+    digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    """Character shingles of a text with whitespace removed"""
+    text = WHITESPACE_PATTERN.sub("", text)
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i : i + size] for i in range(len(text) - size + 1)}
+
+
+def field_shingles(name: str, value: Any) -> Set[str]:
+    """
+    Shingles of one text field, prefixed with the field name
+
+    Titles are normalized (listing noise removed) first; other fields are
+    lowercased and truncated to MAX_DESCRIPTION_CHARS. The prefix keeps title
+    and description text from mixing.
+    """
+    if not value:
+        return set()
+    if name == "title":
+        text = normalize_title(value)
+    else:
+        text = str(value)[:MAX_DESCRIPTION_CHARS].lower()
+    return {f"{name[0]}:{s}" for s in shingles(text)}
+
+
+def item_shingles(item: dict, fields) -> Set[str]:
+    """
+    Shingles of an item's text fields (see field_shingles)
+
+    Args:
+        item: Item dictionary
+        fields: Field names
+
+    Returns:
+        Set of shingles
+    """
+    features = set()
+    for name in fields:
+        features.update(field_shingles(name, item.get(name)))
+    return features
+
+
+def minhash(features: Set[str]) -> bytes:
+    """
+    One-permutation MinHash signature of a feature set
+
+    Each feature is hashed once: the low bits of the hash pick one of
+    MINHASH_PERMUTATIONS bins and the high 32 bits compete for the bin's
+    minimum. Each empty bin borrows the value of the first non-empty bin in
+    its own probe sequence (optimal densification), so that short titles,
+    which leave many bins empty, do not get runs of identical bins. As with
+    classic MinHash, the fraction of equal positions in two
+    signatures estimates the Jaccard similarity of the sets, at one hash
+    per feature instead of one per feature and permutation.
+
+    Args:
+        features: Feature strings
+
+    Returns:
+        MINHASH_PERMUTATIONS unsigned 32-bit values, packed little-endian
+        (all bins empty for an empty set)
+    """
+    bins = [_EMPTY_BIN] * MINHASH_PERMUTATIONS
+    for feature in features:
+        h = _feature_hash(feature)
+        b = h % MINHASH_PERMUTATIONS
+        value = h >> 32
+        if value < bins[b]:
+            bins[b] = value
+
+    if _EMPTY_BIN in bins and features:
+        filled = bins[:]
+        for i, probes in enumerate(_DENSIFY_PROBES):
+            if filled[i] == _EMPTY_BIN:
+                for j in probes:
+                    if filled[j] != _EMPTY_BIN:
+                        bins[i] = filled[j]
+                        break
+
+    signature = array("I", bins)
+    if sys.byteorder == "big":
+        signature.byteswap()
+    return signature.tobytes()
+
+
+def signature_similarity(a: bytes, b: bytes) -> float:
+    """
+    Fraction of equal positions in two signatures (estimated Jaccard similarity)
+
+    The signatures are XORed as big integers and the zero 32-bit words of
+    the result counted, so no Python code runs per position.
+    """
+    diff = array("I")
+    diff.frombytes(
+        (int.from_bytes(a, "little") ^ int.from_bytes(b, "little")).to_bytes(len(a), "little")
+    )
+    return diff.count(0) / len(diff)
+
+
+def lsh_bands(
+    threshold: float, permutations: int = MINHASH_PERMUTATIONS, recall: float = 0.95
+) -> Tuple[int, int]:
+    """
+    Choose LSH (bands, rows) for a similarity threshold
+
+    Picks the most selective banding that still makes a pair exactly at the
+    threshold a candidate with the given probability; candidates are verified
+    against the threshold afterwards.
+
+    Returns:
+        (bands, rows per band)
+    """
+    best = (permutations, 1)
+    for rows in range(1, permutations + 1):
+        bands = permutations // rows
+        if 1 - (1 - threshold**rows) ** bands >= recall:
+            best = (bands, rows)
+    return best
+
+
+class MinHashLSHIndex:
+    """
+    MinHash signatures with LSH band tables
+
+    Signatures are split into bands; only keys that share at least one full
+    band with the query are compared, and candidates are kept when their
+    estimated Jaccard similarity reaches the threshold. A bucket keeps its
+    newest max_bucket_keys keys: a band value shared by that many listings
+    (common title words) says little about any of them, and unbounded
+    buckets would make every query scan most of the index.
+    """
+
+    def __init__(self, threshold: float = 0.8, max_bucket_keys: int = MAX_BUCKET_KEYS):
+        """
+        Args:
+            threshold: Minimum estimated Jaccard similarity for a near duplicate
+            max_bucket_keys: Keys kept per LSH bucket
+        """
+        self.threshold = threshold
+        self.max_bucket_keys = max_bucket_keys
+        self.bands, self.rows = lsh_bands(threshold)
+        self.signatures: Dict[str, bytes] = {}
+        self.clusters: Dict[str, str] = {}
+        self._buckets: List[Dict[bytes, List[str]]] = [{} for _ in range(self.bands)]
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def _band_keys(self, signature: bytes):
+        width = self.rows * 4
+        for band in range(self.bands):
+            yield signature[band * width : (band + 1) * width]
+
+    def add(self, key: str, signature: bytes, cluster: str):
+        """Index a signature under a key with its cluster ID"""
+        if key not in self.signatures:
+            for buckets, band_key in zip(self._buckets, self._band_keys(signature)):
+                bucket = buckets.setdefault(band_key, [])
+                bucket.append(key)
+                if len(bucket) > self.max_bucket_keys:
+                    del bucket[0]
+        self.signatures[key] = signature
+        self.clusters[key] = cluster
+
+    def query(
+        self, signature: bytes, exclude: Optional[str] = None, limit: Optional[int] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Keys whose estimated similarity reaches the threshold
+
+        Args:
+            signature: MinHash signature to look up
+            exclude: Key to leave out (the item itself)
+            limit: Verify only this many candidates, those sharing the most
+                bands with the query (default: all)
+
+        Returns:
+            (key, estimated Jaccard similarity) pairs, most similar first
+        """
+        shared_bands = Counter(
+            chain.from_iterable(
+                buckets.get(band_key, ())
+                for buckets, band_key in zip(self._buckets, self._band_keys(signature))
+            )
+        )
+        shared_bands.pop(exclude, None)
+        candidates = shared_bands.items()
+        if limit and len(shared_bands) > limit:
+            candidates = sorted(candidates, key=itemgetter(1), reverse=True)[:limit]
+
+        matches = []
+        for key, _ in candidates:
+            similarity = signature_similarity(signature, self.signatures[key])
+            if similarity >= self.threshold:
+                matches.append((key, similarity))
+        matches.sort(key=lambda match: (-match[1], match[0]))
+        return matches
+
 
 class DeduplicationManager:
     """
     Manages deduplication of scraped items
     """
 
-    def __init__(self, cache_dir: str):
+    def __init__(
+        self,
+        cache_dir: str,
+        near_duplicate_thresholds: Optional[Dict[str, float]] = None,
+        writer=None,
+        max_near_duplicate_entries: int = MAX_NEAR_DUPLICATE_ENTRIES,
+    ):
+        """
+        Args:
+            cache_dir: Directory for the dedup files
+            near_duplicate_thresholds: Jaccard similarity threshold per
+                near-duplicate profile, overriding NEAR_DUPLICATE_PROFILES defaults
+            writer: IOWriterPool for background appends (None writes synchronously)
+            max_near_duplicate_entries: Newest entries kept per near-duplicate
+                profile when the index file is compacted
+        """
         self.cache_dir = Path(cache_dir)
+        self.writer = writer
         self.cache_dir.mkdir(parents=True, exist_ok=True)
 
         # Files for storing seen IDs and hashes
         self.seen_ids_file = self.cache_dir / "seen_products.txt"
         self.seen_hashes_file = self.cache_dir / "seen_hashes.txt"
+        self.states_file = self.cache_dir / "product_states.jsonl"
+        self.near_duplicates_file = self.cache_dir / "near_duplicates.jsonl"
+
+        # Near-duplicate indexes per profile, loaded on first use
+        self.near_duplicate_thresholds = {
+            profile: threshold for profile, (_, threshold) in NEAR_DUPLICATE_PROFILES.items()
+        }
+        self.near_duplicate_thresholds.update(near_duplicate_thresholds or {})
+        self._near_duplicate_indexes: Optional[Dict[str, MinHashLSHIndex]] = None
+        self.max_near_duplicate_entries = max_near_duplicate_entries
+        self._near_duplicate_log_lines = 0
 
         # In-memory sets for quick lookup
         self.seen_ids: Set[str] = set()
         self.seen_hashes: Set[str] = set()
 
+        # Last known fingerprint and tracked values per product
+        self.product_states: Dict[str, Tuple[int, tuple]] = {}
+        self._state_log_lines = 0
+
         # Load existing data
         self._load_from_disk()
 
@@ -49,18 +365,39 @@ class DeduplicationManager:
             except Exception as e:
                 logger.error(f"Error loading seen hashes: {e}")
 
+        # Load product states (append-only log, last entry wins)
+        if self.states_file.exists():
+            try:
+                with open(self.states_file, "rb") as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        product_id, fingerprint, *values = loads(line)
+                        self.product_states[product_id] = (fingerprint, tuple(values))
+                        self._state_log_lines += 1
+                logger.info(f"Loaded {len(self.product_states)} product states")
+            except Exception as e:
+                logger.error(f"Error loading product states: {e}")
+
+    def _append(self, path: Path, data: bytes, what: str):
+        """Append to one of the dedup files, in the background when a writer is set"""
+        if self.writer is not None:
+            self.writer.append(path, data)
+            return
+
+        try:
+            with open(path, "ab") as f:
+                f.write(data)
+        except Exception as e:
+            logger.error(f"Error saving {what}: {e}")
+
     def save_seen_id(self, product_id: str):
         """Add a product ID to the seen set and save to disk"""
         if product_id in self.seen_ids:
             return
 
         self.seen_ids.add(product_id)
-
-        try:
-            with open(self.seen_ids_file, "a", encoding="utf-8") as f:
-                f.write(f"{product_id}\n")
-        except Exception as e:
-            logger.error(f"Error saving seen ID: {e}")
+        self._append(self.seen_ids_file, f"{product_id}\n".encode("utf-8"), "seen ID")
 
     def save_seen_hash(self, content_hash: str):
         """Add a content hash to the seen set and save to disk"""
@@ -68,12 +405,241 @@ class DeduplicationManager:
             return
 
         self.seen_hashes.add(content_hash)
+        self._append(self.seen_hashes_file, f"{content_hash}\n".encode("utf-8"), "seen hash")
+
+    def save_state(self, product_id: str, fingerprint: int, values: tuple):
+        """Record the tracked values of a product and append them to disk"""
+        self.product_states[product_id] = (fingerprint, values)
+        self._append(
+            self.states_file, dumps([product_id, fingerprint, *values]) + b"\n", "product state"
+        )
+        self._state_log_lines += 1
+
+    def upsert_item(self, item: dict) -> Tuple[str, Dict[str, Dict[str, Any]]]:
+        """
+        Classify an item against the last known state of its product
+
+        Unchanged items cost one fingerprint and one dict lookup. New and
+        updated items have their state recorded.
+
+        Args:
+            item: Item dictionary with a product_id
+
+        Returns:
+            (status, changes) where status is "new", "updated" or "unchanged"
+            and changes maps each changed field to {"old": ..., "new": ...}
+        """
+        product_id = item.get("product_id")
+        values = tracked_values(item)
+        fingerprint = mutable_fingerprint(values)
+        previous = self.product_states.get(product_id)
+
+        if previous is not None and previous[0] == fingerprint:
+            return "unchanged", {}
+
+        self.save_state(product_id, fingerprint, values)
+
+        if previous is None:
+            if product_id in self.seen_ids:
+                # Seen before state tracking existed: record a baseline only
+                return "unchanged", {}
+            self.save_seen_id(product_id)
+            return "new", {}
+
+        changes = {
+            field: {"old": old, "new": new}
+            for field, old, new in zip(TRACKED_FIELDS, previous[1], values)
+            if old != new
+        }
+        return "updated", changes
+
+    def compact_states(self):
+        """
+        Rewrite the product state log with one entry per product
+
+        With a writer, compaction runs after the pending state appends.
+
+        Returns:
+            Deferred fired when done if a writer is set, else None
+        """
+        if self._state_log_lines <= len(self.product_states):
+            return None
+        if self.writer is not None:
+            return self.writer.submit(self.states_file, self._compact_states)
+        self._compact_states()
+        return None
+
+    def _compact_states(self):
+        tmp_file = self.states_file.with_suffix(".tmp")
+        try:
+            with open(tmp_file, "wb") as f:
+                for product_id, (fingerprint, values) in self.product_states.items():
+                    f.write(dumps([product_id, fingerprint, *values]) + b"\n")
+            tmp_file.replace(self.states_file)
+            logger.info(
+                f"Compacted product states: {self._state_log_lines} -> "
+                f"{len(self.product_states)} entries"
+            )
+            self._state_log_lines = len(self.product_states)
+        except Exception as e:
+            logger.error(f"Error compacting product states: {e}")
+
+    def _near_duplicate_index(self, profile: str) -> MinHashLSHIndex:
+        """Index of a near-duplicate profile, loading all profiles on first use"""
+        if self._near_duplicate_indexes is None:
+            self._near_duplicate_indexes = {
+                name: MinHashLSHIndex(threshold)
+                for name, threshold in self.near_duplicate_thresholds.items()
+            }
+            if self.near_duplicates_file.exists():
+                outdated = 0
+                try:
+                    with open(self.near_duplicates_file, "rb") as f:
+                        for line in f:
+                            if not line.strip():
+                                continue
+                            self._near_duplicate_log_lines += 1
+                            name, key, signature, cluster = loads(line)
+                            if not isinstance(signature, str):
+                                # Signature of the former 64-permutation MinHash
+                                outdated += 1
+                            elif name in self._near_duplicate_indexes:
+                                self._near_duplicate_indexes[name].add(
+                                    key, base64.b64decode(signature), cluster
+                                )
+                except Exception as e:
+                    logger.error(f"Error loading near-duplicate index: {e}")
+                if outdated:
+                    logger.info(
+                        f"Ignoring {outdated} near-duplicate entries with outdated signatures"
+                    )
+
+        if profile not in self._near_duplicate_indexes:
+            raise ValueError(f"Unknown near-duplicate profile: {profile}")
+        return self._near_duplicate_indexes[profile]
+
+    def _item_key(self, item: dict) -> str:
+        return item.get("product_id") or self.generate_content_hash(item)
+
+    def find_near_duplicates(self, item: dict, profile: str = "listing") -> List[Tuple[str, float]]:
+        """
+        Find indexed items whose text is nearly identical to an item
+
+        Args:
+            item: Item dictionary
+            profile: "listing" (title + description, relists) or "album"
+                (title only, cross-seller grouping)
+
+        Returns:
+            (product_id, estimated similarity) pairs, most similar first
+        """
+        index = self._near_duplicate_index(profile)
+        signature = minhash(item_shingles(item, NEAR_DUPLICATE_PROFILES[profile][0]))
+        return index.query(signature, exclude=self._item_key(item))
+
+    def assign_cluster(self, item: dict, profile: str = "listing") -> str:
+        """
+        Return the near-duplicate cluster ID of an item, indexing it if new
+
+        An item joins the cluster of its most similar indexed item (among the
+        CLUSTER_CANDIDATES items sharing the most LSH bands with it);
+        otherwise it starts a cluster named after its own product_id. A known
+        item keeps its cluster.
 
+        Args:
+            item: Item dictionary
+            profile: "listing" or "album" (see find_near_duplicates)
+
+        Returns:
+            Cluster ID
+        """
+        return self._assign_cluster(item, profile, self._item_key(item), {})
+
+    def assign_clusters(self, item: dict) -> Dict[str, str]:
+        """
+        Return the cluster ID of an item in every near-duplicate profile
+
+        Like assign_cluster(), but the shingles of fields shared by several
+        profiles (the title) are computed once.
+
+        Returns:
+            Cluster ID per profile
+        """
+        key = self._item_key(item)
+        field_features: Dict[str, Set[str]] = {}
+        return {
+            profile: self._assign_cluster(item, profile, key, field_features)
+            for profile in NEAR_DUPLICATE_PROFILES
+        }
+
+    def _assign_cluster(
+        self, item: dict, profile: str, key: str, field_features: Dict[str, Set[str]]
+    ) -> str:
+        index = self._near_duplicate_index(profile)
+        if key in index.clusters:
+            return index.clusters[key]
+
+        features = set()
+        for name in NEAR_DUPLICATE_PROFILES[profile][0]:
+            if name not in field_features:
+                field_features[name] = field_shingles(name, item.get(name))
+            features |= field_features[name]
+        signature = minhash(features)
+        matches = index.query(signature, exclude=key, limit=CLUSTER_CANDIDATES)
+        cluster = index.clusters[matches[0][0]] if matches else key
+        index.add(key, signature, cluster)
+        self._append(
+            self.near_duplicates_file,
+            dumps([profile, key, base64.b64encode(signature).decode("ascii"), cluster]) + b"\n",
+            "near-duplicate entry",
+        )
+        self._near_duplicate_log_lines += 1
+
+        return cluster
+
+    def compact_near_duplicates(self):
+        """
+        Rewrite the near-duplicate index file with the indexed entries
+
+        Drops entries with outdated signatures and keeps the newest
+        max_near_duplicate_entries entries of each profile. With a writer,
+        compaction runs after the pending appends.
+
+        Returns:
+            Deferred fired when done if a writer is set, else None
+        """
+        if self._near_duplicate_indexes is None:
+            return None
+        entries = []
+        for profile, index in self._near_duplicate_indexes.items():
+            keys = list(index.signatures)[-self.max_near_duplicate_entries :]
+            entries.extend(
+                (profile, key, index.signatures[key], index.clusters[key]) for key in keys
+            )
+        if self._near_duplicate_log_lines <= len(entries):
+            return None
+        if self.writer is not None:
+            return self.writer.submit(
+                self.near_duplicates_file, self._compact_near_duplicates, entries
+            )
+        self._compact_near_duplicates(entries)
+        return None
+
+    def _compact_near_duplicates(self, entries: List[Tuple[str, str, bytes, str]]):
+        tmp_file = self.near_duplicates_file.with_suffix(".tmp")
         try:
-            with open(self.seen_hashes_file, "a", encoding="utf-8") as f:
-                f.write(f"{content_hash}\n")
+            with open(tmp_file, "wb") as f:
+                for profile, key, signature, cluster in entries:
+                    encoded = base64.b64encode(signature).decode("ascii")
+                    f.write(dumps([profile, key, encoded, cluster]) + b"\n")
+            tmp_file.replace(self.near_duplicates_file)
+            logger.info(
+                f"Compacted near-duplicate index: {self._near_duplicate_log_lines} -> "
+                f"{len(entries)} entries"
+            )
+            self._near_duplicate_log_lines = len(entries)
         except Exception as e:
-            logger.error(f"Error saving seen hash: {e}")
+            logger.error(f"Error compacting near-duplicate index: {e}")
 
     def load_seen_ids(self) -> Set[str]:
         """Get all seen product IDs"""
@@ -102,7 +668,9 @@ class DeduplicationManager:
             MD5 hash of the content
         """
         # Create a string from key fields
-        content_str = f"{item.get('title', '')}|{item.get('price', '')}|{item.get('seller_name', '')}"
+        content_str = (
+            f"{item.get('title', '')}|{item.get('price', '')}|{item.get('seller_name', '')}"
+        )
 
         # Generate MD5 hash
         return hashlib.md5(content_str.encode("utf-8")).hexdigest()
@@ -123,8 +691,15 @@ class DeduplicationManager:
         return {
             "seen_ids_count": len(self.seen_ids),
             "seen_hashes_count": len(self.seen_hashes),
+            "product_states_count": len(self.product_states),
+            "near_duplicate_entries": {
+                profile: len(index)
+                for profile, index in (self._near_duplicate_indexes or {}).items()
+            },
             "seen_ids_file": str(self.seen_ids_file),
             "seen_hashes_file": str(self.seen_hashes_file),
+            "states_file": str(self.states_file),
+            "near_duplicates_file": str(self.near_duplicates_file),
         }
 
 
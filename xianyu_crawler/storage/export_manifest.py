@@ -0,0 +1,328 @@
+"""
+Export manifest index for Xianyu crawler
+
+Every writer of the JSON export directory (segments, compaction, JsonExporter)
+records the files it writes in manifests/export_index.json: path, export
+time, size, item count, price min/max and the byte offsets of the first
+records. Updates are read-modify-write transactions under a lock file and
+replace the index atomically, so readers always see a consistent index.
+
+Readers (export.py --latest/--stats/--filter, the scheduler health check)
+answer from the index instead of listing and stat()ing the directory, and
+read preview records by seeking to their offsets instead of loading the
+whole file. Segments carry the run that wrote them, so "the latest export"
+is every segment of the most recent crawl rather than its last segment. The
+index is rebuilt from the directory when it is missing, from an older
+version, or refers to a file that no longer exists.
+"""
+
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from loguru import logger
+
+from xianyu_crawler.storage.json_stream import JsonRecordReader, iter_records
+from xianyu_crawler.storage.serialization import (
+    list_json_files,
+    loads,
+    open_binary,
+    read_json,
+    strip_json_suffix,
+    write_json,
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers in one process are still serialized
+    fcntl = None
+
+INDEX_VERSION = 2
+INDEX_DIR = "manifests"
+INDEX_FILE = "export_index.json"
+# Records whose byte offsets are kept for previews
+PREVIEW_RECORDS = 5
+# Kinds derived from other exports, never the latest export itself
+DERIVED_KINDS = ("filtered",)
+
+# Serializes index transactions between threads; flock covers other processes
+_thread_lock = threading.Lock()
+
+
+def export_kind(name: str) -> str:
+    """Kind of export file: segment, daily, batch, filtered, latest or other"""
+    stem = strip_json_suffix(name)
+    for prefix, kind in (
+        ("segment_", "segment"),
+        ("daily_export_", "daily"),
+        ("vinyl_products_", "batch"),
+        ("filtered_products_", "filtered"),
+        ("latest", "latest"),
+    ):
+        if stem.startswith(prefix):
+            return kind
+    return "other"
+
+
+def _segment_day(name: str) -> str:
+    """Day (YYYYMMDD) in a segment file name"""
+    return strip_json_suffix(name).rsplit("_", 1)[-1]
+
+
+class EntryStats:
+    """
+    Accumulates the index entry of a file while its items are written
+
+    Pass add() as the on_item callback of write_json_stream().
+    """
+
+    def __init__(self):
+        self.items = 0
+        self.price_min = None
+        self.price_max = None
+        self.offsets: List[List[int]] = []
+
+    def add(self, item: Dict[str, Any], start: Optional[int] = None, end: Optional[int] = None):
+        """
+        Count one written item
+
+        Args:
+            item: Item dictionary
+            start: Byte offset of the item's JSON in the uncompressed file
+            end: Byte offset just past the item's JSON
+        """
+        self.items += 1
+        price = item.get("price")
+        if price:
+            if self.price_min is None or price < self.price_min:
+                self.price_min = price
+            if self.price_max is None or price > self.price_max:
+                self.price_max = price
+        if start is not None and len(self.offsets) < PREVIEW_RECORDS:
+            self.offsets.append([start, end])
+
+    def entry(
+        self, path: Path, export_time: Optional[str] = None, run: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Index entry of a completely written file
+
+        Args:
+            path: File path
+            export_time: Export time recorded in the file header
+            run: ID of the crawl run that wrote the file (segments)
+        """
+        stat = path.stat()
+        modified = datetime.fromtimestamp(stat.st_mtime).isoformat()
+        return {
+            "file": path.name,
+            "kind": export_kind(path.name),
+            "export_time": export_time or modified,
+            "run": run,
+            "modified": modified,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "items": self.items,
+            "price_min": self.price_min,
+            "price_max": self.price_max,
+            "offsets": self.offsets,
+        }
+
+
+class ExportManifest:
+    """
+    Index of the export files in one output directory
+    """
+
+    def __init__(self, output_dir: str):
+        """
+        Args:
+            output_dir: JSON export directory
+        """
+        self.output_dir = Path(output_dir)
+        self.index_dir = self.output_dir / INDEX_DIR
+        self.index_file = self.index_dir / INDEX_FILE
+        self.lock_file = self.index_dir / f"{INDEX_FILE}.lock"
+
+    @contextmanager
+    def _locked(self):
+        """Hold the index lock for a read-modify-write transaction"""
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        with _thread_lock, open(self.lock_file, "a+b") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            yield
+
+    def _read(self) -> Optional[Dict[str, Any]]:
+        try:
+            index = read_json(self.index_file)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable export index {self.index_file}: {e}")
+            return None
+        if index.get("version") != INDEX_VERSION:
+            return None
+        return index
+
+    def _write(self, files: Dict[str, Dict[str, Any]]):
+        write_json(
+            self.index_file,
+            {"version": INDEX_VERSION, "updated_at": datetime.now().isoformat(), "files": files},
+            atomic=True,
+        )
+
+    def update(
+        self,
+        added: Iterable[Dict[str, Any]] = (),
+        removed: Iterable[str] = (),
+    ):
+        """
+        Add and remove entries in one transaction
+
+        Args:
+            added: Entries from EntryStats.entry() (replacing entries of the same file)
+            removed: File names to drop
+        """
+        with self._locked():
+            index = self._read()
+            files = index["files"] if index is not None else self._scan()
+            for name in removed:
+                files.pop(name, None)
+            for entry in added:
+                files[entry["file"]] = entry
+            self._write(files)
+
+    def record(
+        self,
+        path: Path,
+        stats: EntryStats,
+        export_time: Optional[str] = None,
+        run: Optional[str] = None,
+    ):
+        """Add the entry of a file that has just been written"""
+        self.update(added=[stats.entry(Path(path), export_time, run)])
+
+    def files(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Entries of all export files by file name
+
+        Builds the index from the directory if there is none.
+        """
+        index = self._read()
+        if index is not None:
+            return index["files"]
+        return self.rebuild()
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """
+        Entry of the most recently written export file, with its "path"
+
+        Filtered outputs are skipped. Rebuilds the index if that file no
+        longer exists.
+        """
+        for attempt in range(2):
+            entries = [e for e in self.files().values() if e["kind"] not in DERIVED_KINDS]
+            if not entries:
+                return None
+            entry = max(entries, key=lambda e: e["mtime_ns"])
+            path = self.output_dir / entry["file"]
+            if path.exists():
+                return {**entry, "path": str(path)}
+            if attempt == 0:
+                logger.info(f"Export index is out of date ({entry['file']} is gone), rebuilding")
+                self.rebuild()
+        return None
+
+    def latest_run(self) -> List[Dict[str, Any]]:
+        """
+        Entries of the most recent export, in sequence order, with their "path"
+
+        When the latest file is a segment, this is every segment of its run
+        (of its day, for segments written before runs were recorded);
+        otherwise the latest file alone.
+        """
+        latest = self.latest()
+        if latest is None or latest["kind"] != "segment":
+            return [latest] if latest else []
+
+        def same_export(entry: Dict[str, Any]) -> bool:
+            if entry["kind"] != "segment":
+                return False
+            if latest["run"]:
+                return entry.get("run") == latest["run"]
+            return _segment_day(entry["file"]) == _segment_day(latest["file"])
+
+        entries = []
+        for entry in sorted(self.files().values(), key=lambda e: e["file"]):
+            path = self.output_dir / entry["file"]
+            if same_export(entry) and path.exists():
+                entries.append({**entry, "path": str(path)})
+        return entries
+
+    def rebuild(self) -> Dict[str, Dict[str, Any]]:
+        """Rebuild the index by reading every export file in the directory"""
+        with self._locked():
+            files = self._scan()
+            self._write(files)
+        logger.info(f"Export index rebuilt: {len(files)} files")
+        return files
+
+    def _scan(self) -> Dict[str, Dict[str, Any]]:
+        files = {}
+        for path in sorted(list_json_files(self.output_dir)):
+            reader = JsonRecordReader(path, fields=("price",))
+            stats = EntryStats()
+            try:
+                for item in reader:
+                    if isinstance(item, dict):
+                        stats.add(item)
+            except Exception as e:
+                logger.warning(f"Not indexing unreadable export file {path}: {e}")
+                continue
+            header = reader.header
+            files[path.name] = stats.entry(path, header.get("export_time"), header.get("run"))
+        return files
+
+    def preview(self, entry: Dict[str, Any], count: int = 3) -> List[Dict[str, Any]]:
+        """
+        First records of an indexed file
+
+        Seeks to the recorded offsets; files indexed without offsets (by a
+        rebuild) are read up to the last preview record.
+
+        Args:
+            entry: Index entry
+            count: Number of records
+
+        Returns:
+            Up to count item dictionaries
+        """
+        path = self.output_dir / entry["file"]
+        offsets = entry.get("offsets") or []
+        if not offsets:
+            return list(islice(iter_records(path), count))
+
+        offsets = offsets[:count]
+        with open_binary(path) as f:
+            f.seek(offsets[0][0])
+            data = f.read(offsets[-1][1] - offsets[0][0])
+        base = offsets[0][0]
+        return [loads(data[start - base : end - base]) for start, end in offsets]
+
+    def summary(self) -> Dict[str, Any]:
+        """File and item counts by kind, and the files of the latest export"""
+        files = self.files()
+        kinds: Dict[str, int] = {}
+        for entry in files.values():
+            kinds[entry["kind"]] = kinds.get(entry["kind"], 0) + 1
+        return {
+            "files": len(files),
+            "items": sum(entry["items"] for entry in files.values()),
+            "bytes": sum(entry["size"] for entry in files.values()),
+            "kinds": kinds,
+            "latest": self.latest_run(),
+        }
@@ -0,0 +1,189 @@
+"""
+Background I/O for storage pipelines
+
+IOWriterPool runs file writes on a bounded thread pool so the reactor thread
+never blocks on disk. Writes are queued per key (usually the target file):
+writes with the same key run one after another in submission order, writes
+with different keys run in parallel. Consecutive appends to one file are
+coalesced into a single open/write. Pipelines return backpressure(item) from
+process_item, which delays the item while too many writes are pending, and
+drain() from close_spider.
+"""
+
+import weakref
+from collections import deque
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from loguru import logger
+from scrapy import signals
+from twisted.internet import defer
+from twisted.python.threadpool import ThreadPool
+
+# One pool per crawler, shared by all pipelines
+_crawler_pools = weakref.WeakKeyDictionary()
+
+
+def _append_chunks(path: Path, chunks: List[bytes]):
+    with open(path, "ab") as f:
+        f.write(b"".join(chunks))
+
+
+class _Task:
+    __slots__ = ("call", "chunks", "deferred")
+
+    def __init__(self, call: Callable[[], Any], chunks: Optional[List[bytes]] = None):
+        self.call = call
+        self.chunks = chunks
+        self.deferred = defer.Deferred()
+
+    @property
+    def weight(self) -> int:
+        return len(self.chunks) if self.chunks is not None else 1
+
+
+class IOWriterPool:
+    """
+    Bounded thread pool with ordered per-key write queues
+
+    All methods must be called from the reactor thread. Failed writes are
+    logged and do not stop later writes; their Deferreds fire with None.
+    """
+
+    def __init__(self, threads: int = 4, max_pending: int = 1000, name: str = "xianyu-io"):
+        """
+        Args:
+            threads: Maximum number of writer threads
+            max_pending: Pending writes above which backpressure() delays items
+            name: Thread pool name
+        """
+        self.threadpool = ThreadPool(0, threads, name)
+        self.max_pending = max_pending
+        self.pending = 0
+        self._queues: Dict[Any, Deque[_Task]] = {}
+        self._running = set()
+        self._waiters: List[defer.Deferred] = []
+        self._idle: List[defer.Deferred] = []
+
+    @classmethod
+    def from_crawler(cls, crawler) -> Optional["IOWriterPool"]:
+        """
+        Shared pool of a crawler, or None when IO_POOL_ENABLED is off
+
+        The pool is stopped when the engine stops.
+        """
+        settings = crawler.settings
+        if not settings.getbool("IO_POOL_ENABLED", True):
+            return None
+        pool = _crawler_pools.get(crawler)
+        if pool is None:
+            pool = cls(
+                threads=settings.getint("IO_POOL_THREADS", 4),
+                max_pending=settings.getint("IO_POOL_MAX_PENDING", 1000),
+            )
+            crawler.signals.connect(pool.close, signal=signals.engine_stopped)
+            _crawler_pools[crawler] = pool
+        return pool
+
+    def submit(self, key, fn: Callable, *args, **kwargs) -> defer.Deferred:
+        """
+        Run fn(*args, **kwargs) in a writer thread after earlier writes with this key
+
+        Returns:
+            Deferred fired with None when the write has finished
+        """
+        return self._enqueue(key, _Task(partial(fn, *args, **kwargs)))
+
+    def append(self, path: Path, data: bytes) -> defer.Deferred:
+        """
+        Append bytes to a file after earlier writes to it
+
+        Returns:
+            Deferred fired with None when the data has been written
+        """
+        queue = self._queues.get(path)
+        if queue and queue[-1].chunks is not None:
+            # Coalesce with the append still waiting for its turn
+            queue[-1].chunks.append(data)
+            self.pending += 1
+            return queue[-1].deferred
+        chunks = [data]
+        return self._enqueue(path, _Task(partial(_append_chunks, path, chunks), chunks))
+
+    def backpressure(self, value=None):
+        """
+        Value to return from process_item
+
+        Returns:
+            value itself while the queue has room, otherwise a Deferred fired
+            with value once pending writes drop below max_pending
+        """
+        if self.pending < self.max_pending:
+            return value
+        d = defer.Deferred()
+        d.addCallback(lambda _: value)
+        self._waiters.append(d)
+        return d
+
+    def drain(self) -> defer.Deferred:
+        """Deferred fired when every submitted write has finished"""
+        if not self.pending:
+            return defer.succeed(None)
+        d = defer.Deferred()
+        self._idle.append(d)
+        return d
+
+    def close(self):
+        """Stop the writer threads (waits for running writes)"""
+        if self.pending:
+            logger.warning(f"Stopping I/O pool with {self.pending} pending writes")
+        if self.threadpool.started:
+            self.threadpool.stop()
+
+    def _enqueue(self, key, task: _Task) -> defer.Deferred:
+        self._queues.setdefault(key, deque()).append(task)
+        self.pending += task.weight
+        self._dispatch(key)
+        return task.deferred
+
+    def _dispatch(self, key):
+        if key in self._running:
+            return
+        queue = self._queues.get(key)
+        if not queue:
+            self._queues.pop(key, None)
+            return
+
+        from twisted.internet import reactor
+        from twisted.internet.threads import deferToThreadPool
+
+        if not self.threadpool.started:
+            self.threadpool.start()
+        task = queue.popleft()
+        self._running.add(key)
+        d = deferToThreadPool(reactor, self.threadpool, self._run, key, task.call)
+        d.addBoth(self._finished, key, task)
+
+    @staticmethod
+    def _run(key, call):
+        try:
+            call()
+        except Exception as e:
+            logger.error(f"Background write to {key} failed: {e}")
+
+    def _finished(self, _, key, task: _Task):
+        self._running.discard(key)
+        self.pending -= task.weight
+        self._dispatch(key)
+
+        if self.pending < self.max_pending:
+            waiters, self._waiters = self._waiters, []
+            for d in waiters:
+                d.callback(None)
+        if not self.pending:
+            idle, self._idle = self._idle, []
+            for d in idle:
+                d.callback(None)
+
+        task.deferred.callback(None)
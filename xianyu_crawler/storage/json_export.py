@@ -1,25 +1,64 @@
 """
 JSON export functionality for Xianyu crawler
+
+Written files are recorded in the export index (see export_manifest.py),
+which get_stats() reads instead of scanning the output directory.
 """
 
 import json
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from loguru import logger
 
+from xianyu_crawler.storage.export_manifest import EntryStats, ExportManifest
+from xianyu_crawler.storage.serialization import (
+    json_filename,
+    read_json,
+    unique_json_path,
+    write_json_stream,
+)
+from xianyu_crawler.storage.query import ProductIndex, build_query
+
 
 class JsonExporter:
     """
     Handles exporting scraped data to JSON format
     """
 
-    def __init__(self, output_dir: str):
+    def __init__(self, output_dir: str, pretty: bool = False, compression: Optional[str] = None):
+        """
+        Args:
+            output_dir: Directory for exported files
+            pretty: Indent JSON output (compact by default)
+            compression: None, "gzip" or "zstd" for .json.gz/.json.zst output
+        """
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.pretty = pretty
+        self.compression = compression
+        self.manifest = ExportManifest(str(self.output_dir))
         self.current_data: List[Dict[str, Any]] = []
 
+    def _filename(self, stem: str) -> str:
+        """File name for a new export with the configured compression suffix"""
+        return json_filename(stem, self.compression)
+
+    def _write(self, output_path: Path, export_data: Dict[str, Any]):
+        """Serialize export data to a file and record it in the export index"""
+        header = {key: value for key, value in export_data.items() if key != "data"}
+        stats = EntryStats()
+        write_json_stream(
+            output_path,
+            header,
+            export_data.get("data", []),
+            atomic=True,
+            pretty=self.pretty,
+            on_item=stats.add,
+        )
+        self.manifest.record(output_path, stats, header.get("export_time"))
+
     def export_items(self, items: List[Dict[str, Any]]) -> str:
         """
         Export items to a JSON file
@@ -31,8 +70,10 @@ class JsonExporter:
             Path to the exported file
         """
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"vinyl_products_{timestamp}.json"
-        output_path = self.output_dir / filename
+        # Exports within the same second get a _1, _2, ... suffix
+        output_path = unique_json_path(
+            self.output_dir, f"vinyl_products_{timestamp}", self.compression
+        )
 
         try:
             # Create export data structure
@@ -43,8 +84,7 @@ class JsonExporter:
             }
 
             # Write to file
-            with open(output_path, "w", encoding="utf-8") as f:
-                json.dump(export_data, f, indent=2, ensure_ascii=False)
+            self._write(output_path, export_data)
 
             logger.info(f"Exported {len(items)} items to {output_path}")
             return str(output_path)
@@ -67,8 +107,7 @@ class JsonExporter:
             # Load existing data
             existing_data = []
             if output_path.exists():
-                with open(output_path, "r", encoding="utf-8") as f:
-                    existing_data = json.load(f).get("data", [])
+                existing_data = read_json(output_path).get("data", [])
 
             # Combine existing and new data
             combined_data = existing_data + items
@@ -81,8 +120,7 @@ class JsonExporter:
             }
 
             # Write to file
-            with open(output_path, "w", encoding="utf-8") as f:
-                json.dump(export_data, f, indent=2, ensure_ascii=False)
+            self._write(output_path, export_data)
 
             logger.info(f"Appended {len(items)} items to {output_path} (total: {len(combined_data)})")
 
@@ -110,16 +148,15 @@ class JsonExporter:
             Path to the exported file
         """
         date_str = datetime.now().strftime("%Y%m%d")
-        filename = f"daily_export_{date_str}.json"
+        filename = self._filename(f"daily_export_{date_str}")
         output_path = self.output_dir / filename
 
         try:
             # Load existing daily data
             existing_items = []
             if output_path.exists():
-                with open(output_path, "r", encoding="utf-8") as f:
-                    existing_data = json.load(f)
-                    existing_items = existing_data.get("data", [])
+                existing_data = read_json(output_path)
+                existing_items = existing_data.get("data", [])
 
             # Merge with new items (dedup by product_id)
             seen_ids = {item.get("product_id") for item in existing_items if item.get("product_id")}
@@ -134,8 +171,7 @@ class JsonExporter:
             }
 
             # Write to file
-            with open(output_path, "w", encoding="utf-8") as f:
-                json.dump(export_data, f, indent=2, ensure_ascii=False)
+            self._write(output_path, export_data)
 
             logger.info(f"Created daily export: {output_path} ({len(merged_items)} total items)")
             return str(output_path)
@@ -150,6 +186,9 @@ class JsonExporter:
         min_price: float = None,
         max_price: float = None,
         min_want_count: int = None,
+        seller: Optional[str] = None,
+        condition: Optional[str] = None,
+        since: Optional[datetime] = None,
     ) -> str:
         """
         Export items that match the specified criteria
@@ -159,44 +198,51 @@ class JsonExporter:
             min_price: Minimum price filter
             max_price: Maximum price filter
             min_want_count: Minimum want count filter
+            seller: Seller ID or seller name filter
+            condition: Item condition filter
+            since: Only items crawled at or after this time
 
         Returns:
             Path to the exported file
         """
-        filtered_items = items
-
-        # Apply filters
-        if min_price is not None:
-            filtered_items = [i for i in filtered_items if i.get("price", 0) >= min_price]
+        filters = {
+            "min_price": min_price,
+            "max_price": max_price,
+            "min_want_count": min_want_count,
+            "seller": seller,
+            "condition": condition,
+            "since": since,
+        }
+        results = build_query(ProductIndex(items), **filters).results()
+        return self.export_results(results, filters)
 
-        if max_price is not None:
-            filtered_items = [i for i in filtered_items if i.get("price", float("inf")) <= max_price]
+    def export_results(self, results: List[Dict[str, Any]], filters: Dict[str, Any]) -> str:
+        """
+        Stream already filtered items to a new export file
 
-        if min_want_count is not None:
-            filtered_items = [i for i in filtered_items if i.get("want_count", 0) >= min_want_count]
+        Args:
+            results: Matching items (dictionaries or ProductRecord objects)
+            filters: Filters recorded in the export file
 
+        Returns:
+            Path to the exported file
+        """
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"filtered_products_{timestamp}.json"
-        output_path = self.output_dir / filename
+        output_path = unique_json_path(
+            self.output_dir, f"filtered_products_{timestamp}", self.compression
+        )
 
         try:
-            # Create export data structure
-            export_data = {
+            header = {
                 "export_time": datetime.now().isoformat(),
-                "filters": {
-                    "min_price": min_price,
-                    "max_price": max_price,
-                    "min_want_count": min_want_count,
-                },
-                "total": len(filtered_items),
-                "data": filtered_items,
+                "filters": filters,
+                "total": len(results),
             }
+            stats = EntryStats()
+            write_json_stream(output_path, header, results, on_item=stats.add)
+            self.manifest.record(output_path, stats, header["export_time"])
 
-            # Write to file
-            with open(output_path, "w", encoding="utf-8") as f:
-                json.dump(export_data, f, indent=2, ensure_ascii=False)
-
-            logger.info(f"Exported {len(filtered_items)} filtered items to {output_path}")
+            logger.info(f"Exported {len(results)} filtered items to {output_path}")
             return str(output_path)
 
         except Exception as e:
@@ -205,7 +251,7 @@ class JsonExporter:
 
     def get_stats(self) -> Dict[str, Any]:
         """
-        Get statistics about exported files
+        Get statistics about exported files from the export index
 
         Returns:
             Dictionary with export statistics
@@ -213,27 +259,32 @@ class JsonExporter:
         stats = {
             "output_dir": str(self.output_dir),
             "total_files": 0,
+            "total_items": 0,
             "latest_file": None,
             "daily_files": [],
         }
 
         try:
-            # List all JSON files
-            json_files = list(self.output_dir.glob("*.json"))
-            stats["total_files"] = len(json_files)
+            files = self.manifest.files()
+            stats["total_files"] = len(files)
+            stats["total_items"] = sum(entry["items"] for entry in files.values())
 
-            if json_files:
-                # Find latest file
-                latest_file = max(json_files, key=lambda f: f.stat().st_mtime)
+            latest = self.manifest.latest()
+            if latest:
                 stats["latest_file"] = {
-                    "path": str(latest_file),
-                    "modified": datetime.fromtimestamp(latest_file.stat().st_mtime).isoformat(),
-                    "size_bytes": latest_file.stat().st_size,
+                    "path": latest["path"],
+                    "modified": latest["modified"],
+                    "size_bytes": latest["size"],
+                    "items": latest["items"],
+                    "export_time": latest["export_time"],
                 }
 
-                # Find daily export files
-                daily_files = [f for f in json_files if f.name.startswith("daily_export_")]
-                stats["daily_files"] = sorted([str(f) for f in daily_files])
+            # Find daily export files
+            stats["daily_files"] = sorted(
+                str(self.output_dir / name)
+                for name, entry in files.items()
+                if entry["kind"] == "daily"
+            )
 
         except Exception as e:
             logger.error(f"Error getting stats: {e}")
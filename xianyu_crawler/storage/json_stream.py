@@ -0,0 +1,394 @@
+"""
+Streaming reader for JSON export files
+
+Iterates the records of our export envelope ({"export_time": ..., "data":
+[...]}), of snapshot files with other list members (products, albums), of
+top-level arrays and of NDJSON files one record at a time. The file is read
+in chunks and each record is decoded on its own, so memory is bounded by
+the chunk size and the largest record rather than the file. Records can be
+projected to the fields a caller needs.
+
+Tolerant mode recovers what it can from damaged files (browser snapshots
+saved with unescaped quotes in titles, files cut off mid-write): a record
+that does not decode is repaired by escaping quotes that cannot end a
+string, or skipped by resuming at the next line that starts a record, and
+a truncated file ends the iteration with the records read so far.
+"""
+
+import codecs
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+from loguru import logger
+
+from xianyu_crawler.storage.serialization import PathLike, open_binary
+
+NDJSON_SUFFIXES = (".jsonl", ".ndjson")
+
+# Bytes read from the file at a time
+CHUNK_SIZE = 64 * 1024
+# Decode errors this close to the end of the buffer may just be a record cut
+# by the chunk boundary (a partial number or literal); read more and retry
+_BOUNDARY_SLACK = 64
+# A line that starts a record, or closes the list (resync points in tolerant mode)
+_RECORD_START = re.compile(r"\n[ \t\r]*(?=[{\]])")
+_WHITESPACE = " \t\r\n"
+
+_decoder = json.JSONDecoder()
+
+
+def is_ndjson(path: PathLike) -> bool:
+    """Whether a file name has an NDJSON suffix (.jsonl, .ndjson, optionally compressed)"""
+    name = str(path)
+    for suffix in (".gz", ".zst"):
+        if name.endswith(suffix):
+            name = name[: -len(suffix)]
+    return name.endswith(NDJSON_SUFFIXES)
+
+
+def repair_quotes(text: str) -> str:
+    """
+    Escape double quotes that cannot end a JSON string
+
+    A quote inside a string only ends it when the next non-space character
+    is one of , : } ] (or the text ends); any other quote is taken as part
+    of the value, e.g. the review quotes in '"title":"... 买家评价"包装很好""'.
+
+    Args:
+        text: JSON text of one record
+
+    Returns:
+        Repaired text
+    """
+    out = []
+    in_string = False
+    i, n = 0, len(text)
+    while i < n:
+        ch = text[i]
+        if not in_string:
+            if ch == '"':
+                in_string = True
+            out.append(ch)
+        elif ch == "\\":
+            out.append(text[i : i + 2])
+            i += 1
+        elif ch == '"':
+            j = i + 1
+            while j < n and text[j] in _WHITESPACE:
+                j += 1
+            if j == n or text[j] in ",:}]":
+                in_string = False
+                out.append(ch)
+            else:
+                out.append('\\"')
+        else:
+            out.append(ch)
+        i += 1
+    return "".join(out)
+
+
+def project(record: Any, fields: Optional[Sequence[str]]) -> Any:
+    """Keep only the given fields of a dict record (other records are returned as is)"""
+    if fields is None or not isinstance(record, dict):
+        return record
+    return {field: record[field] for field in fields if field in record}
+
+
+class JsonRecordReader:
+    """
+    Iterator over the records of one JSON or NDJSON file
+
+    After iteration, header holds the top-level members other than the
+    record lists (for envelope files), skipped counts the records dropped in
+    tolerant mode and truncated tells whether the file ended early.
+    """
+
+    def __init__(
+        self,
+        path: PathLike,
+        keys: Union[str, Iterable[str]] = "data",
+        fields: Optional[Sequence[str]] = None,
+        tolerant: bool = False,
+        ndjson: Optional[bool] = None,
+        chunk_size: int = CHUNK_SIZE,
+    ):
+        """
+        Args:
+            path: File path; .gz and .zst files are decompressed
+            keys: Top-level list member(s) holding the records; ignored for
+                top-level arrays and NDJSON
+            fields: Fields to keep of each record (default: all)
+            tolerant: Repair or skip damaged records instead of raising
+            ndjson: One record per line (default: detect from the suffix)
+            chunk_size: Bytes read at a time
+        """
+        self.path = Path(path)
+        self.keys = {keys} if isinstance(keys, str) else set(keys)
+        self.fields = tuple(fields) if fields is not None else None
+        self.tolerant = tolerant
+        self.ndjson = is_ndjson(path) if ndjson is None else ndjson
+        self.chunk_size = chunk_size
+
+        self.header: Dict[str, Any] = {}
+        self.records = 0
+        self.skipped = 0
+        self.truncated = False
+
+        self._file = None
+        self._text_decoder = None
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def __iter__(self) -> Iterator[Any]:
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._buf, self._pos, self._eof = "", 0, False
+        with open_binary(self.path) as self._file:
+            if self.ndjson:
+                yield from self._iter_lines()
+            else:
+                yield from self._iter_document()
+        self._file = None
+
+        if self.skipped or self.truncated:
+            logger.warning(
+                f"Recovered {self.records} records from {self.path.name}: "
+                f"{self.skipped} damaged records skipped"
+                f"{', file is truncated' if self.truncated else ''}"
+            )
+
+    # Buffer management
+
+    def _compact(self):
+        """Drop consumed text so the buffer stays around one chunk (between records only)"""
+        if self._pos > self.chunk_size:
+            self._buf = self._buf[self._pos :]
+            self._pos = 0
+
+    def _fill(self) -> bool:
+        """Read the next chunk into the buffer; False at end of file"""
+        if self._eof:
+            return False
+        data = self._file.read(self.chunk_size)
+        if not data:
+            self._eof = True
+            self._buf += self._text_decoder.decode(b"", final=True)
+            return False
+        self._buf += self._text_decoder.decode(data)
+        return True
+
+    def _peek(self, skip: str = _WHITESPACE) -> str:
+        """Next character that is not in skip, "" at end of file"""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in skip:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def _decode(self) -> Any:
+        """
+        Decode the JSON value at the current position
+
+        Raises:
+            json.JSONDecodeError: Damaged value, or a value cut off by the end of file
+        """
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError as e:
+                incomplete = e.pos >= len(self._buf) - _BOUNDARY_SLACK or e.msg.startswith(
+                    "Unterminated string"
+                )
+                if incomplete and self._fill():
+                    continue
+                raise
+            if end >= len(self._buf) and self._fill():
+                # A number at the end of the buffer may continue in the next chunk
+                continue
+            self._pos = end
+            return value
+
+    def _fail(self, error: json.JSONDecodeError):
+        """Raise in strict mode; in tolerant mode note whether the file is cut off"""
+        if not self.tolerant:
+            raise error
+        if self._eof and (
+            error.pos >= len(self._buf) - _BOUNDARY_SLACK
+            or error.msg.startswith("Unterminated string")
+        ):
+            self.truncated = True
+
+    # Top-level document
+
+    def _iter_document(self) -> Iterator[Any]:
+        first = self._peek()
+        if first == "[":
+            self._pos += 1
+            yield from self._iter_list()
+        elif first == "{":
+            self._pos += 1
+            yield from self._iter_object()
+        elif first:
+            self._fail(json.JSONDecodeError("Expecting object or array", self._buf, self._pos))
+
+    def _iter_object(self) -> Iterator[Any]:
+        """Members of the top-level object; record lists are streamed"""
+        while True:
+            self._compact()
+            ch = self._peek(_WHITESPACE + ",")
+            if ch == "}":
+                self._pos += 1
+                return
+            if ch == "":
+                self.truncated = True
+                self._fail(json.JSONDecodeError("Unterminated object", self._buf, self._pos))
+                return
+            try:
+                key = self._decode()
+                if not isinstance(key, str) or self._peek() != ":":
+                    raise json.JSONDecodeError("Expecting member", self._buf, self._pos)
+                self._pos += 1
+                if self._peek() == "[" and key in self.keys:
+                    self._pos += 1
+                    yield from self._iter_list()
+                    if self.truncated:
+                        return
+                else:
+                    self.header[key] = self._decode()
+            except json.JSONDecodeError as e:
+                self._fail(e)
+                if self.truncated:
+                    return
+                self._skip_line()
+
+    def _iter_list(self) -> Iterator[Any]:
+        """Elements of a list, up to and including its closing bracket"""
+        while True:
+            self._compact()
+            ch = self._peek(_WHITESPACE + ",")
+            if ch == "]":
+                self._pos += 1
+                return
+            if ch == "":
+                self.truncated = True
+                self._fail(json.JSONDecodeError("Unterminated list", self._buf, self._pos))
+                return
+
+            start = self._pos
+            try:
+                record = self._decode()
+            except json.JSONDecodeError as e:
+                self._fail(e)
+                if self.truncated:
+                    return
+                record = self._recover(start)
+                if record is None:
+                    if self.truncated:
+                        return
+                    continue
+            self.records += 1
+            yield project(record, self.fields)
+
+    def _recover(self, start: int) -> Optional[Any]:
+        """Repair the damaged record at start, or skip to the next record"""
+        self._pos = start
+        end = self._next_record_start()
+        text = self._buf[start:end].rstrip().rstrip(",")
+        self._pos = end
+        try:
+            value, _ = _decoder.raw_decode(repair_quotes(text))
+            return value
+        except json.JSONDecodeError:
+            if not self.truncated:
+                self.skipped += 1
+            return None
+
+    def _next_record_start(self) -> int:
+        """Position of the next line that starts a record or closes the list"""
+        while True:
+            match = _RECORD_START.search(self._buf, self._pos + 1)
+            if match:
+                return match.end()
+            if not self._fill():
+                # Damaged record at the end of a truncated file
+                self.truncated = True
+                return len(self._buf)
+
+    def _skip_line(self):
+        while True:
+            newline = self._buf.find("\n", self._pos)
+            if newline >= 0:
+                self._pos = newline + 1
+                return
+            self._pos = len(self._buf)
+            if not self._fill():
+                return
+
+    # NDJSON
+
+    def _iter_lines(self) -> Iterator[Any]:
+        while True:
+            self._compact()
+            newline = self._buf.find("\n", self._pos)
+            if newline < 0:
+                if self._fill():
+                    continue
+                newline = len(self._buf)
+                if self._pos >= newline:
+                    return
+
+            line = self._buf[self._pos : newline].strip()
+            self._pos = newline + 1
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                if not self.tolerant:
+                    raise
+                try:
+                    record = json.loads(repair_quotes(line))
+                except json.JSONDecodeError:
+                    # A damaged last line is most likely a cut-off write
+                    if self._eof and self._pos >= len(self._buf):
+                        self.truncated = True
+                    else:
+                        self.skipped += 1
+                    continue
+            self.records += 1
+            yield project(record, self.fields)
+
+
+def iter_records(
+    path: PathLike,
+    keys: Union[str, Iterable[str]] = "data",
+    fields: Optional[Sequence[str]] = None,
+    tolerant: bool = False,
+) -> Iterator[Any]:
+    """
+    Iterate the records of a JSON export, snapshot or NDJSON file
+
+    Args:
+        path: File path; .gz and .zst files are decompressed
+        keys: Top-level list member(s) holding the records
+        fields: Fields to keep of each record (default: all)
+        tolerant: Repair or skip damaged records instead of raising
+
+    Returns:
+        Iterator of records (dicts, or plain values for lists of titles)
+    """
+    return iter(JsonRecordReader(path, keys=keys, fields=fields, tolerant=tolerant))
+
+
+def read_records(
+    path: PathLike,
+    keys: Union[str, Iterable[str]] = "data",
+    fields: Optional[Sequence[str]] = None,
+    tolerant: bool = False,
+) -> List[Any]:
+    """List of the records of a file, see iter_records()"""
+    return list(iter_records(path, keys=keys, fields=fields, tolerant=tolerant))
@@ -0,0 +1,210 @@
+"""
+Indexed product queries for Xianyu crawler
+
+ProductIndex keeps lazily built indexes over a list of items: sorted
+(value, position) arrays for range lookups via bisect and hash maps for
+equality lookups. ProductQuery composes predicates and answers them by
+intersecting index lookups instead of scanning every item per filter.
+"""
+
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+
+def _index_key(value: Any) -> Any:
+    """Normalize a value for indexing; datetimes compare as ISO strings"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+class ProductIndex:
+    """
+    Lazily indexed, read-only view over a list of items
+
+    Items may be dictionaries or ProductRecord objects (anything with .get()).
+    Each index is built on first use and reused by later queries.
+    """
+
+    def __init__(self, items: Sequence[Any]):
+        """
+        Args:
+            items: Items to index; positions refer to this sequence
+        """
+        self.items = items
+        self._sorted: Dict[str, Tuple[List[Any], List[int]]] = {}
+        self._hashed: Dict[str, Dict[Any, List[int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def sorted_index(self, field: str) -> Tuple[List[Any], List[int]]:
+        """
+        Sorted keys and matching positions for a field (items with no value are skipped)
+        """
+        if field not in self._sorted:
+            values = [item.get(field) for item in self.items]
+            positions = [pos for pos, value in enumerate(values) if value is not None]
+            keys = [_index_key(values[pos]) for pos in positions]
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+            self._sorted[field] = ([keys[i] for i in order], [positions[i] for i in order])
+        return self._sorted[field]
+
+    def hash_index(self, field: str) -> Dict[Any, List[int]]:
+        """Mapping of field value to item positions"""
+        if field not in self._hashed:
+            index = defaultdict(list)
+            for pos, item in enumerate(self.items):
+                value = item.get(field)
+                if value is not None:
+                    index[value].append(pos)
+            self._hashed[field] = dict(index)
+        return self._hashed[field]
+
+    def range(self, field: str, low: Any = None, high: Any = None) -> List[int]:
+        """
+        Positions of items with low <= value <= high (either bound optional)
+        """
+        keys, positions = self.sorted_index(field)
+        start = 0 if low is None else bisect_left(keys, _index_key(low))
+        end = len(keys) if high is None else bisect_right(keys, _index_key(high))
+        return positions[start:end]
+
+    def lookup(self, field: str, *values: Any) -> List[int]:
+        """Positions of items whose field equals any of the given values"""
+        index = self.hash_index(field)
+        if len(values) == 1:
+            return index.get(values[0], [])
+        result = []
+        for value in values:
+            result.extend(index.get(value, []))
+        return result
+
+
+class Range:
+    """Predicate: low <= field <= high"""
+
+    def __init__(self, field: str, low: Any = None, high: Any = None):
+        self.field = field
+        self.low = low
+        self.high = high
+
+    def positions(self, index: ProductIndex) -> List[int]:
+        return index.range(self.field, self.low, self.high)
+
+
+class Equals:
+    """Predicate: field equals any of the given values"""
+
+    def __init__(self, field: str, *values: Any):
+        self.field = field
+        self.values = values
+
+    def positions(self, index: ProductIndex) -> List[int]:
+        return index.lookup(self.field, *self.values)
+
+
+class AnyOf:
+    """Predicate: union of sub-predicates"""
+
+    def __init__(self, *predicates):
+        self.predicates = predicates
+
+    def positions(self, index: ProductIndex) -> Set[int]:
+        result = set()
+        for predicate in self.predicates:
+            result.update(predicate.positions(index))
+        return result
+
+
+class ProductQuery:
+    """
+    Conjunction of predicates over a ProductIndex
+
+    Example:
+        query = ProductQuery(index).where(Range("price", 100, 500)).where(
+            Equals("condition", "全新")
+        )
+        for item in query:
+            ...
+    """
+
+    def __init__(self, index: ProductIndex):
+        self.index = index
+        self.predicates = []
+
+    def where(self, predicate) -> "ProductQuery":
+        """Add a predicate (all predicates must match)"""
+        self.predicates.append(predicate)
+        return self
+
+    def positions(self) -> List[int]:
+        """Matching item positions in original order"""
+        if not self.predicates:
+            return list(range(len(self.index)))
+
+        candidates = sorted((p.positions(self.index) for p in self.predicates), key=len)
+        result = set(candidates[0])
+        for positions in candidates[1:]:
+            if not result:
+                break
+            result.intersection_update(positions)
+        return sorted(result)
+
+    def results(self) -> List[Any]:
+        """Matching items in original order"""
+        items = self.index.items
+        return [items[pos] for pos in self.positions()]
+
+    def __iter__(self) -> Iterator[Any]:
+        items = self.index.items
+        for pos in self.positions():
+            yield items[pos]
+
+
+def build_query(
+    index: ProductIndex,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_want_count: Optional[int] = None,
+    seller: Optional[str] = None,
+    condition: Optional[str] = None,
+    location: Optional[str] = None,
+    keyword: Optional[str] = None,
+    since: Optional[datetime] = None,
+) -> ProductQuery:
+    """
+    Build a query from the common export filters
+
+    Args:
+        index: Index over the items to filter
+        min_price: Minimum price
+        max_price: Maximum price
+        min_want_count: Minimum want count
+        seller: Seller ID or seller name
+        condition: Item condition (e.g. 全新)
+        location: Item location
+        keyword: Search keyword the item was found with
+        since: Only items crawled at or after this time
+
+    Returns:
+        ProductQuery with one predicate per given filter
+    """
+    query = ProductQuery(index)
+    if min_price is not None or max_price is not None:
+        query.where(Range("price", min_price, max_price))
+    if min_want_count is not None:
+        query.where(Range("want_count", min_want_count))
+    if seller is not None:
+        query.where(AnyOf(Equals("seller_id", seller), Equals("seller_name", seller)))
+    if condition is not None:
+        query.where(Equals("condition", condition))
+    if location is not None:
+        query.where(Equals("location", location))
+    if keyword is not None:
+        query.where(Equals("keyword", keyword))
+    if since is not None:
+        query.where(Range("crawled_at", since))
+    return query
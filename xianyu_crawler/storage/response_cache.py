@@ -0,0 +1,339 @@
+"""
+Content-addressed response cache for Xianyu crawler
+
+A Scrapy HTTPCACHE_STORAGE backend for rendered (Playwright) and plain
+responses. Requests are keyed by page type and canonical URL; bodies are
+stored once per content hash as compressed blobs (zstd when available, gzip
+otherwise) and an append-only JSONL index maps keys to blobs. Each page type
+has its own TTL, and replay mode serves every cached page regardless of age
+so a whole crawl can be re-run offline.
+
+Usage:
+    scrapy crawl vinyl_spider -s HTTPCACHE_ENABLED=1
+    # Offline replay: serve only cached pages, drop everything else
+    scrapy crawl vinyl_spider -s HTTPCACHE_ENABLED=1 -s RESPONSE_CACHE_REPLAY=1 \
+        -s HTTPCACHE_IGNORE_MISSING=1
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from loguru import logger
+from scrapy.extensions.httpcache import DummyPolicy
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from w3lib.url import canonicalize_url, url_query_cleaner
+
+from xianyu_crawler.storage.serialization import dumps, loads, read_bytes, write_bytes
+from xianyu_crawler.utils.anti_spider import is_blocked_response
+
+try:
+    import zstandard  # noqa: F401
+
+    BLOB_SUFFIX = ".zst"
+except ImportError:
+    BLOB_SUFFIX = ".gz"
+
+# Page types by URL path, checked in order; request.meta["page_type"] takes precedence
+PAGE_TYPE_PATTERNS = (
+    ("detail", re.compile(r"/item\b|/item\.htm")),
+    ("search", re.compile(r"/search\b")),
+    ("seller", re.compile(r"/personal\b")),
+)
+
+# Default TTL in seconds per page type (0 = never expires)
+DEFAULT_TTLS = {
+    "search": 3600,
+    "seller": 3600,
+    "detail": 86400,
+}
+
+# Query parameters that do not change the page (tracking ids)
+IGNORED_QUERY_PARAMS = ("spm", "scm")
+
+
+def page_type(request) -> str:
+    """Page type of a request: meta["page_type"], else derived from the URL path"""
+    explicit = request.meta.get("page_type")
+    if explicit:
+        return explicit
+    for name, pattern in PAGE_TYPE_PATTERNS:
+        if pattern.search(request.url):
+            return name
+    return "other"
+
+
+def canonical_url(url: str) -> str:
+    """URL with sorted query, no fragment and no tracking parameters"""
+    url = url_query_cleaner(url, IGNORED_QUERY_PARAMS, remove=True, keep_fragments=True)
+    return canonicalize_url(url)
+
+
+def cache_key(request) -> str:
+    """Cache key of a request: hash of method, page type and canonical URL"""
+    parts = [request.method, page_type(request), canonical_url(request.url)]
+    if request.method != "GET":
+        parts.append(hashlib.sha256(request.body).hexdigest())
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+class ResponseCachePolicy(DummyPolicy):
+    """
+    Cache everything except ignored status codes and anti-spider block pages
+    """
+
+    def should_cache_response(self, response, request) -> bool:
+        if not super().should_cache_response(response, request):
+            return False
+        text = getattr(response, "text", None)
+        if text is not None and is_blocked_response(text):
+            logger.debug(f"Not caching block page for {request.url}")
+            return False
+        return True
+
+
+class ResponseCacheStorage:
+    """
+    Scrapy cache storage with content-addressed compressed blobs
+
+    Layout under HTTPCACHE_DIR:
+        index.jsonl          one entry per store, later entries win
+        blobs/ab/<sha256>    response bodies, compressed by suffix
+    """
+
+    def __init__(self, settings):
+        """
+        Args:
+            settings: Crawler settings (HTTPCACHE_DIR, HTTPCACHE_EXPIRATION_SECS,
+                RESPONSE_CACHE_TTL, RESPONSE_CACHE_REPLAY)
+        """
+        self.cache_dir = Path(settings.get("HTTPCACHE_DIR"))
+        self.blob_dir = self.cache_dir / "blobs"
+        self.index_file = self.cache_dir / "index.jsonl"
+
+        self.default_ttl = settings.getint("HTTPCACHE_EXPIRATION_SECS", 0)
+        self.ttls = dict(DEFAULT_TTLS)
+        self.ttls.update(settings.getdict("RESPONSE_CACHE_TTL"))
+        self.replay = settings.getbool("RESPONSE_CACHE_REPLAY", False)
+        self.ignore_missing = settings.getbool("HTTPCACHE_IGNORE_MISSING", False)
+
+        self.index: Dict[str, Dict[str, Any]] = {}
+        self._index_lines = 0
+        self._index_handle = None
+        self.stats = Counter()
+
+    # Scrapy storage interface
+
+    def open_spider(self, spider):
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.index, self._index_lines = self.load_index()
+        self._index_handle = open(self.index_file, "ab")
+
+        mode = "replay" if self.replay else "record"
+        logger.info(f"Response cache ({mode}) at {self.cache_dir}: {len(self.index)} cached pages")
+        if self.replay and not self.ignore_missing:
+            logger.warning(
+                "RESPONSE_CACHE_REPLAY without HTTPCACHE_IGNORE_MISSING: uncached pages "
+                "will still be downloaded"
+            )
+
+    def close_spider(self, spider):
+        if self._index_handle is not None:
+            self._index_handle.close()
+            self._index_handle = None
+        self.compact()
+        logger.info(
+            f"Response cache: {self.stats['hit']} hits, {self.stats['miss']} misses, "
+            f"{self.stats['expired']} expired, {self.stats['stored']} stored "
+            f"({self.stats['blob_reused']} reused blobs)"
+        )
+
+    def retrieve_response(self, spider, request):
+        """Return the cached response for a request, or None"""
+        entry = self.index.get(cache_key(request))
+        if entry is None:
+            self.stats["miss"] += 1
+            return None
+        if self.is_expired(entry):
+            self.stats["expired"] += 1
+            return None
+
+        try:
+            body = read_bytes(self._blob_path(entry["blob"]))
+        except (OSError, RuntimeError) as e:
+            logger.warning(f"Cached body for {request.url} unreadable: {e}")
+            self.stats["miss"] += 1
+            return None
+
+        self.stats["hit"] += 1
+        request.meta["cache_timestamp"] = entry["stored_at"]
+        headers = Headers(entry["headers"])
+        url = entry["response_url"]
+        respcls = responsetypes.from_args(headers=headers, url=url, body=body)
+        return respcls(url=url, headers=headers, status=entry["status"], body=body)
+
+    def store_response(self, spider, request, response):
+        """Store a response body as a blob and append its index entry"""
+        digest = hashlib.sha256(response.body).hexdigest()
+        blob_path = self._blob_path(digest)
+        if blob_path.exists():
+            self.stats["blob_reused"] += 1
+        else:
+            blob_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = blob_path.with_name(f".{blob_path.name}.tmp{BLOB_SUFFIX}")
+            write_bytes(tmp_path, response.body)
+            os.replace(tmp_path, blob_path)
+
+        key = cache_key(request)
+        entry = {
+            "key": key,
+            "url": request.url,
+            "page_type": page_type(request),
+            "status": response.status,
+            "response_url": response.url,
+            "headers": {
+                k.decode("latin1"): [v.decode("latin1") for v in values]
+                for k, values in response.headers.items()
+            },
+            "blob": digest,
+            "size": len(response.body),
+            "stored_at": time.time(),
+        }
+        self.index[key] = entry
+        self._index_handle.write(dumps(entry) + b"\n")
+        self._index_handle.flush()
+        self._index_lines += 1
+        self.stats["stored"] += 1
+
+    # Cache maintenance
+
+    def ttl(self, page_type_name: str) -> int:
+        """TTL in seconds for a page type (0 = never expires)"""
+        return int(self.ttls.get(page_type_name, self.default_ttl))
+
+    def is_expired(self, entry: Dict[str, Any], now: Optional[float] = None) -> bool:
+        """Whether an index entry is past its page type's TTL (never in replay mode)"""
+        if self.replay:
+            return False
+        ttl = self.ttl(entry["page_type"])
+        return 0 < ttl < (now or time.time()) - entry["stored_at"]
+
+    def load_index(self):
+        """
+        Read the index log
+
+        Returns:
+            (entries by key, number of log lines)
+        """
+        index = {}
+        lines = 0
+        if not self.index_file.exists():
+            return index, lines
+        with open(self.index_file, "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    entry = loads(line)
+                except ValueError:
+                    logger.warning(f"Skipping corrupt line in {self.index_file}")
+                    continue
+                index[entry["key"]] = entry
+                lines += 1
+        return index, lines
+
+    def compact(self, drop_expired: bool = False):
+        """
+        Rewrite the index with one entry per key and delete unreferenced blobs
+
+        Args:
+            drop_expired: Also drop entries past their TTL
+        """
+        if drop_expired:
+            now = time.time()
+            self.index = {k: e for k, e in self.index.items() if not self.is_expired(e, now)}
+        if self._index_lines <= len(self.index) and not drop_expired:
+            return
+
+        tmp_file = self.index_file.with_suffix(".tmp")
+        try:
+            with open(tmp_file, "wb") as f:
+                for entry in self.index.values():
+                    f.write(dumps(entry) + b"\n")
+            tmp_file.replace(self.index_file)
+            logger.info(
+                f"Compacted response cache index: {self._index_lines} -> {len(self.index)} entries"
+            )
+            self._index_lines = len(self.index)
+        except Exception as e:
+            logger.error(f"Error compacting response cache index: {e}")
+            return
+
+        referenced = {entry["blob"] for entry in self.index.values()}
+        removed = 0
+        for path in self.blob_dir.glob(f"*/*{BLOB_SUFFIX}"):
+            if path.name[: -len(BLOB_SUFFIX)] not in referenced:
+                path.unlink()
+                removed += 1
+        if removed:
+            logger.info(f"Removed {removed} unreferenced response blobs")
+
+    def summary(self) -> Dict[str, Any]:
+        """Entry counts per page type, expired entries and blob sizes"""
+        now = time.time()
+        blobs = {}
+        for entry in self.index.values():
+            blobs[entry["blob"]] = entry["size"]
+        stored = sum(p.stat().st_size for p in self.blob_dir.glob(f"*/*{BLOB_SUFFIX}"))
+        return {
+            "entries": len(self.index),
+            "page_types": dict(Counter(e["page_type"] for e in self.index.values())),
+            "expired": sum(1 for e in self.index.values() if self.is_expired(e, now)),
+            "blobs": len(blobs),
+            "body_bytes": sum(blobs.values()),
+            "stored_bytes": stored,
+        }
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.blob_dir / digest[:2] / f"{digest}{BLOB_SUFFIX}"
+
+
+def main():
+    """CLI entry point for inspecting and pruning the response cache"""
+    from scrapy.settings import Settings
+
+    from xianyu_crawler import settings as project_settings
+
+    parser = argparse.ArgumentParser(description="Xianyu response cache maintenance")
+    parser.add_argument("--dir", default=str(project_settings.HTTPCACHE_DIR), help="Cache dir")
+    parser.add_argument("--prune", action="store_true", help="Drop expired entries and blobs")
+    args = parser.parse_args()
+
+    settings = Settings()
+    settings.setmodule(project_settings)
+    settings.set("HTTPCACHE_DIR", args.dir)
+
+    storage = ResponseCacheStorage(settings)
+    storage.blob_dir.mkdir(parents=True, exist_ok=True)
+    storage.index, storage._index_lines = storage.load_index()
+    if args.prune:
+        storage.compact(drop_expired=True)
+
+    summary = storage.summary()
+    print(f"\nResponse cache at {args.dir}:")
+    print(f"  Entries: {summary['entries']} ({summary['expired']} expired)")
+    for name, count in sorted(summary["page_types"].items()):
+        print(f"    {name}: {count} (ttl {storage.ttl(name)}s)")
+    print(f"  Blobs: {summary['blobs']}")
+    print(f"  Body bytes: {summary['body_bytes']:,} -> stored {summary['stored_bytes']:,}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,392 @@
+"""
+Sequenced export segments and daily compaction
+
+SegmentWriter streams exported items into segment files named
+segment_<sequence>_<YYYYMMDD>.json[.gz|.zst]. The open segment is written to a
+hidden .part file and renamed into place when it is committed, so readers
+only ever see complete files, and name order equals sequence order. A segment
+is committed when it reaches max_items, max_bytes (uncompressed) or max_age
+seconds; close() commits the last one and writes a run manifest listing the
+segments of the run to manifests/final_export_<timestamp>.json. Committed
+segments are recorded in the export index (see export_manifest.py).
+
+compact_segments() merges the segments (and legacy vinyl_products_* batch
+files) of past days into one daily_export_<YYYYMMDD> partition per day,
+deduplicated by product_id, so readers open a few large files instead of
+thousands of small ones.
+"""
+
+import os
+import re
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from loguru import logger
+
+from xianyu_crawler.storage.export_manifest import EntryStats, ExportManifest
+from xianyu_crawler.storage.serialization import (
+    dumps,
+    fsync_path,
+    json_filename,
+    list_json_files,
+    open_binary,
+    read_json,
+    strip_json_suffix,
+    unique_json_path,
+    write_json,
+    write_json_stream,
+)
+
+SEGMENT_PATTERN = re.compile(r"^segment_(\d{8})_(\d{8})$")
+LEGACY_BATCH_PATTERN = re.compile(r"^vinyl_products_(\d{8})_\d{6}")
+DAILY_PREFIX = "daily_export_"
+MANIFEST_DIR = "manifests"
+# Last allocated sequence number, kept so numbering survives compaction
+SEQUENCE_FILE = ".segment_sequence"
+
+
+def segment_sequence(name: str) -> Optional[int]:
+    """Sequence number of a segment file name, None for other files"""
+    match = SEGMENT_PATTERN.match(strip_json_suffix(name))
+    return int(match.group(1)) if match else None
+
+
+def partition_day(name: str) -> Optional[str]:
+    """
+    Day (YYYYMMDD) a compactable export file belongs to
+
+    Returns:
+        The day of segments and legacy batch files, None for other files
+    """
+    stem = strip_json_suffix(name)
+    match = SEGMENT_PATTERN.match(stem)
+    if match:
+        return match.group(2)
+    match = LEGACY_BATCH_PATTERN.match(stem)
+    return match.group(1) if match else None
+
+
+class SegmentWriter:
+    """
+    Writes items to sequenced, atomically committed segment files
+
+    Not thread-safe: calls must be serialized (JsonExportPipeline runs them
+    in order on its I/O pool key).
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        max_items: int = 5000,
+        max_bytes: int = 32 * 1024 * 1024,
+        max_age: float = 600.0,
+        pretty: bool = False,
+        compression: Optional[str] = None,
+    ):
+        """
+        Args:
+            output_dir: Directory for segment files
+            max_items: Items per segment
+            max_bytes: Uncompressed bytes per segment
+            max_age: Seconds a segment stays open (0 = no limit)
+            pretty: Indent each item
+            compression: None, "gzip" or "zstd"
+        """
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.pretty = pretty
+        self.compression = compression
+        self.started_at = datetime.now()
+        # Recorded with each segment so readers can find all segments of a run
+        self.run_id = f"{self.started_at.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+        # Committed segments of this run, listed in the run manifest
+        self.segments: List[Dict[str, Any]] = []
+        self.manifest = ExportManifest(str(self.output_dir))
+
+        self._file = None
+        self._stats: Optional[EntryStats] = None
+        self._part_path: Optional[Path] = None
+        self._path: Optional[Path] = None
+        self._sequence = 0
+        self._count = 0
+        self._bytes = 0
+        self._opened = 0.0
+        self._opened_at: Optional[datetime] = None
+
+        self._remove_stale_parts()
+
+    def write(self, items: Iterable[Dict[str, Any]]) -> int:
+        """
+        Append items to the open segment, committing it when full or too old
+
+        Args:
+            items: Item dictionaries
+
+        Returns:
+            Number of items written
+        """
+        written = 0
+        for item in items:
+            if self._file is None:
+                self._open()
+            data = dumps(item, pretty=self.pretty)
+            separator = b"\n" if self._count == 0 else b",\n"
+            self._file.write(separator + data)
+            start = self._bytes + len(separator)
+            self._stats.add(item, start, start + len(data))
+            self._count += 1
+            self._bytes = start + len(data)
+            written += 1
+            if self._count >= self.max_items or self._bytes >= self.max_bytes:
+                self.commit()
+
+        self.commit_if_expired()
+        return written
+
+    def commit_if_expired(self) -> Optional[Path]:
+        """Commit the open segment if it has been open for max_age seconds"""
+        if self._file is not None and self.max_age > 0:
+            if time.monotonic() - self._opened >= self.max_age:
+                return self.commit()
+        return None
+
+    def commit(self) -> Optional[Path]:
+        """
+        Finish the open segment and rename it into place
+
+        Returns:
+            Path of the committed segment, None if no segment was open
+        """
+        if self._file is None:
+            return None
+
+        count = self._count
+        self._file.write(b"\n]," if count else b"],")
+        self._file.write(dumps({"total": count})[1:])
+        self._file.close()
+        self._file = None
+        fsync_path(self._part_path)
+        os.replace(self._part_path, self._path)
+        self.manifest.record(self._path, self._stats, self._opened_at.isoformat(), self.run_id)
+
+        self.segments.append(
+            {
+                "file": self._path.name,
+                "sequence": self._sequence,
+                "items": count,
+                "bytes": self._path.stat().st_size,
+                "opened_at": self._opened_at.isoformat(),
+                "committed_at": datetime.now().isoformat(),
+            }
+        )
+        logger.info(f"Committed segment {self._path.name} ({count} items)")
+        return self._path
+
+    def close(self) -> Optional[Path]:
+        """
+        Commit the open segment and write the run manifest
+
+        Returns:
+            Path of the manifest, None if the run wrote no segments
+        """
+        self.commit()
+        if not self.segments:
+            return None
+
+        manifest_dir = self.output_dir / MANIFEST_DIR
+        manifest_dir.mkdir(exist_ok=True)
+        path = unique_json_path(
+            manifest_dir, f"final_export_{self.started_at.strftime('%Y%m%d_%H%M%S')}"
+        )
+        write_json(
+            path,
+            {
+                "export_time": datetime.now().isoformat(),
+                "run": self.run_id,
+                "started_at": self.started_at.isoformat(),
+                "total": sum(segment["items"] for segment in self.segments),
+                "segments": self.segments,
+            },
+            pretty=True,
+            atomic=True,
+        )
+        return path
+
+    def _open(self):
+        """Allocate the next sequence number and open its .part file"""
+        sequence = self._last_sequence()
+        day = datetime.now().strftime("%Y%m%d")
+        while True:
+            sequence += 1
+            path = self.output_dir / json_filename(
+                f"segment_{sequence:08d}_{day}", self.compression
+            )
+            part_path = self.output_dir / f".segment_{sequence:08d}.part"
+            if path.exists():
+                continue
+            try:
+                # Exclusive create: another writer on this directory may race us
+                self._file = open_binary(part_path, "xb", compression_from=path)
+                break
+            except FileExistsError:
+                continue
+
+        self._save_sequence(sequence)
+        self._sequence = sequence
+        self._path = path
+        self._part_path = part_path
+        self._count = 0
+        self._stats = EntryStats()
+        self._opened = time.monotonic()
+        self._opened_at = datetime.now()
+
+        head = (
+            dumps(
+                {
+                    "export_time": self._opened_at.isoformat(),
+                    "run": self.run_id,
+                    "sequence": sequence,
+                }
+            )[:-1]
+            + b',"data":['
+        )
+        self._file.write(head)
+        self._bytes = len(head)
+
+    def _last_sequence(self) -> int:
+        """Highest sequence number allocated so far in output_dir"""
+        last = 0
+        try:
+            last = int((self.output_dir / SEQUENCE_FILE).read_text().strip() or 0)
+        except (OSError, ValueError):
+            pass
+        for path in self.output_dir.iterdir():
+            sequence = segment_sequence(path.name)
+            if sequence is None and path.name.startswith(".segment_"):
+                sequence = int(path.name[9:17]) if path.name[9:17].isdigit() else None
+            if sequence is not None and sequence > last:
+                last = sequence
+        return last
+
+    def _save_sequence(self, sequence: int):
+        path = self.output_dir / SEQUENCE_FILE
+        tmp_path = path.with_name(f"{SEQUENCE_FILE}.{os.getpid()}")
+        tmp_path.write_text(str(sequence))
+        os.replace(tmp_path, path)
+
+    def _remove_stale_parts(self):
+        """Delete .part files left by a crashed writer (older than two max_age periods)"""
+        max_age = max(2 * self.max_age, 3600)
+        now = time.time()
+        for path in self.output_dir.glob(".segment_*.part"):
+            try:
+                if now - path.stat().st_mtime > max_age:
+                    logger.warning(f"Removing unfinished segment from an earlier run: {path.name}")
+                    path.unlink()
+            except OSError:
+                continue
+
+
+def _daily_stem(day: str) -> str:
+    return f"{DAILY_PREFIX}{day}"
+
+
+def compact_segments(
+    output_dir: str,
+    include_today: bool = False,
+    compression: Optional[str] = None,
+) -> List[Path]:
+    """
+    Merge segments and legacy batch files into daily partitions
+
+    Each day's files are merged into daily_export_<YYYYMMDD> together with an
+    existing partition of that day, keeping the most recently exported record
+    of every product_id. The partition is written atomically before its input
+    files are deleted, so an interrupted run is simply repeated. Files that
+    cannot be read are left in place.
+
+    Args:
+        output_dir: Export directory
+        include_today: Also compact today's files (still being written by crawls)
+        compression: Codec of the written partitions
+
+    Returns:
+        Paths of the written partitions
+    """
+    output_dir = Path(output_dir)
+    manifest = ExportManifest(str(output_dir))
+    today = datetime.now().strftime("%Y%m%d")
+
+    inputs: Dict[str, List[Path]] = defaultdict(list)
+    partitions: Dict[str, List[Path]] = defaultdict(list)
+    for path in list_json_files(output_dir):
+        stem = strip_json_suffix(path.name)
+        if stem.startswith(DAILY_PREFIX):
+            partitions[stem[len(DAILY_PREFIX) :]].append(path)
+            continue
+        day = partition_day(path.name)
+        if day and (include_today or day < today):
+            inputs[day].append(path)
+
+    def order(path: Path):
+        # Legacy batch files predate segments; both sort chronologically by name
+        sequence = segment_sequence(path.name)
+        return (1, sequence, "") if sequence is not None else (0, 0, path.name)
+
+    written = []
+    for day, files in sorted(inputs.items()):
+        merged: Dict[str, Dict[str, Any]] = {}
+        unkeyed: List[Dict[str, Any]] = []
+        consumed: List[Path] = []
+
+        for path in partitions.get(day, []) + sorted(files, key=order):
+            try:
+                data = read_json(path)
+            except Exception as e:
+                logger.warning(f"Skipping unreadable export file {path}: {e}")
+                continue
+            for item in data.get("data", []) if isinstance(data, dict) else []:
+                product_id = item.get("product_id")
+                if product_id:
+                    merged[product_id] = item
+                else:
+                    unkeyed.append(item)
+            consumed.append(path)
+
+        if any(path not in consumed for path in partitions.get(day, [])):
+            # Never replace a partition that could not be read
+            logger.error(f"Partition {day} left uncompacted")
+            continue
+        if not any(path in consumed for path in files):
+            continue
+
+        target = output_dir / json_filename(_daily_stem(day), compression)
+        header = {
+            "export_time": datetime.now().isoformat(),
+            "partition": day,
+            "total": len(merged) + len(unkeyed),
+        }
+        stats = EntryStats()
+        write_json_stream(
+            target, header, list(merged.values()) + unkeyed, atomic=True, on_item=stats.add
+        )
+        # Swap the inputs for the partition in the index before deleting them
+        manifest.update(
+            added=[stats.entry(target, header["export_time"])],
+            removed=[path.name for path in consumed if path != target],
+        )
+        for path in consumed:
+            if path != target:
+                path.unlink()
+        logger.info(
+            f"Compacted {len(consumed)} file(s) into {target.name} ({header['total']} items)"
+        )
+        written.append(target)
+
+    return written
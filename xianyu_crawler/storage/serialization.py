@@ -0,0 +1,342 @@
+"""
+JSON serialization backend for Xianyu crawler
+
+Uses orjson when it is installed and falls back to the standard library.
+Output is compact by default; pretty-printing is opt-in. Files ending in
+.json.gz or .json.zst are compressed and decompressed transparently.
+"""
+
+import gzip
+import io
+import json
+import os
+from datetime import date, datetime
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterable, List, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Supported compression codecs and their file suffixes
+COMPRESSION_SUFFIXES = {
+    None: ".json",
+    "gzip": ".json.gz",
+    "zstd": ".json.zst",
+}
+JSON_SUFFIXES = tuple(COMPRESSION_SUFFIXES.values())
+
+PathLike = Union[str, Path]
+
+
+def _default(obj: Any) -> Any:
+    """Fallback encoder for types the stdlib json module does not handle"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any, pretty: bool = False) -> bytes:
+    """
+    Serialize an object to UTF-8 JSON bytes
+
+    Args:
+        obj: Object to serialize
+        pretty: Indent output with 2 spaces
+
+    Returns:
+        JSON document as bytes
+    """
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if pretty else 0
+        return orjson.dumps(obj, default=_default, option=option)
+
+    if pretty:
+        text = json.dumps(obj, indent=2, ensure_ascii=False, default=_default)
+    else:
+        text = json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=_default)
+    return text.encode("utf-8")
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """
+    Deserialize a JSON document
+
+    Args:
+        data: JSON document as bytes or str
+
+    Returns:
+        Decoded object
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def compression_for_path(path: PathLike) -> Optional[str]:
+    """
+    Detect the compression codec from a file name
+
+    Returns:
+        "gzip", "zstd" or None for plain files
+    """
+    name = str(path)
+    if name.endswith(".gz"):
+        return "gzip"
+    if name.endswith(".zst"):
+        return "zstd"
+    return None
+
+
+def json_filename(stem: str, compression: Optional[str] = None) -> str:
+    """
+    Build a file name with the suffix for the given compression codec
+
+    Args:
+        stem: File name without extension
+        compression: None, "gzip" or "zstd"
+
+    Returns:
+        File name such as "stem.json.gz"
+    """
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"Unsupported compression: {compression}")
+    return f"{stem}{COMPRESSION_SUFFIXES[compression]}"
+
+
+def strip_json_suffix(name: str) -> str:
+    """Remove a .json/.json.gz/.json.zst suffix from a file name"""
+    for suffix in sorted(JSON_SUFFIXES, key=len, reverse=True):
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return name
+
+
+def _require_zstd():
+    if zstandard is None:
+        raise RuntimeError("zstd compression requires the 'zstandard' package")
+
+
+def open_binary(
+    path: PathLike, mode: str = "rb", compression_from: Optional[PathLike] = None
+) -> IO[bytes]:
+    """
+    Open a file in binary mode, compressing or decompressing by suffix
+
+    Args:
+        path: File path
+        mode: "rb", "wb" or "xb"
+        compression_from: Name whose suffix selects the codec instead of path
+            (for temporary files that are renamed when complete)
+
+    Returns:
+        Binary file object
+    """
+    compression = compression_for_path(compression_from or path)
+
+    if compression == "gzip":
+        return gzip.open(path, mode)
+
+    if compression == "zstd":
+        _require_zstd()
+        raw = open(path, mode)
+        if "r" in mode:
+            return zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+
+    return open(path, mode)
+
+
+def temp_path(path: PathLike) -> Path:
+    """Hidden temporary name next to path, not matched by list_json_files()"""
+    path = Path(path)
+    return path.with_name(f".{path.name}.part")
+
+
+def fsync_path(path: PathLike):
+    """Flush a closed file's data to disk"""
+    with open(path, "rb+") as f:
+        os.fsync(f.fileno())
+
+
+def write_bytes(path: PathLike, data: bytes, atomic: bool = False):
+    """
+    Write raw bytes, compressing according to the file suffix
+
+    Args:
+        path: Output path
+        data: Uncompressed bytes
+        atomic: Write a temporary file and rename it over path, so readers
+            never see a partial file
+    """
+    compression = compression_for_path(path)
+
+    if compression == "gzip":
+        data = gzip.compress(data)
+    elif compression == "zstd":
+        _require_zstd()
+        data = zstandard.ZstdCompressor().compress(data)
+
+    if not atomic:
+        Path(path).write_bytes(data)
+        return
+
+    tmp_path = temp_path(path)
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_bytes(path: PathLike) -> bytes:
+    """Read raw bytes, decompressing according to the file suffix"""
+    data = Path(path).read_bytes()
+    compression = compression_for_path(path)
+
+    if compression == "gzip":
+        return gzip.decompress(data)
+    if compression == "zstd":
+        _require_zstd()
+        with zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data)) as reader:
+            return reader.read()
+    return data
+
+
+def write_json(path: PathLike, obj: Any, pretty: bool = False, atomic: bool = False):
+    """
+    Serialize an object and write it to a (possibly compressed) JSON file
+
+    Args:
+        path: Output path; .json.gz and .json.zst are compressed
+        obj: Object to serialize
+        pretty: Indent output with 2 spaces
+        atomic: Replace path only once the file is complete
+    """
+    write_bytes(path, dumps(obj, pretty=pretty), atomic=atomic)
+
+
+def read_json(path: PathLike) -> Any:
+    """
+    Read a (possibly compressed) JSON file
+
+    Args:
+        path: Input path; .json.gz and .json.zst are decompressed
+
+    Returns:
+        Decoded object
+    """
+    return loads(read_bytes(path))
+
+
+def write_json_stream(
+    path: PathLike,
+    header: Dict[str, Any],
+    items: Iterable[Any],
+    key: str = "data",
+    atomic: bool = False,
+    pretty: bool = False,
+    on_item: Optional[Callable[[Dict[str, Any], int, int], None]] = None,
+) -> int:
+    """
+    Write a JSON object whose list member is serialized one item at a time
+
+    The document is ``{**header, key: [items...]}`` with one item per line,
+    so large result sets are never materialized as a single bytes object.
+
+    Args:
+        path: Output path; .json.gz and .json.zst are compressed
+        header: Members written before the list
+        items: Items to stream (dicts, or objects with a to_dict() method)
+        key: Name of the list member
+        atomic: Stream to a temporary file and rename it over path when complete
+        pretty: Indent each item
+        on_item: Called with (item, start, end) for every item, where start and
+            end are byte offsets of its JSON in the uncompressed document
+
+    Returns:
+        Number of items written
+    """
+    head = dumps(header)
+    head = head[:-1] + (b"," if header else b"") + dumps(key) + b":["
+
+    target = temp_path(path) if atomic else path
+    count = 0
+    position = len(head)
+    with open_binary(target, "wb", compression_from=path) as f:
+        f.write(head)
+        for item in items:
+            if hasattr(item, "to_dict"):
+                item = item.to_dict()
+            separator = b"\n" if count == 0 else b",\n"
+            data = dumps(item, pretty=pretty)
+            f.write(separator + data)
+            if on_item is not None:
+                start = position + len(separator)
+                on_item(item, start, start + len(data))
+            position += len(separator) + len(data)
+            count += 1
+        f.write(b"\n]}" if count else b"]}")
+
+    if atomic:
+        fsync_path(target)
+        os.replace(target, path)
+    return count
+
+
+def unique_json_path(directory: PathLike, stem: str, compression: Optional[str] = None) -> Path:
+    """
+    Claim a new file name, adding _1, _2, ... when the name is taken
+
+    The file is created empty so concurrent writers never pick the same name;
+    list_json_files() skips it until it has been written.
+
+    Args:
+        directory: Target directory
+        stem: Preferred file name without extension
+        compression: None, "gzip" or "zstd"
+
+    Returns:
+        Path of the created (empty) file
+    """
+    directory = Path(directory)
+    candidate, n = stem, 0
+    while True:
+        path = directory / json_filename(candidate, compression)
+        try:
+            with open(path, "xb"):
+                return path
+        except FileExistsError:
+            n += 1
+            candidate = f"{stem}_{n}"
+
+
+def list_json_files(directory: PathLike) -> List[Path]:
+    """
+    List plain and compressed JSON files in a directory
+
+    Empty files are skipped: they are names claimed by unique_json_path()
+    whose content has not been written yet.
+
+    Args:
+        directory: Directory to scan (not recursive)
+
+    Returns:
+        List of matching paths
+    """
+    directory = Path(directory)
+    files = []
+    for suffix in JSON_SUFFIXES:
+        for path in directory.glob(f"*{suffix}"):
+            try:
+                if path.stat().st_size:
+                    files.append(path)
+            except OSError:
+                continue  # Removed while listing
+    return files
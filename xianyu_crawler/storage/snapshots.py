@@ -0,0 +1,425 @@
+"""
+Seller snapshot store and diff engine for Xianyu crawler
+
+Each seller crawl is stored as columns sorted by product_id (ids, prices,
+titles) plus the sorted set of normalized title keys. Diffs between two
+snapshots are linear merges over the sorted arrays, and cross-seller
+questions ("A still sells what B delisted") are merge joins on title keys,
+so comparing thousands of listings takes milliseconds.
+"""
+
+import argparse
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+from xianyu_crawler.storage.serialization import (
+    list_json_files,
+    read_json,
+    strip_json_suffix,
+    unique_json_path,
+    write_json,
+)
+from xianyu_crawler.utils.titles import TitleIndex, normalize_title
+from xianyu_crawler.utils.validators import sanitize_filename
+
+# Keys holding the listing array in crawler and browser snapshot files
+LISTING_KEYS = ("products", "data", "albums")
+
+# Keys holding the crawl time in snapshot files
+TIME_KEYS = ("scraped_at", "extracted_at", "export_time")
+
+# Snapshot file stem: capture second, plus _N for later snapshots of that second
+SNAPSHOT_STEM = re.compile(r"^(\d{8}_\d{6})(?:_(\d+))?$")
+
+
+def _parse_price(value: Any) -> Optional[float]:
+    try:
+        return round(float(str(value).replace("¥", "").replace(",", "")), 2)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_time(value: Any) -> Optional[datetime]:
+    if not isinstance(value, str):
+        return None
+    try:
+        # fromisoformat() only accepts a trailing "Z" from Python 3.11
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def merge_diff(
+    a: Sequence[Any], b: Sequence[Any]
+) -> Tuple[List[int], List[int], List[Tuple[int, int]]]:
+    """
+    Compare two sorted sequences of unique keys in one linear pass
+
+    Args:
+        a: Sorted keys
+        b: Sorted keys
+
+    Returns:
+        (positions only in a, positions only in b, (a, b) position pairs in both)
+    """
+    i = j = 0
+    only_a, only_b, both = [], [], []
+    while i < len(a) and j < len(b):
+        if a[i] == b[j]:
+            both.append((i, j))
+            i += 1
+            j += 1
+        elif a[i] < b[j]:
+            only_a.append(i)
+            i += 1
+        else:
+            only_b.append(j)
+            j += 1
+    only_a.extend(range(i, len(a)))
+    only_b.extend(range(j, len(b)))
+    return only_a, only_b, both
+
+
+@dataclass
+class SellerSnapshot:
+    """One crawl of a seller's listings in sorted columnar form"""
+
+    seller: str
+    taken_at: str
+    # Listings with a product ID, sorted by ID (first occurrence kept)
+    product_ids: List[str] = field(default_factory=list)
+    prices: List[Optional[float]] = field(default_factory=list)
+    titles: List[str] = field(default_factory=list)
+    # Titles of listings without a product ID, in crawl order
+    untracked_titles: List[str] = field(default_factory=list)
+    # Sorted unique normalized titles of all listings
+    title_keys: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_listings(
+        cls, seller: str, listings: Iterable[Any], taken_at: Optional[str] = None
+    ) -> "SellerSnapshot":
+        """
+        Build a snapshot from listing dicts or plain title strings
+
+        Args:
+            seller: Seller name
+            listings: Dicts with product_id/id, title and price, or titles
+            taken_at: Crawl time (ISO format, defaults to now)
+
+        Returns:
+            SellerSnapshot
+        """
+        rows = {}
+        untracked = []
+        for listing in listings:
+            if isinstance(listing, str):
+                untracked.append(listing)
+                continue
+            title = listing.get("title") or ""
+            product_id = str(listing.get("product_id") or listing.get("id") or "")
+            if not product_id:
+                untracked.append(title)
+            elif product_id not in rows:
+                rows[product_id] = (_parse_price(listing.get("price")), title)
+
+        product_ids = sorted(rows)
+        titles = [rows[pid][1] for pid in product_ids]
+        keys = {normalize_title(t) for t in titles}
+        keys.update(normalize_title(t) for t in untracked)
+
+        return cls(
+            seller=seller,
+            taken_at=taken_at or datetime.now().isoformat(),
+            product_ids=product_ids,
+            prices=[rows[pid][0] for pid in product_ids],
+            titles=titles,
+            untracked_titles=untracked,
+            title_keys=sorted(keys),
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SellerSnapshot":
+        """Rebuild a snapshot saved with to_dict()"""
+        return cls(**{name: data[name] for name in cls.__dataclass_fields__ if name in data})
+
+    def to_dict(self) -> dict:
+        """Convert to dictionary for JSON storage"""
+        return {name: getattr(self, name) for name in self.__dataclass_fields__}
+
+    def all_titles(self) -> List[str]:
+        """Raw titles of all listings"""
+        return self.titles + self.untracked_titles
+
+    def __len__(self) -> int:
+        return len(self.product_ids) + len(self.untracked_titles)
+
+
+@dataclass
+class SnapshotDiff:
+    """Differences between two snapshots of the same seller"""
+
+    added: List[Tuple[str, str, Optional[float]]]  # (product_id, title, price)
+    removed: List[Tuple[str, str, Optional[float]]]
+    price_changed: List[Tuple[str, str, Optional[float], Optional[float]]]  # (id, title, old, new)
+    added_titles: List[str]  # normalized title keys
+    removed_titles: List[str]
+
+    def summary(self) -> Dict[str, int]:
+        """Counts per change type"""
+        return {
+            "added": len(self.added),
+            "removed": len(self.removed),
+            "price_changed": len(self.price_changed),
+            "added_titles": len(self.added_titles),
+            "removed_titles": len(self.removed_titles),
+        }
+
+
+def diff_snapshots(old: SellerSnapshot, new: SellerSnapshot) -> SnapshotDiff:
+    """
+    Compute added, removed and price-changed listings between two snapshots
+
+    Listings are matched by product_id; title-level changes (which also
+    cover snapshots without product IDs) compare normalized title keys.
+
+    Args:
+        old: Earlier snapshot
+        new: Later snapshot
+
+    Returns:
+        SnapshotDiff
+    """
+    only_old, only_new, both = merge_diff(old.product_ids, new.product_ids)
+    removed_keys, added_keys, _ = merge_diff(old.title_keys, new.title_keys)
+
+    return SnapshotDiff(
+        added=[(new.product_ids[j], new.titles[j], new.prices[j]) for j in only_new],
+        removed=[(old.product_ids[i], old.titles[i], old.prices[i]) for i in only_old],
+        price_changed=[
+            (old.product_ids[i], new.titles[j], old.prices[i], new.prices[j])
+            for i, j in both
+            if old.prices[i] != new.prices[j]
+        ],
+        added_titles=[new.title_keys[j] for j in added_keys],
+        removed_titles=[old.title_keys[i] for i in removed_keys],
+    )
+
+
+def sold_elsewhere(
+    current: SellerSnapshot,
+    before: SellerSnapshot,
+    after: SellerSnapshot,
+    fuzzy: bool = False,
+) -> List[str]:
+    """
+    Titles one seller still lists that another seller has delisted
+
+    Args:
+        current: Snapshot of the seller who still lists the albums
+        before: Earlier snapshot of the other seller
+        after: Later snapshot of the other seller
+        fuzzy: Match albums like skills/xianyu_compare.is_same_album (a long
+            title contained in the other also matches) instead of by equal keys
+
+    Returns:
+        Raw titles from current (in its listing order) that match an album in
+        before but none in after
+    """
+    titles = current.all_titles()
+
+    if fuzzy:
+        before_index = TitleIndex(before.all_titles())
+        after_index = TitleIndex(after.all_titles())
+        return [t for t in titles if before_index.matches(t) and not after_index.matches(t)]
+
+    # Delisted keys, then a merge join with the current seller's keys
+    delisted_positions, _, _ = merge_diff(before.title_keys, after.title_keys)
+    delisted = [before.title_keys[i] for i in delisted_positions]
+    _, _, joined = merge_diff(current.title_keys, delisted)
+    matched = {current.title_keys[i] for i, _ in joined}
+    return [t for t in titles if normalize_title(t) in matched]
+
+
+def load_snapshot_file(path: str, seller: Optional[str] = None) -> SellerSnapshot:
+    """
+    Build a snapshot from a crawler export or browser snapshot file
+
+    Args:
+        path: JSON file with a products/data/albums listing array
+        seller: Seller name (defaults to the file's "seller" value or file name)
+
+    Returns:
+        SellerSnapshot
+    """
+    path = Path(path)
+    data = read_json(path)
+
+    listings = []
+    taken_at = None
+    if isinstance(data, list):
+        listings = data
+    elif isinstance(data, dict):
+        for key in LISTING_KEYS:
+            listings.extend(data.get(key) or [])
+        for key in TIME_KEYS:
+            taken_at = taken_at or _parse_time(data.get(key))
+        seller = seller or data.get("seller")
+
+    if taken_at is None:
+        taken_at = datetime.fromtimestamp(path.stat().st_mtime)
+
+    return SellerSnapshot.from_listings(seller or path.stem, listings, taken_at.isoformat())
+
+
+def _snapshot_order(path: Path) -> Tuple[str, int, str]:
+    """Sort key of snapshot files: capture time, then same-second sequence"""
+    stem = strip_json_suffix(path.name)
+    match = SNAPSHOT_STEM.match(stem)
+    if match is None:
+        return (stem, 0, path.name)
+    return (match.group(1), int(match.group(2) or 0), path.name)
+
+
+class SnapshotStore:
+    """
+    Directory of seller snapshots: <store_dir>/<seller>/<YYYYmmdd_HHMMSS>.json
+
+    Snapshots taken within the same second get a _1, _2, ... suffix.
+    """
+
+    def __init__(self, store_dir: str, compression: Optional[str] = None):
+        """
+        Args:
+            store_dir: Root directory of the store
+            compression: None, "gzip" or "zstd"
+        """
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.compression = compression
+
+    def _seller_dir(self, seller: str) -> Path:
+        return self.store_dir / sanitize_filename(seller)
+
+    def save(self, snapshot: SellerSnapshot) -> Path:
+        """
+        Store a snapshot
+
+        Returns:
+            Path of the snapshot file
+        """
+        seller_dir = self._seller_dir(snapshot.seller)
+        seller_dir.mkdir(parents=True, exist_ok=True)
+        taken_at = _parse_time(snapshot.taken_at) or datetime.now()
+        path = unique_json_path(seller_dir, taken_at.strftime("%Y%m%d_%H%M%S"), self.compression)
+        write_json(path, snapshot.to_dict(), atomic=True)
+        logger.info(f"Saved snapshot of {snapshot.seller} ({len(snapshot)} listings) to {path}")
+        return path
+
+    def import_file(self, path: str, seller: Optional[str] = None) -> SellerSnapshot:
+        """Load a snapshot file (see load_snapshot_file) and store it"""
+        snapshot = load_snapshot_file(path, seller)
+        self.save(snapshot)
+        return snapshot
+
+    def sellers(self) -> List[str]:
+        """Seller directory names in the store"""
+        return sorted(p.name for p in self.store_dir.iterdir() if p.is_dir())
+
+    def snapshot_files(self, seller: str) -> List[Path]:
+        """Snapshot files of a seller, oldest first"""
+        seller_dir = self._seller_dir(seller)
+        if not seller_dir.exists():
+            return []
+        return sorted(list_json_files(seller_dir), key=_snapshot_order)
+
+    def load(self, path: Path) -> SellerSnapshot:
+        """Load a stored snapshot"""
+        return SellerSnapshot.from_dict(read_json(path))
+
+    def latest(self, seller: str, count: int = 1) -> List[SellerSnapshot]:
+        """
+        Most recent snapshots of a seller, oldest first
+
+        Args:
+            seller: Seller name
+            count: Number of snapshots
+        """
+        return [self.load(p) for p in self.snapshot_files(seller)[-count:]]
+
+
+def _print_diff(diff: SnapshotDiff, old: SellerSnapshot, new: SellerSnapshot):
+    print(f"\n{old.seller}: {old.taken_at} -> {new.taken_at}")
+    print(f"  {diff.summary()}")
+    for product_id, title, price in diff.added:
+        print(f"  + {product_id}  ¥{price}  {title[:50]}")
+    for product_id, title, price in diff.removed:
+        print(f"  - {product_id}  ¥{price}  {title[:50]}")
+    for product_id, title, old_price, new_price in diff.price_changed:
+        print(f"  ~ {product_id}  ¥{old_price} -> ¥{new_price}  {title[:50]}")
+    if not old.product_ids or not new.product_ids:
+        for key in diff.added_titles:
+            print(f"  + {key[:60]}")
+        for key in diff.removed_titles:
+            print(f"  - {key[:60]}")
+
+
+def main():
+    """CLI entry point for the snapshot store"""
+    from xianyu_crawler.settings import SNAPSHOT_DIR
+
+    parser = argparse.ArgumentParser(description="Xianyu seller snapshot diffs")
+    parser.add_argument("--store", default=str(SNAPSHOT_DIR), help="Store directory")
+    parser.add_argument("--import", dest="import_files", nargs="+", help="Import snapshot files")
+    parser.add_argument("--seller", help="Seller name for --import")
+    parser.add_argument("--diff", metavar="SELLER", help="Diff the last two snapshots of a seller")
+    parser.add_argument("--diff-files", nargs=2, metavar=("OLD", "NEW"), help="Diff two files")
+    parser.add_argument(
+        "--sold-elsewhere",
+        nargs=2,
+        metavar=("SELLER_A", "SELLER_B"),
+        help="Albums A still lists that B delisted between its last two snapshots",
+    )
+    parser.add_argument("--fuzzy", action="store_true", help="Use containment title matching")
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.store)
+
+    if args.import_files:
+        for path in args.import_files:
+            snapshot = store.import_file(path, args.seller)
+            print(f"Imported {path}: {snapshot.seller} ({len(snapshot)} listings)")
+
+    if args.diff_files:
+        old, new = (load_snapshot_file(p) for p in args.diff_files)
+        _print_diff(diff_snapshots(old, new), old, new)
+    elif args.diff:
+        snapshots = store.latest(args.diff, 2)
+        if len(snapshots) < 2:
+            print(f"Need two snapshots of {args.diff}, found {len(snapshots)}")
+            return
+        _print_diff(diff_snapshots(*snapshots), *snapshots)
+    elif args.sold_elsewhere:
+        seller_a, seller_b = args.sold_elsewhere
+        current = store.latest(seller_a)
+        history = store.latest(seller_b, 2)
+        if not current or len(history) < 2:
+            print(f"Need one snapshot of {seller_a} and two of {seller_b}")
+            return
+        titles = sold_elsewhere(current[0], *history, fuzzy=args.fuzzy)
+        print(f"\n{seller_a} still lists {len(titles)} album(s) {seller_b} delisted:")
+        for i, title in enumerate(titles, 1):
+            print(f"  {i}. {title[:65]}")
+    elif not args.import_files:
+        for seller in store.sellers():
+            files = store.snapshot_files(seller)
+            print(f"{seller}: {len(files)} snapshot(s), latest {files[-1].name if files else '-'}")
+
+
+if __name__ == "__main__":
+    main()
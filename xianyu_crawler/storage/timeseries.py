@@ -0,0 +1,659 @@
+"""
+Per-product price/want-count time-series store for Xianyu crawler
+
+Observations (timestamp, price, want_count, view_count, available) are
+buffered in memory and flushed into immutable columnar segment files. Each
+segment is sorted by (product_id, timestamp); numeric columns are
+delta-encoded and every column is compressed separately, so range scans
+decode a few small arrays instead of reparsing JSON exports.
+"""
+
+import argparse
+import re
+import struct
+import zlib
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+from itertools import accumulate
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from loguru import logger
+
+from xianyu_crawler.storage.serialization import (
+    dumps,
+    list_json_files,
+    loads,
+    read_json,
+    write_json,
+    zstandard,
+)
+
+SEGMENT_MAGIC = b"XYTS1\n"
+SEGMENT_SUFFIX = ".seg"
+SEGMENT_PATTERN = re.compile(r"^segment_(\d+)\.(?:seg|tmp)$")
+MANIFEST_NAME = "manifest.json"
+
+# Sentinel for missing counts (counts are never negative)
+MISSING = -1
+
+Timestamp = Union[int, float, datetime, str]
+
+
+class Observation(NamedTuple):
+    """A single observation of a product"""
+
+    timestamp: int
+    price: Optional[float]
+    want_count: Optional[int]
+    view_count: Optional[int]
+    available: bool
+
+
+class Change(NamedTuple):
+    """Consecutive observations of a product with differing values"""
+
+    product_id: str
+    before: Observation
+    after: Observation
+    fields: Tuple[str, ...]
+
+
+def to_epoch(value: Timestamp) -> int:
+    """Convert a timestamp (epoch seconds, datetime or ISO string) to epoch seconds"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(value)
+
+
+def _delta_encode(values: List[int], runs: List[int]) -> bytes:
+    """Delta-encode values, restarting from zero at each product run"""
+    deltas = array("q", [0] * len(values))
+    row = 0
+    for count in runs:
+        previous = 0
+        for i in range(row, row + count):
+            deltas[i] = values[i] - previous
+            previous = values[i]
+        row += count
+    return deltas.tobytes()
+
+
+def _as_array(data: bytes) -> array:
+    values = array("q")
+    values.frombytes(data)
+    return values
+
+
+class _Codec:
+    """Column compression: zstd when available, zlib otherwise"""
+
+    def __init__(self, name: str):
+        if name == "zstd" and zstandard is None:
+            raise RuntimeError("Segment uses zstd but the 'zstandard' package is not installed")
+        self.name = name
+
+    @classmethod
+    def default(cls) -> "_Codec":
+        return cls("zstd" if zstandard is not None else "zlib")
+
+    def compress(self, data: bytes) -> bytes:
+        if self.name == "zstd":
+            return zstandard.ZstdCompressor(level=9).compress(data)
+        return zlib.compress(data, 9)
+
+    def decompress(self, data: bytes) -> bytes:
+        if self.name == "zstd":
+            return zstandard.ZstdDecompressor().decompress(data)
+        return zlib.decompress(data)
+
+
+def _observation(timestamp: int, price: int, want_count: int, view_count: int, available: int):
+    """Build an Observation from stored column values"""
+    return Observation(
+        timestamp,
+        price / 100 if price != MISSING else None,
+        want_count if want_count != MISSING else None,
+        view_count if view_count != MISSING else None,
+        bool(available),
+    )
+
+
+class _Segment:
+    """Decompressed columns and product index of one segment file"""
+
+    def __init__(self, path: Path):
+        raw = path.read_bytes()
+        if not raw.startswith(SEGMENT_MAGIC):
+            raise ValueError(f"Not a time-series segment: {path}")
+
+        offset = len(SEGMENT_MAGIC)
+        (header_length,) = struct.unpack_from(">I", raw, offset)
+        offset += 4
+        header = loads(raw[offset : offset + header_length])
+        body = raw[offset + header_length :]
+        codec = _Codec(header["codec"])
+
+        def column(name: str) -> bytes:
+            start, length = header["columns"][name]
+            return codec.decompress(body[start : start + length])
+
+        product_ids = column("ids").decode("utf-8").split("\n") if header["rows"] else []
+        runs = _as_array(column("runs"))
+
+        self.index: Dict[str, Tuple[int, int]] = {}
+        start = 0
+        for product_id, count in zip(product_ids, runs):
+            self.index[product_id] = (start, count)
+            start += count
+
+        # Delta-encoded per product run, decoded on access
+        self.timestamps = _as_array(column("ts"))
+        self.prices = _as_array(column("price"))
+        self.want_counts = _as_array(column("want"))
+        self.view_counts = _as_array(column("view"))
+        self.available = column("available")
+
+        self._decoded: Optional[List[Observation]] = None
+
+    def observations(self, start: int, count: int) -> List[Observation]:
+        """Decode the observations of one product run"""
+        end = start + count
+        if self._decoded is not None:
+            return self._decoded[start:end]
+
+        return [
+            _observation(*values)
+            for values in zip(
+                accumulate(self.timestamps[start:end]),
+                accumulate(self.prices[start:end]),
+                accumulate(self.want_counts[start:end]),
+                accumulate(self.view_counts[start:end]),
+                self.available[start:end],
+            )
+        ]
+
+    def decoded(self) -> List[Observation]:
+        """Decode every row once (cached) for full segment scans"""
+        if self._decoded is None:
+            decoded = []
+            for start, count in self.index.values():
+                decoded.extend(self.observations(start, count))
+            self._decoded = decoded
+        return self._decoded
+
+    def product(self, product_id: str) -> List[Observation]:
+        """Decode all observations of a product in this segment"""
+        start, count = self.index.get(product_id, (0, 0))
+        return self.observations(start, count) if count else []
+
+
+def write_segment(path: Path, observations: List[Tuple[str, Observation]]):
+    """
+    Write observations to a new segment file
+
+    Args:
+        path: Segment file path
+        observations: (product_id, Observation) pairs in any order
+    """
+    observations = sorted(observations, key=lambda o: (o[0], o[1].timestamp))
+    codec = _Codec.default()
+
+    product_ids: List[str] = []
+    runs: List[int] = []
+    for product_id, _ in observations:
+        if product_ids and product_ids[-1] == product_id:
+            runs[-1] += 1
+        else:
+            product_ids.append(product_id)
+            runs.append(1)
+
+    obs = [o for _, o in observations]
+    columns = {
+        "ids": "\n".join(product_ids).encode("utf-8"),
+        "runs": array("q", runs).tobytes(),
+        "ts": _delta_encode([o.timestamp for o in obs], runs),
+        "price": _delta_encode(
+            [round(o.price * 100) if o.price is not None else MISSING for o in obs], runs
+        ),
+        "want": _delta_encode(
+            [o.want_count if o.want_count is not None else MISSING for o in obs], runs
+        ),
+        "view": _delta_encode(
+            [o.view_count if o.view_count is not None else MISSING for o in obs], runs
+        ),
+        "available": bytes(1 if o.available else 0 for o in obs),
+    }
+
+    body = bytearray()
+    column_offsets = {}
+    for name, data in columns.items():
+        compressed = codec.compress(data)
+        column_offsets[name] = [len(body), len(compressed)]
+        body.extend(compressed)
+
+    header = dumps(
+        {
+            "rows": len(obs),
+            "products": len(product_ids),
+            "min_ts": min((o.timestamp for o in obs), default=0),
+            "max_ts": max((o.timestamp for o in obs), default=0),
+            "codec": codec.name,
+            "columns": column_offsets,
+        }
+    )
+
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(SEGMENT_MAGIC)
+        f.write(struct.pack(">I", len(header)))
+        f.write(header)
+        f.write(body)
+    tmp_path.replace(path)
+
+
+class PriceHistoryStore:
+    """
+    Time-series store of product observations keyed by product_id
+    """
+
+    def __init__(
+        self,
+        store_dir: str,
+        flush_rows: int = 50_000,
+        cache_segments: int = 32,
+        writer=None,
+    ):
+        """
+        Args:
+            store_dir: Directory for segment files and the manifest
+            flush_rows: Buffered observations that trigger a segment flush
+            cache_segments: Number of decoded segments kept in memory
+            writer: IOWriterPool for background flushes (None writes synchronously)
+        """
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest_file = self.store_dir / MANIFEST_NAME
+        self.flush_rows = flush_rows
+        self.cache_segments = cache_segments
+        self.writer = writer
+
+        self.buffer: List[Tuple[str, Observation]] = []
+        self.segments: List[dict] = []
+        # (segment name, observations) swapped out of the buffer and still being written
+        self._flushing: List[Tuple[str, List[Tuple[str, Observation]]]] = []
+        self._cache: "OrderedDict[str, _Segment]" = OrderedDict()
+
+        if self.manifest_file.exists():
+            try:
+                self.segments = read_json(self.manifest_file).get("segments", [])
+            except Exception as e:
+                logger.error(f"Error loading time-series manifest: {e}")
+
+    def append(
+        self,
+        product_id: str,
+        timestamp: Timestamp,
+        price: Optional[float],
+        want_count: Optional[int] = None,
+        view_count: Optional[int] = None,
+        available: bool = True,
+    ):
+        """Append one observation, flushing a segment when the buffer is full"""
+        observation = Observation(
+            to_epoch(timestamp),
+            round(float(price), 2) if price is not None else None,
+            int(want_count) if want_count is not None else None,
+            int(view_count) if view_count is not None else None,
+            bool(available),
+        )
+        self.buffer.append((str(product_id), observation))
+
+        if len(self.buffer) >= self.flush_rows:
+            self.flush()
+
+    def append_item(self, item: dict, timestamp: Optional[Timestamp] = None):
+        """
+        Append an observation from an item or exported product dict
+
+        Args:
+            item: Item with product_id, price, want_count, view_count, is_available
+            timestamp: Observation time, defaults to the item's crawled_at or now
+        """
+        if timestamp is None:
+            timestamp = item.get("crawled_at") or datetime.now()
+        self.append(
+            item["product_id"],
+            timestamp,
+            item.get("price"),
+            item.get("want_count"),
+            item.get("view_count"),
+            item.get("is_available", True),
+        )
+
+    def flush(self):
+        """
+        Write buffered observations to a new segment
+
+        With a writer, the buffer is swapped out and the segment and manifest
+        are written in the background, after earlier flushes of this store.
+
+        Returns:
+            Deferred fired when written if a writer is set, else None
+        """
+        if not self.buffer:
+            return None
+
+        batch = (f"segment_{self._next_sequence():06d}{SEGMENT_SUFFIX}", self.buffer)
+        self.buffer = []
+        if self.writer is None:
+            self._write_batch(batch)
+            return None
+        self._flushing.append(batch)
+        return self.writer.submit(self.store_dir, self._write_batch, batch)
+
+    def _write_batch(self, batch: Tuple[str, List[Tuple[str, Observation]]]):
+        """Write one swapped-out buffer to its segment and add it to the manifest"""
+        name, observations = batch
+        path = self.store_dir / name
+        try:
+            write_segment(path, observations)
+            timestamps = [o.timestamp for _, o in observations]
+            # Listed before leaving _flushing, so readers never miss the rows
+            self.segments.append(
+                {
+                    "name": name,
+                    "rows": len(observations),
+                    "min_ts": min(timestamps),
+                    "max_ts": max(timestamps),
+                }
+            )
+            self._save_manifest()
+        except Exception:
+            logger.error(f"Lost {len(observations)} observations: could not write {path}")
+            raise
+        finally:
+            if batch in self._flushing:
+                self._flushing.remove(batch)
+
+        logger.info(f"Flushed {len(observations)} observations to {path}")
+
+    def _next_sequence(self) -> int:
+        """
+        Sequence number for a new segment
+
+        Taken from the highest sequence in the manifest and on disk, so a lost
+        or rebuilt manifest never leads to an existing segment being overwritten.
+        """
+        last = 0
+        for meta in self.segments:
+            match = SEGMENT_PATTERN.match(meta["name"])
+            if match:
+                last = max(last, int(match.group(1)))
+        for path in self.store_dir.iterdir():
+            match = SEGMENT_PATTERN.match(path.name)
+            if match:
+                last = max(last, int(match.group(1)))
+        for name, _ in self._flushing:
+            last = max(last, int(SEGMENT_PATTERN.match(name).group(1)))
+        return last + 1
+
+    def _save_manifest(self):
+        tmp_file = self.manifest_file.with_suffix(".tmp")
+        write_json(tmp_file, {"segments": list(self.segments)})
+        tmp_file.replace(self.manifest_file)
+
+    def _segment(self, name: str) -> _Segment:
+        segment = self._cache.get(name)
+        if segment is None:
+            segment = _Segment(self.store_dir / name)
+            self._cache[name] = segment
+            if len(self._cache) > self.cache_segments:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(name)
+        return segment
+
+    def _snapshot(self) -> Tuple[List[dict], List[Tuple[str, Observation]]]:
+        """
+        Segments and the observations not yet in one of them
+
+        In-flight batches are read before the segment list: a batch written
+        in between is then found in the list and skipped, so a background
+        flush never makes rows disappear or appear twice.
+        """
+        flushing = list(self._flushing)
+        segments = list(self.segments)
+        committed = {meta["name"] for meta in segments}
+        buffered = [row for name, rows in flushing if name not in committed for row in rows]
+        buffered.extend(self.buffer)
+        return segments, buffered
+
+    @staticmethod
+    def _overlapping(segments: List[dict], start: Optional[int], end: Optional[int]) -> List[dict]:
+        return [
+            meta
+            for meta in segments
+            if (start is None or meta["max_ts"] >= start) and (end is None or meta["min_ts"] <= end)
+        ]
+
+    def history(
+        self,
+        product_id: str,
+        start: Optional[Timestamp] = None,
+        end: Optional[Timestamp] = None,
+    ) -> List[Observation]:
+        """
+        Observations of a product, ordered by timestamp
+
+        Args:
+            product_id: Product ID
+            start: Inclusive lower bound (optional)
+            end: Inclusive upper bound (optional)
+
+        Returns:
+            List of observations
+        """
+        start_ts = to_epoch(start) if start is not None else None
+        end_ts = to_epoch(end) if end is not None else None
+
+        segments, buffered = self._snapshot()
+        observations = []
+        for meta in self._overlapping(segments, start_ts, end_ts):
+            segment = self._segment(meta["name"])
+            observations.extend(segment.product(product_id))
+        observations.extend(o for pid, o in buffered if pid == product_id)
+
+        observations.sort(key=lambda o: o.timestamp)
+        return [
+            o
+            for o in observations
+            if (start_ts is None or o.timestamp >= start_ts)
+            and (end_ts is None or o.timestamp <= end_ts)
+        ]
+
+    def price_history(self, product_id: str, start=None, end=None) -> List[Tuple[int, float]]:
+        """(timestamp, price) pairs for a product"""
+        return [(o.timestamp, o.price) for o in self.history(product_id, start, end)]
+
+    def latest(self, product_id: str) -> Optional[Observation]:
+        """Most recent observation of a product"""
+        observations = self.history(product_id)
+        return observations[-1] if observations else None
+
+    def changes_between(self, start: Timestamp, end: Timestamp) -> Iterator[Change]:
+        """
+        Value changes observed between two timestamps
+
+        Compares consecutive observations of each product inside [start, end],
+        using the last observation before start as the baseline.
+
+        Args:
+            start: Inclusive lower bound
+            end: Inclusive upper bound
+
+        Yields:
+            Change tuples ordered by product_id
+        """
+        start_ts = to_epoch(start)
+        end_ts = to_epoch(end)
+
+        segments, buffered = self._snapshot()
+        per_product: Dict[str, List[Observation]] = {}
+        for meta in self._overlapping(segments, start_ts, end_ts):
+            segment = self._segment(meta["name"])
+            decoded = segment.decoded()
+            for product_id, (first, count) in segment.index.items():
+                observations = decoded[first : first + count]
+                if observations[0].timestamp > end_ts or observations[-1].timestamp < start_ts:
+                    continue
+                per_product.setdefault(product_id, []).extend(observations)
+        for product_id, observation in buffered:
+            if start_ts <= observation.timestamp <= end_ts:
+                per_product.setdefault(product_id, []).append(observation)
+
+        # Earlier segments only supply baselines for products seen in the window
+        earlier = [meta for meta in segments if meta["min_ts"] < start_ts]
+        earlier.sort(key=lambda meta: meta["max_ts"], reverse=True)
+
+        for product_id in sorted(per_product):
+            window = [o for o in per_product[product_id] if start_ts <= o.timestamp <= end_ts]
+            window.sort(key=lambda o: o.timestamp)
+            baseline = self._baseline(product_id, start_ts, earlier, buffered)
+            if baseline is not None:
+                window.insert(0, baseline)
+
+            for before, after in zip(window, window[1:]):
+                if before[1:] == after[1:]:
+                    continue
+                fields = tuple(
+                    name
+                    for name in ("price", "want_count", "view_count", "available")
+                    if getattr(before, name) != getattr(after, name)
+                )
+                yield Change(product_id, before, after, fields)
+
+    def _baseline(
+        self,
+        product_id: str,
+        start_ts: int,
+        earlier: List[dict],
+        buffered: List[Tuple[str, Observation]],
+    ):
+        """
+        Last observation of a product strictly before start_ts
+
+        Segments may overlap (backfills) and buffered rows may be newer than
+        any segment, so every earlier segment and the buffered rows are
+        candidates. earlier is sorted by max_ts, newest first, so the scan
+        stops at the first segment that cannot hold a later observation.
+        """
+        before = [o for pid, o in buffered if pid == product_id and o.timestamp < start_ts]
+        best = max(before, key=lambda o: o.timestamp) if before else None
+        for meta in earlier:
+            if best is not None and meta["max_ts"] <= best.timestamp:
+                break
+            segment = self._segment(meta["name"])
+            if product_id not in segment.index:
+                continue
+            segment.decoded()
+            for observation in segment.product(product_id):
+                if observation.timestamp < start_ts and (
+                    best is None or observation.timestamp > best.timestamp
+                ):
+                    best = observation
+        return best
+
+    def import_exports(self, directory: str) -> int:
+        """
+        Backfill observations from JSON export files
+
+        Args:
+            directory: Directory with export files
+
+        Returns:
+            Number of observations imported
+        """
+        imported = 0
+        for export_file in sorted(list_json_files(directory)):
+            try:
+                data = read_json(export_file)
+            except Exception as e:
+                logger.warning(f"Error reading {export_file}: {e}")
+                continue
+
+            export_time = data.get("export_time") if isinstance(data, dict) else None
+            for item in data.get("data", []) if isinstance(data, dict) else []:
+                if not item.get("product_id"):
+                    continue
+                self.append_item(item, item.get("crawled_at") or export_time)
+                imported += 1
+
+        self.flush()
+        return imported
+
+    def get_stats(self) -> dict:
+        """Get statistics about the store"""
+        segments, buffered = self._snapshot()
+        return {
+            "store_dir": str(self.store_dir),
+            "segments": len(segments),
+            "rows": sum(meta["rows"] for meta in segments),
+            "buffered": len(buffered),
+            "bytes": sum(
+                (self.store_dir / meta["name"]).stat().st_size
+                for meta in segments
+                if (self.store_dir / meta["name"]).exists()
+            ),
+        }
+
+
+def main():
+    """CLI entry point for querying the time-series store"""
+    from xianyu_crawler.settings import HISTORY_DIR, JSON_OUTPUT_DIR
+
+    parser = argparse.ArgumentParser(description="Xianyu price history store")
+    parser.add_argument("--store", default=str(HISTORY_DIR), help="Store directory")
+    parser.add_argument(
+        "--import-exports",
+        nargs="?",
+        const=str(JSON_OUTPUT_DIR),
+        help="Backfill from a directory of JSON exports",
+    )
+    parser.add_argument("--product", help="Show history of a product ID")
+    parser.add_argument("--since", help="Start time (ISO format or epoch seconds)")
+    parser.add_argument("--until", help="End time (ISO format or epoch seconds)")
+    args = parser.parse_args()
+
+    def parse_time(value):
+        return int(value) if value and value.isdigit() else value
+
+    store = PriceHistoryStore(args.store)
+
+    if args.import_exports:
+        count = store.import_exports(args.import_exports)
+        print(f"Imported {count} observations from {args.import_exports}")
+
+    if args.product:
+        for o in store.history(args.product, parse_time(args.since), parse_time(args.until)):
+            print(
+                f"{datetime.fromtimestamp(o.timestamp).isoformat()}  ¥{o.price}  "
+                f"want={o.want_count} view={o.view_count} available={o.available}"
+            )
+    elif args.since:
+        until = parse_time(args.until) or int(datetime.now().timestamp())
+        for change in store.changes_between(parse_time(args.since), until):
+            deltas = ", ".join(
+                f"{name}: {getattr(change.before, name)} -> {getattr(change.after, name)}"
+                for name in change.fields
+            )
+            print(f"{change.product_id}  {deltas}")
+    else:
+        print(dumps(store.get_stats(), pretty=True).decode("utf-8"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+Declarative field extraction for Xianyu pages
+
+A page is described as a list of FieldSpec entries (field -> selector chain ->
+post-processor). The spec is compiled once into lxml matchers, and extraction
+then visits every element of the document exactly once.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from lxml import etree
+from parsel.csstranslator import css2xpath
+
+# One compound step of a CSS selector, e.g. "div.price" or ".tags"
+_STEP_PATTERN = re.compile(r"^(?P<tag>[a-zA-Z][\w-]*)?(?P<classes>(?:\.[\w-]+)*)$")
+# Trailing pseudo-element: ::text or ::attr(name)
+_PSEUDO_PATTERN = re.compile(r"::(?:(?P<text>text)|attr\((?P<attr>[\w-]+)\))$")
+
+Step = Tuple[Optional[str], FrozenSet[str]]
+
+
+@dataclass(frozen=True)
+class FieldSpec:
+    """
+    Declarative description of a single extracted field
+
+    Attributes:
+        name: Output field name
+        selectors: Comma-separated CSS selector chain (parsel syntax)
+        many: Collect every match instead of the first one
+        post: Optional post-processor applied to the raw value
+    """
+
+    name: str
+    selectors: str
+    many: bool = False
+    post: Optional[Callable[[Any], Any]] = None
+
+
+class _SimpleSelector:
+    """Descendant-only CSS selector matched directly against lxml elements"""
+
+    __slots__ = ("field_index", "steps", "attr", "text")
+
+    def __init__(self, field_index: int, steps: List[Step], attr: Optional[str], text: bool):
+        self.field_index = field_index
+        self.steps = steps
+        self.attr = attr
+        self.text = text
+
+    @staticmethod
+    def _matches_step(element, step: Step, classes: Optional[FrozenSet[str]] = None) -> bool:
+        tag, required = step
+        if tag is not None and element.tag != tag:
+            return False
+        if required:
+            if classes is None:
+                classes = frozenset(element.get("class", "").split())
+            return required <= classes
+        return True
+
+    def matches(self, element, classes: FrozenSet[str]) -> bool:
+        """Check the element (and its ancestors for descendant steps)"""
+        if not self._matches_step(element, self.steps[-1], classes):
+            return False
+
+        # Right-to-left greedy matching is exact for descendant combinators
+        ancestors = element.iterancestors()
+        for step in reversed(self.steps[:-1]):
+            for ancestor in ancestors:
+                if self._matches_step(ancestor, step):
+                    break
+            else:
+                return False
+        return True
+
+    def values(self, element) -> List[str]:
+        """Values produced by a matched element"""
+        if self.attr is not None:
+            value = element.get(self.attr)
+            return [value] if value is not None else []
+
+        if self.text:
+            # Direct text node children, like parsel's ::text
+            texts = [element.text] if element.text is not None else []
+            texts.extend(child.tail for child in element if child.tail is not None)
+            return texts
+
+        return [_text_content(element)]
+
+
+def _text_content(node) -> str:
+    """Full text content of an element (string value of a node)"""
+    if isinstance(node, str):
+        return node
+    return "".join(node.itertext())
+
+
+def _parse_simple(selector: str) -> Optional[Tuple[List[Step], Optional[str], bool]]:
+    """
+    Parse a selector from the supported subset
+
+    Returns:
+        (steps, attr, text) or None if the selector needs the XPath fallback
+    """
+    attr = None
+    text = False
+
+    pseudo = _PSEUDO_PATTERN.search(selector)
+    if pseudo:
+        attr = pseudo.group("attr")
+        text = pseudo.group("text") is not None
+        selector = selector[: pseudo.start()]
+
+    steps: List[Step] = []
+    for part in selector.split():
+        match = _STEP_PATTERN.match(part)
+        if not match or not (match.group("tag") or match.group("classes")):
+            return None
+        classes = frozenset(c for c in match.group("classes").split(".") if c)
+        steps.append((match.group("tag"), classes))
+
+    if not steps:
+        return None
+
+    return steps, attr, text
+
+
+class CompiledExtractor:
+    """
+    Field extraction spec compiled into a single-pass document matcher
+
+    Selectors in the supported subset (tags, classes, descendant combinators,
+    ::text and ::attr()) are indexed by their rightmost class or tag and
+    matched during one walk over the tree. Anything else is compiled into an
+    lxml XPath object once and evaluated separately.
+    """
+
+    def __init__(self, fields: List[FieldSpec]):
+        self.fields = list(fields)
+        self._by_class: Dict[str, List[_SimpleSelector]] = {}
+        self._by_tag: Dict[str, List[_SimpleSelector]] = {}
+        self._xpaths: List[Tuple[int, etree.XPath]] = []
+
+        for index, spec in enumerate(self.fields):
+            for raw_selector in spec.selectors.split(","):
+                raw_selector = raw_selector.strip()
+                if not raw_selector:
+                    continue
+
+                parsed = _parse_simple(raw_selector)
+                if parsed is None:
+                    self._xpaths.append((index, etree.XPath(css2xpath(raw_selector))))
+                    continue
+
+                steps, attr, text = parsed
+                selector = _SimpleSelector(index, steps, attr, text)
+                tag, classes = steps[-1]
+                if classes:
+                    # Any required class works as an index key; candidates are re-checked
+                    self._by_class.setdefault(min(classes), []).append(selector)
+                else:
+                    self._by_tag.setdefault(tag, []).append(selector)
+
+    def extract(self, root) -> Dict[str, Any]:
+        """
+        Extract all fields from an lxml document
+
+        Args:
+            root: lxml root element (e.g. response.selector.root)
+
+        Returns:
+            Dictionary of field name to post-processed value
+        """
+        results: List[List[str]] = [[] for _ in self.fields]
+        done = [False] * len(self.fields)
+        by_class = self._by_class
+        by_tag = self._by_tag
+
+        for element in root.iter():
+            tag = element.tag
+            if not isinstance(tag, str):
+                # Comments and processing instructions
+                continue
+
+            class_attr = element.get("class")
+            if class_attr:
+                classes = frozenset(class_attr.split())
+                candidates = [s for c in classes if c in by_class for s in by_class[c]]
+            else:
+                classes = frozenset()
+                candidates = []
+
+            if tag in by_tag:
+                candidates.extend(by_tag[tag])
+
+            for selector in candidates:
+                index = selector.field_index
+                if done[index] or not selector.matches(element, classes):
+                    continue
+                values = selector.values(element)
+                if values:
+                    results[index].extend(values)
+                    if not self.fields[index].many:
+                        done[index] = True
+
+        for index, xpath in self._xpaths:
+            if not done[index]:
+                results[index].extend(_text_content(node) for node in xpath(root))
+
+        extracted = {}
+        for spec, values in zip(self.fields, results):
+            value = values if spec.many else (values[0] if values else None)
+            extracted[spec.name] = spec.post(value) if spec.post else value
+        return extracted
+
+    def extract_response(self, response) -> Dict[str, Any]:
+        """Extract all fields from a Scrapy HTML response"""
+        return self.extract(response.selector.root)
+
+
+def compile_fields(fields: List[FieldSpec]) -> CompiledExtractor:
+    """
+    Compile a list of field specs into an extractor
+
+    Args:
+        fields: Field specs in output order
+
+    Returns:
+        CompiledExtractor ready to run against parsed documents
+    """
+    return CompiledExtractor(fields)
+
+
+# Common post-processors
+
+
+def strip_or_none(value: Optional[str]) -> Optional[str]:
+    """Strip whitespace, mapping empty values to None"""
+    if not value:
+        return None
+    value = value.strip()
+    return value or None
+
+
+def strip_all(values: List[str]) -> List[str]:
+    """Strip every value and drop empty ones"""
+    return [v.strip() for v in values if v and v.strip()]
+
+
+def non_empty(values: List[str]) -> List[str]:
+    """Drop empty values without modifying the rest"""
+    return [v for v in values if v]
+
+
+def join_text(values: List[str]) -> Optional[str]:
+    """Join stripped text fragments with spaces, or None if nothing is left"""
+    parts = strip_all(values)
+    return " ".join(parts) if parts else None
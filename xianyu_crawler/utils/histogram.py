@@ -0,0 +1,113 @@
+"""
+Fixed-memory latency histogram
+
+Log-linear buckets in the style of HdrHistogram: values below 2**precision_bits
+get one bucket each, larger values share buckets whose width doubles with every
+power of two, so each bucket spans at most 1/2**(precision_bits-1) of its value
+(about 1.6% with the default 7 bits). Memory depends only on the value range,
+not on how many samples were recorded.
+"""
+
+from typing import Dict, Iterable, Optional
+
+DEFAULT_QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+class LogHistogram:
+    """
+    Histogram of non-negative integer values (e.g. microseconds)
+    """
+
+    def __init__(self, max_value: int = 3600 * 10**6, precision_bits: int = 7):
+        """
+        Args:
+            max_value: Largest distinguishable value; larger values are clamped
+            precision_bits: Bits of precision kept per value
+        """
+        self.max_value = max_value
+        self.precision_bits = precision_bits
+        self._half = 1 << (precision_bits - 1)
+        self.counts = [0] * (self._index(max_value) + 1)
+        self.count = 0
+        self.total = 0
+        self.min: Optional[int] = None
+        self.max: Optional[int] = None
+
+    def _index(self, value: int) -> int:
+        shift = max(value.bit_length() - self.precision_bits, 0)
+        return self._half * shift + (value >> shift)
+
+    def _bucket_value(self, index: int) -> int:
+        """Midpoint of a bucket"""
+        if index < 2 * self._half:
+            return index
+        shift = index // self._half - 1
+        low = (index - self._half * shift) << shift
+        return low + ((1 << shift) - 1) // 2
+
+    def record(self, value: int, count: int = 1):
+        """Add a value (count times)"""
+        value = min(max(int(value), 0), self.max_value)
+        self.counts[self._index(value)] += count
+        self.count += count
+        self.total += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "LogHistogram"):
+        """Add all values of a histogram with the same layout"""
+        if len(other.counts) != len(self.counts) or other.precision_bits != self.precision_bits:
+            raise ValueError("Cannot merge histograms with different layouts")
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def percentile(self, q: float) -> int:
+        """
+        Value at a quantile
+
+        Args:
+            q: Quantile between 0 and 1
+
+        Returns:
+            Bucket midpoint clamped to the recorded min/max (0 when empty)
+        """
+        if not self.count:
+            return 0
+        rank = max(1, round(q * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(max(self._bucket_value(index), self.min), self.max)
+        return self.max
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self, scale: float = 1.0, quantiles: Iterable[float] = DEFAULT_QUANTILES) -> Dict:
+        """
+        Summary of the histogram
+
+        Args:
+            scale: Factor applied to every value (e.g. 1e-3 for µs -> ms)
+            quantiles: Quantiles to report as "p50", "p95", ...
+
+        Returns:
+            Dict with count, min, max, mean, sum and the requested quantiles
+        """
+        summary = {
+            "count": self.count,
+            "min": (self.min or 0) * scale,
+            "max": (self.max or 0) * scale,
+            "mean": self.mean() * scale,
+            "sum": self.total * scale,
+        }
+        for q in quantiles:
+            summary[f"p{q * 100:g}"] = self.percentile(q) * scale
+        return summary
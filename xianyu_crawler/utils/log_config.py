@@ -0,0 +1,167 @@
+"""
+Low-overhead loguru configuration for crawls
+
+Sinks are enqueued, so records are written by loguru's background thread
+instead of the reactor thread. Per-item messages (one per product found,
+parsed, skipped) go through a token-bucket sampler keyed by message kind:
+call sites check sampled("kind", level) before building the message, and the
+number of suppressed lines is reported in the periodic progress line
+(extensions.CrawlLogging). An optional JSON-lines sink carries the
+structured record for log shipping.
+"""
+
+import logging
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Optional
+
+from loguru import logger
+from scrapy.logformatter import LogFormatter
+
+
+class LogSampler:
+    """
+    Per-key token bucket limiting how often a message kind is logged
+    """
+
+    def __init__(self, rate: float = 0.0, burst: Optional[int] = None):
+        """
+        Args:
+            rate: Messages per second allowed per key (0 = no limit)
+            burst: Messages allowed at once per key (default: max(1, rate))
+        """
+        self.suppressed = Counter()
+        # Lowest level number any sink accepts; set by configure_logging()
+        self.min_level = 0
+        self._buckets: Dict[str, list] = {}
+        self._lock = threading.Lock()
+        self.configure(rate, burst)
+
+    def configure(self, rate: float, burst: Optional[int] = None):
+        """Change the rate limit and reset all buckets"""
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate))
+        with self._lock:
+            self._buckets.clear()
+
+    def allow(self, key: str) -> bool:
+        """
+        Take a token for a message kind
+
+        Args:
+            key: Message kind, e.g. "parsed_product"
+
+        Returns:
+            True if the message should be logged
+        """
+        if self.rate <= 0:
+            return True
+
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now]
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens >= 1:
+                bucket[0] = tokens - 1
+                return True
+            bucket[0] = tokens
+            self.suppressed[key] += 1
+            return False
+
+    def total_suppressed(self) -> int:
+        return sum(self.suppressed.values())
+
+
+# Shared sampler used by spiders, pipelines and storage
+sampler = LogSampler()
+
+_LEVEL_NUMBERS = {
+    name: logger.level(name).no
+    for name in ("TRACE", "DEBUG", "INFO", "SUCCESS", "WARNING", "ERROR", "CRITICAL")
+}
+
+
+def sampled(key: str, level: str = "INFO") -> bool:
+    """
+    Whether a per-item message of this kind should be logged now
+
+    Messages below the configured level are never logged, so they neither
+    take a token nor count as sampled out.
+
+    Args:
+        key: Message kind, e.g. "parsed_product"
+        level: Level the message would be logged at
+    """
+    if _LEVEL_NUMBERS.get(level, 0) < sampler.min_level:
+        return False
+    return sampler.allow(key)
+
+
+def configure_logging(
+    level: str = "INFO",
+    enqueue: bool = True,
+    json_path: Optional[str] = None,
+    sample_rate: float = 0.0,
+):
+    """
+    Replace loguru's sinks with the crawl configuration
+
+    Args:
+        level: Minimum level of all sinks
+        enqueue: Write records from a background thread
+        json_path: JSON-lines log file (rotated at 50 MB, 5 files kept), None to disable
+        sample_rate: Per-item messages per second per kind (0 = log all)
+    """
+    logger.remove()
+    logger.add(sys.stderr, level=level, enqueue=enqueue)
+    if json_path:
+        Path(json_path).parent.mkdir(parents=True, exist_ok=True)
+        logger.add(
+            json_path,
+            level=level,
+            enqueue=enqueue,
+            serialize=True,
+            rotation="50 MB",
+            retention=5,
+            encoding="utf-8",
+        )
+    sampler.configure(sample_rate)
+    sampler.min_level = level if isinstance(level, int) else logger.level(level.upper()).no
+
+
+def configure_from_settings(settings):
+    """
+    Configure loguru from Scrapy settings
+
+    Args:
+        settings: Crawler settings (LOG_LEVEL, LOGURU_ENQUEUE, LOGURU_JSON_PATH,
+            LOG_SAMPLE_RATE)
+    """
+    configure_logging(
+        level=settings.get("LOG_LEVEL", "INFO"),
+        enqueue=settings.getbool("LOGURU_ENQUEUE", True),
+        json_path=settings.get("LOGURU_JSON_PATH"),
+        sample_rate=settings.getfloat("LOG_SAMPLE_RATE", 0.0),
+    )
+
+
+class QuietLogFormatter(LogFormatter):
+    """
+    Scrapy log formatter that logs dropped items at DEBUG without the item
+
+    Dropping unchanged items is the normal path of an incremental crawl; the
+    default formatter logs every drop as a WARNING with the full item repr.
+    Drops are summarized by reason in the progress line instead.
+    """
+
+    def dropped(self, item, exception, response, spider):
+        entry = super().dropped(item, exception, response, spider)
+        entry["level"] = logging.DEBUG
+        entry["msg"] = "Dropped: %(exception)s"
+        return entry
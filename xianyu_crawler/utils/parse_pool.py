@@ -0,0 +1,99 @@
+"""
+Off-reactor HTML parsing in a process pool
+
+Detail pages are parsed by warm worker processes: the reactor sends the raw
+response body (bytes) and its encoding, a worker decodes it, builds the lxml
+tree and runs the compiled detail extractor, and only the small dict of
+extracted fields travels back. Parsing then scales across cores instead of
+competing with download handling for the GIL.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+_detail_extractor = None
+
+
+def _warm_worker():
+    """Process initializer: import parsing code and compile the extractor once"""
+    global _detail_extractor
+    from xianyu_crawler.spiders.vinyl_spider import DETAIL_PAGE_EXTRACTOR
+
+    _detail_extractor = DETAIL_PAGE_EXTRACTOR
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def extract_detail_fields(body: bytes, encoding: str = "utf-8") -> Dict[str, Any]:
+    """
+    Extract detail page fields from a raw response body
+
+    Args:
+        body: Response body
+        encoding: Response encoding
+
+    Returns:
+        Post-processed fields, as DETAIL_PAGE_EXTRACTOR.extract_response()
+    """
+    from parsel import Selector
+
+    if _detail_extractor is None:
+        _warm_worker()
+    text = body.decode(encoding or "utf-8", errors="replace")
+    return _detail_extractor.extract(Selector(text=text).root)
+
+
+class ParsePool:
+    """
+    Pool of warm parser processes used from the asyncio reactor
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        """
+        Args:
+            workers: Worker processes (default: CPU count)
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.executor: Optional[ProcessPoolExecutor] = None
+
+    def start(self):
+        """Start the workers now rather than on the first page"""
+        if self.executor is not None:
+            return
+        self.executor = ProcessPoolExecutor(
+            self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_worker,
+        )
+        for _ in range(self.workers):
+            self.executor.submit(_ping)
+        logger.info(f"Parse pool started with {self.workers} workers")
+
+    async def extract_detail(self, body: bytes, encoding: str = "utf-8") -> Dict[str, Any]:
+        """
+        Extract detail page fields in a worker process
+
+        Args:
+            body: Response body
+            encoding: Response encoding
+
+        Returns:
+            Extracted fields
+        """
+        if self.executor is None:
+            self.start()
+        future = self.executor.submit(extract_detail_fields, body, encoding)
+        return await asyncio.wrap_future(future)
+
+    def close(self):
+        """Stop the workers, dropping queued pages"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,245 @@
+"""
+Album title normalization for seller comparison
+
+Titles are lowercased, runs of punctuation and whitespace are collapsed to a
+single space and listing noise (format, color variant, promotion badges,
+recency badges) is removed with one compiled alternation regex. Results are
+memoized per normalizer, since comparisons normalize the same titles over and
+over. TitleIndex answers "same album" lookups without pairwise comparisons.
+"""
+
+import re
+from collections import defaultdict
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+# Characters replaced by a space before keyword stripping
+PUNCTUATION = '·•:：,，、""「」『』【】《（）()'
+
+# Listing noise removed from titles, applied in this order
+DEFAULT_KEYWORDS = (
+    "黑胶",
+    "唱片",
+    "专辑",
+    "新专辑",
+    "限量",
+    "带独立编号",
+    "带编",
+    "日版",
+    "台版",
+    "cd",
+    "lp",
+    "1lp",
+    "2lp",
+    "双",
+    "三",
+    "彩胶",
+    "紫胶",
+    "红胶",
+    "黄胶",
+    "绿胶",
+    "金胶",
+    "灰胶",
+    "蓝胶",
+    "白胶",
+    "透明胶",
+    "动画胶",
+    "电影原声",
+    "买家评价",
+    "预定",
+    "现货",
+    "粉丝更优惠",
+    "2人小刀价",
+    "人气第",
+    "热销第",
+    "24小时内发布",
+    "48小时内发布",
+    "72小时内发布",
+    "一周内发布",
+)
+
+
+def _effective_keywords(keywords: Sequence[str]) -> List[str]:
+    """
+    Drop keywords that contain an earlier keyword
+
+    With sequential str.replace, "新专辑" can never match once "专辑" has been
+    removed, so it must not take part in the single-pass alternation either.
+    """
+    effective = []
+    for keyword in keywords:
+        if keyword and not any(earlier in keyword for earlier in effective):
+            effective.append(keyword)
+    return effective
+
+
+class TitleNormalizer:
+    """
+    Memoizing album title normalizer with a configurable keyword list
+    """
+
+    def __init__(
+        self,
+        keywords: Sequence[str] = DEFAULT_KEYWORDS,
+        punctuation: str = PUNCTUATION,
+        cache_size: int = 65536,
+    ):
+        """
+        Args:
+            keywords: Substrings removed from titles, in priority order
+            punctuation: Characters replaced by a space
+            cache_size: Maximum number of memoized titles (None for unbounded)
+        """
+        self.keywords = tuple(keywords)
+        # Mapping punctuation to spaces and then collapsing whitespace is the
+        # same as collapsing runs of either; one regex pass beats str.translate
+        # on non-ASCII titles
+        self._separator_pattern = re.compile(f"[\\s{re.escape(punctuation)}]+")
+        effective = _effective_keywords([k.lower() for k in self.keywords])
+        self._keyword_pattern = (
+            re.compile("|".join(re.escape(k) for k in effective)) if effective else None
+        )
+        self.normalize = lru_cache(maxsize=cache_size)(self._normalize)
+
+    def _normalize(self, title: str) -> str:
+        title = self._separator_pattern.sub(" ", title.lower())
+        if self._keyword_pattern is not None:
+            title = self._keyword_pattern.sub("", title)
+        return title.strip()
+
+    def normalize_many(self, titles: Iterable[str]) -> List[str]:
+        """
+        Normalize a batch of titles
+
+        Args:
+            titles: Raw titles
+
+        Returns:
+            Normalized titles in input order
+        """
+        normalize = self.normalize
+        return [normalize(title) for title in titles]
+
+    def cache_info(self):
+        """LRU cache statistics (hits, misses, maxsize, currsize)"""
+        return self.normalize.cache_info()
+
+    def cache_clear(self):
+        """Drop all memoized titles"""
+        self.normalize.cache_clear()
+
+
+default_normalizer = TitleNormalizer()
+
+
+def normalize_title(title: str) -> str:
+    """标准化专辑标题，去除干扰信息 (shared default normalizer)"""
+    return default_normalizer.normalize(title)
+
+
+def normalize_titles(titles: Iterable[str]) -> List[str]:
+    """Normalize a batch of titles with the shared default normalizer"""
+    return default_normalizer.normalize_many(titles)
+
+
+class TitleIndex:
+    """
+    Index over one seller's titles for "same album" lookups
+
+    Two normalized titles match when they are equal, or when one of them is
+    longer than min_contained characters and is a substring of the other.
+    Equality is answered by a hash map; "query contained in title" by posting
+    lists of character n-grams (the rarest n-gram of the query bounds the
+    candidates); "title contained in query" by a map from each long title's
+    leading min_contained + 1 characters, probed at every offset of the query.
+    Candidates are then verified with a plain substring test.
+    """
+
+    def __init__(
+        self,
+        titles: Sequence[str],
+        normalizer: TitleNormalizer = default_normalizer,
+        ngram: int = 4,
+        min_contained: int = 10,
+    ):
+        """
+        Args:
+            titles: Raw titles; positions refer to this sequence
+            normalizer: Normalizer applied to titles and queries
+            ngram: N-gram length (must not exceed min_contained + 1)
+            min_contained: Titles must be longer than this to match by containment
+        """
+        self.titles = list(titles)
+        self.normalizer = normalizer
+        self.ngram = ngram
+        self.min_contained = min_contained
+        self.normalized = normalizer.normalize_many(self.titles)
+
+        self._exact: Dict[str, List[int]] = defaultdict(list)
+        self._grams: Dict[str, List[int]] = defaultdict(list)
+        self._prefixes: Dict[str, List[int]] = defaultdict(list)
+
+        for pos, norm in enumerate(self.normalized):
+            self._exact[norm].append(pos)
+            if len(norm) > min_contained:
+                self._prefixes[norm[: min_contained + 1]].append(pos)
+            if len(norm) >= ngram:
+                for gram in {norm[i : i + ngram] for i in range(len(norm) - ngram + 1)}:
+                    self._grams[gram].append(pos)
+
+    def _containing(self, query: str) -> List[int]:
+        """Positions whose title contains the query"""
+        n = self.ngram
+        postings = None
+        for i in range(len(query) - n + 1):
+            candidates = self._grams.get(query[i : i + n])
+            if candidates is None:
+                return []
+            if postings is None or len(candidates) < len(postings):
+                postings = candidates
+        return [pos for pos in postings or () if query in self.normalized[pos]]
+
+    def _contained(self, query: str) -> List[int]:
+        """Positions whose (long) title is contained in the query"""
+        n = self.min_contained + 1
+        result = []
+        for prefix in {query[i : i + n] for i in range(len(query) - n + 1)}:
+            for pos in self._prefixes.get(prefix, ()):
+                if self.normalized[pos] in query:
+                    result.append(pos)
+        return result
+
+    def matches(self, title: str) -> List[int]:
+        """
+        Positions of all indexed titles that match a raw title
+
+        Args:
+            title: Raw title to look up
+
+        Returns:
+            Sorted positions
+        """
+        query = self.normalizer.normalize(title)
+        positions = set(self._exact.get(query, ()))
+        if len(query) > self.min_contained:
+            positions.update(self._containing(query))
+            positions.update(self._contained(query))
+        return sorted(positions)
+
+    def first_match(
+        self, title: str, skip: Optional[Callable[[int], bool]] = None
+    ) -> Optional[int]:
+        """
+        Lowest position matching a raw title
+
+        Args:
+            title: Raw title to look up
+            skip: Predicate for positions that must be ignored
+
+        Returns:
+            Position, or None when nothing matches
+        """
+        for pos in self.matches(title):
+            if skip is None or not skip(pos):
+                return pos
+        return None
@@ -3,12 +3,30 @@ Data validation utilities for Xianyu crawler
 """
 
 import re
-from typing import Optional
+from typing import Iterable, List, Optional
 
 from pydantic import ValidationError
 from loguru import logger
 
-from xianyu_crawler.items import VinylProductModel
+from xianyu_crawler.items import VinylProductListAdapter, VinylProductModel
+
+# Precompiled patterns, shared with the spider's parsing helpers
+PRICE_PATTERN = re.compile(r"(\d+\.?\d*)")
+INT_PATTERN = re.compile(r"(\d+)")
+PRODUCT_ID_PATTERNS = (
+    re.compile(r"item\.htm\?id=(\d+)"),  # Standard pattern
+    re.compile(r"item/(\d+)"),  # Alternative pattern
+    re.compile(r"id=(\d+)"),  # Generic pattern
+)
+URL_PATTERN = re.compile(
+    r"^(https?:\/\/)"  # http:// or https://
+    r"(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|"  # domain
+    r"localhost|"  # localhost
+    r"\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})"  # or ip
+    r"(?:\/[^\/\s]*)*$",
+    re.IGNORECASE,
+)
+INVALID_FILENAME_CHARS = re.compile(r'[<>:"/\\|?*]')
 
 
 def validate_product_item(item: dict) -> VinylProductModel:
@@ -38,6 +56,36 @@ def validate_product_item(item: dict) -> VinylProductModel:
         raise
 
 
+def validate_product_items(items: Iterable[dict]) -> List[VinylProductModel]:
+    """
+    Validate a batch of product items with a single TypeAdapter call
+
+    If the batch contains invalid items, falls back to per-item validation
+    and skips the invalid ones.
+
+    Args:
+        items: Product item dictionaries
+
+    Returns:
+        List of validated VinylProductModel instances
+    """
+    cleaned_items = [clean_item_data(item) for item in items]
+
+    try:
+        return VinylProductListAdapter.validate_python(cleaned_items)
+    except ValidationError:
+        pass
+
+    validated_items = []
+    for cleaned_data in cleaned_items:
+        try:
+            validated_items.append(VinylProductModel(**cleaned_data))
+        except ValidationError as e:
+            logger.warning(f"Skipping invalid item {cleaned_data.get('product_id')}: {e}")
+
+    return validated_items
+
+
 def clean_item_data(item: dict) -> dict:
     """
     Clean and normalize item data
@@ -104,6 +152,27 @@ def clean_item_data(item: dict) -> dict:
         elif isinstance(tags, str):
             cleaned["tags"] = [tags]
 
+    if item.get("crawled_at"):
+        cleaned["crawled_at"] = item.get("crawled_at")
+
+    if item.get("is_available") is not None:
+        cleaned["is_available"] = bool(item.get("is_available"))
+
+    if item.get("keyword"):
+        cleaned["keyword"] = str(item.get("keyword"))
+
+    if item.get("change_type"):
+        cleaned["change_type"] = str(item.get("change_type"))
+
+    if item.get("changes"):
+        cleaned["changes"] = dict(item.get("changes"))
+
+    if item.get("listing_cluster"):
+        cleaned["listing_cluster"] = str(item.get("listing_cluster"))
+
+    if item.get("album_cluster"):
+        cleaned["album_cluster"] = str(item.get("album_cluster"))
+
     return cleaned
 
 
@@ -126,7 +195,7 @@ def parse_price(price) -> float:
         price_str = price_str.replace("¥", "").replace("$", "").replace(",", "").strip()
 
         # Extract number using regex
-        match = re.search(r"(\d+\.?\d*)", price_str)
+        match = PRICE_PATTERN.search(price_str)
         if match:
             return round(float(match.group(1)), 2)
 
@@ -151,7 +220,7 @@ def parse_int(value) -> Optional[int]:
 
     if isinstance(value, str):
         # Extract number using regex
-        match = re.search(r"(\d+)", value)
+        match = INT_PATTERN.search(value)
         if match:
             return int(match.group(1))
 
@@ -171,16 +240,7 @@ def validate_url(url: str) -> bool:
     if not url or not isinstance(url, str):
         return False
 
-    url_pattern = re.compile(
-        r"^(https?:\/\/)"  # http:// or https://
-        r"(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|"  # domain
-        r"localhost|"  # localhost
-        r"\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})"  # or ip
-        r"(?:\/[^\/\s]*)*$",
-        re.IGNORECASE,
-    )
-
-    return bool(url_pattern.match(url))
+    return bool(URL_PATTERN.match(url))
 
 
 def extract_product_id(url: str) -> Optional[str]:
@@ -197,14 +257,8 @@ def extract_product_id(url: str) -> Optional[str]:
         return None
 
     # Try to extract ID from various URL patterns
-    patterns = [
-        r"item\.htm\?id=(\d+)",  # Standard pattern
-        r"item/(\d+)",  # Alternative pattern
-        r"id=(\d+)",  # Generic pattern
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, url)
+    for pattern in PRODUCT_ID_PATTERNS:
+        match = pattern.search(url)
         if match:
             return match.group(1)
 
@@ -222,8 +276,7 @@ def sanitize_filename(filename: str) -> str:
         Sanitized filename
     """
     # Remove or replace invalid characters
-    invalid_chars = r'[<>:"/\\|?*]'
-    sanitized = re.sub(invalid_chars, "_", filename)
+    sanitized = INVALID_FILENAME_CHARS.sub("_", filename)
 
     # Remove leading/trailing spaces and dots
     sanitized = sanitized.strip(". ")